@@ -8,17 +8,21 @@ import json
 from config import AIRTABLE_BASES, AIRTABLE_CONFIG, THEME_CONFIG
 
 # Import from modular structure
-from modules.airtable import get_utilization_data, get_pnl_data, get_sow_data
-from modules.utils import apply_filters
+from modules.airtable import get_utilization_data, get_pnl_data, get_sow_data, load_in_parallel, clear_sync_state
+from modules.utils import apply_filters, explode_list_column
+from modules.utils.pnl_aggregates import get_pnl_aggregates
+from modules.utils.rollups import get_utilization_rollup
 from modules.visualization import create_utilization_dashboard
 
 # Functions that haven't been modularized yet
-def create_pnl_dashboard(df):
+def create_pnl_dashboard(df, aggregates=None):
     """
     Create visualizations for PnL data
     
     Args:
         df: DataFrame containing PnL data
+        aggregates: Optional PnLAggregates for df (e.g. sliced from the loaded
+            data by the common filters); built from df when not given
         
     Returns:
         None (displays visualizations in Streamlit)
@@ -27,6 +31,11 @@ def create_pnl_dashboard(df):
         st.warning("No PnL data available to display")
         return
     
+    # Client, month and location aggregates, computed once per data version
+    if aggregates is None:
+        aggregates = get_pnl_aggregates(df)
+    totals = aggregates.totals()
+    
     st.subheader("Financial Performance Overview")
     
     # Add descriptive text
@@ -49,20 +58,20 @@ def create_pnl_dashboard(df):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_revenue = df['Revenue_Total'].sum() if 'Revenue_Total' in df.columns else 0
+        total_revenue = totals['Revenue_Total'] if 'Revenue_Total' in df.columns else 0
         st.metric("Total Revenue", f"${total_revenue:,.2f}")
     
     with col2:
-        total_expenses = df['Expense_COGS_Total'].sum() if 'Expense_COGS_Total' in df.columns else 0
+        total_expenses = totals['Expense_COGS_Total'] if 'Expense_COGS_Total' in df.columns else 0
         st.metric("Total Expenses", f"${total_expenses:,.2f}")
     
     with col3:
-        net_profit = df['Net_Profit'].sum() if 'Net_Profit' in df.columns else 0
+        net_profit = totals['Net_Profit'] if 'Net_Profit' in df.columns else 0
         st.metric("Net Profit", f"${net_profit:,.2f}")
     
     with col4:
         if 'Net_Profit' in df.columns and 'Revenue_Total' in df.columns:
-            overall_profit_margin = (df['Net_Profit'].sum() / df['Revenue_Total'].sum()) if df['Revenue_Total'].sum() > 0 else 0
+            overall_profit_margin = (totals['Net_Profit'] / totals['Revenue_Total']) if totals['Revenue_Total'] > 0 else 0
             st.metric("Overall Profit Margin", f"{overall_profit_margin:.1%}")
         else:
             st.metric("Overall Profit Margin", "N/A")
@@ -82,10 +91,10 @@ def create_pnl_dashboard(df):
         revenue_data = pd.DataFrame({
             'Source': ['Wellness Fund', 'Dental Claims', 'Medical Claims', 'Missed Appointments'],
             'Amount': [
-                df['Revenue_WellnessFund'].sum(),
-                df['Revenue_DentalClaim'].sum(),
-                df['Revenue_MedicalClaim_InclCancelled'].sum(),
-                df['Revenue_MissedAppointments'].sum()
+                totals['Revenue_WellnessFund'],
+                totals['Revenue_DentalClaim'],
+                totals['Revenue_MedicalClaim_InclCancelled'],
+                totals['Revenue_MissedAppointments']
             ]
         })
         
@@ -128,16 +137,8 @@ def create_pnl_dashboard(df):
         </div>
         """, unsafe_allow_html=True)
         
-        # Ensure Service_Days column exists, if not, create it with default value of 1
-        if 'Service_Days' not in df.columns:
-            df['Service_Days'] = 1  # Default to 1 day if not specified
-            
-        client_profit = df.groupby('Client').agg({
-            'Revenue_Total': 'sum',
-            'Expense_COGS_Total': 'sum',
-            'Net_Profit': 'sum',
-            'Service_Days': 'sum'  # Add Service_Days to the aggregation
-        }).reset_index()
+        # Per-client totals (Service_Days defaults to 1 per record when the column is missing)
+        client_profit = aggregates.by_client()[['Client', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit', 'Service_Days']].copy()
         
         # Convert Service_Days to numeric, ensuring it's at least 1 for each client
         client_profit['Service_Days'] = pd.to_numeric(client_profit['Service_Days'], errors='coerce')
@@ -200,9 +201,9 @@ def create_pnl_dashboard(df):
     st.markdown("### 1. Overall Financial Health")
     
     # Calculate key financial metrics
-    total_revenue = df['Revenue_Total'].sum()
-    total_expenses = df['Expense_COGS_Total'].sum()
-    total_profit = df['Net_Profit'].sum()
+    total_revenue = totals['Revenue_Total']
+    total_expenses = totals['Expense_COGS_Total']
+    total_profit = totals['Net_Profit']
     overall_margin = total_profit / total_revenue if total_revenue > 0 else 0
     
     # Add formula explanations for metrics
@@ -217,13 +218,9 @@ def create_pnl_dashboard(df):
     formula_growth = "Formula: (Current Period Value ÷ First Period Value) - 1"
     
     if 'Service_Month' in df.columns:
-        valid_months_df = df.dropna(subset=['Service_Month'])
-        if not valid_months_df.empty and pd.api.types.is_datetime64_any_dtype(valid_months_df['Service_Month']):
+        if pd.api.types.is_datetime64_any_dtype(df['Service_Month']):
             # Calculate YoY or QoQ growth if possible
-            monthly_data = valid_months_df.groupby(pd.Grouper(key='Service_Month', freq='M')).agg({
-                'Revenue_Total': 'sum',
-                'Net_Profit': 'sum'
-            }).reset_index()
+            monthly_data = aggregates.monthly()[['Service_Month', 'Revenue_Total', 'Net_Profit']]
             
             if len(monthly_data) >= 2:
                 revenue_growth = ((monthly_data['Revenue_Total'].iloc[-1] / monthly_data['Revenue_Total'].iloc[0]) - 1)
@@ -268,13 +265,8 @@ def create_pnl_dashboard(df):
             
     # Add trend visualization if temporal data is available
     if 'Service_Month' in df.columns:
-        valid_months_df = df.dropna(subset=['Service_Month'])
-        if not valid_months_df.empty and pd.api.types.is_datetime64_any_dtype(valid_months_df['Service_Month']):
-            monthly_data = valid_months_df.groupby(pd.Grouper(key='Service_Month', freq='M')).agg({
-                'Revenue_Total': 'sum',
-                'Expense_COGS_Total': 'sum',
-                'Net_Profit': 'sum'
-            }).reset_index()
+        if pd.api.types.is_datetime64_any_dtype(df['Service_Month']):
+            monthly_data = aggregates.monthly()[['Service_Month', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit']].copy()
             
             if len(monthly_data) > 1:
                 # Create a financial trend chart
@@ -379,16 +371,8 @@ def create_pnl_dashboard(df):
     </div>
     """, unsafe_allow_html=True)
     
-    # Ensure Service_Days column exists, if not, create it with default value of 1
-    if 'Service_Days' not in df.columns:
-        df['Service_Days'] = 1  # Default to 1 day if not specified
-    
-    client_metrics = df.groupby('Client').agg({
-        'Revenue_Total': 'sum',
-        'Expense_COGS_Total': 'sum',
-        'Net_Profit': 'sum',
-        'Service_Days': 'sum'  # Add Service_Days to the aggregation
-    }).reset_index()
+    # Per-client totals (Service_Days defaults to 1 per record when the column is missing)
+    client_metrics = aggregates.by_client()[['Client', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit', 'Service_Days']].copy()
     
     # Convert Service_Days to numeric, ensuring it's at least 1 for each client
     client_metrics['Service_Days'] = pd.to_numeric(client_metrics['Service_Days'], errors='coerce')
@@ -581,7 +565,7 @@ def create_pnl_dashboard(df):
     # Add any columns that exist to our revenue streams data
     for stream_name, column in potential_revenue_columns:
         if column in df.columns:
-            revenue_streams_data[stream_name] = df[column].sum()
+            revenue_streams_data[stream_name] = totals[column]
     
     # Calculate total to get percentages
     total_stream_revenue = sum(revenue_streams_data.values())
@@ -671,23 +655,16 @@ def create_pnl_dashboard(df):
     # 4. Time-based Analysis with enhanced visualizations
     st.markdown("### 4. Financial Trends Analysis")
     if 'Service_Month' in df.columns:
-        valid_months_df = df.dropna(subset=['Service_Month'])
-        
-        if not valid_months_df.empty and pd.api.types.is_datetime64_any_dtype(valid_months_df['Service_Month']):
+        if pd.api.types.is_datetime64_any_dtype(df['Service_Month']) and df['Service_Month'].notna().any():
             # If we have client information, we can do client-based temporal analysis
-            if 'Client' in valid_months_df.columns:
+            if 'Client' in df.columns:
                 # Get the top clients by revenue
                 top_clients = client_metrics.sort_values('Revenue_Total', ascending=False).head(5)['Client'].tolist()
                 
-                # Prepare data for time series by client
-                client_monthly = valid_months_df[valid_months_df['Client'].isin(top_clients)].copy()
+                # Monthly totals for the top clients
+                client_trends = aggregates.monthly_by_client(top_clients)[['Service_Month', 'Client', 'Revenue_Total', 'Net_Profit']].copy()
                 
-                if not client_monthly.empty:
-                    # Group by month and client
-                    client_trends = client_monthly.groupby([pd.Grouper(key='Service_Month', freq='M'), 'Client']).agg({
-                        'Revenue_Total': 'sum',
-                        'Net_Profit': 'sum'
-                    }).reset_index()
+                if not client_trends.empty:
                     
                     # Create stacked area chart for revenue trends by client
                     fig = px.area(
@@ -741,11 +718,7 @@ def create_pnl_dashboard(df):
                     st.plotly_chart(fig, use_container_width=True)
                 
             # Monthly trends analysis
-            monthly_trends = valid_months_df.groupby(pd.Grouper(key='Service_Month', freq='M')).agg({
-                'Revenue_Total': 'sum',
-                'Expense_COGS_Total': 'sum',
-                'Net_Profit': 'sum'
-            }).reset_index()
+            monthly_trends = aggregates.monthly()[['Service_Month', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit']].copy()
             
             if len(monthly_trends) > 1:
                 monthly_trends['Month'] = monthly_trends['Service_Month'].dt.strftime('%b %Y')
@@ -985,16 +958,8 @@ def create_sow_dashboard(df):
     
     with col2:
         if 'ClientCompanyName' in df.columns:
-            # Handle case where ClientCompanyName might contain lists
-            client_values = set()
-            for val in df['ClientCompanyName']:
-                if isinstance(val, list):
-                    # If it's a list, add each item individually
-                    for client in val:
-                        client_values.add(str(client))
-                else:
-                    # Otherwise, just add the value as a string
-                    client_values.add(str(val))
+            # ClientCompanyName may be a linked-record list, so count through the exploded bridge
+            client_values = set(explode_list_column(df, 'ClientCompanyName').cat.categories)
             total_clients = len(client_values)
         else:
             total_clients = 0
@@ -1187,16 +1152,8 @@ def create_sow_dashboard(df):
     
     with col1:
         if 'ClientCompanyName' in df.columns:
-            # Handle case where ClientCompanyName might contain lists
-            client_values = set()
-            for val in df['ClientCompanyName']:
-                if isinstance(val, list):
-                    # If it's a list, add each item individually
-                    for client in val:
-                        client_values.add(str(client))
-                else:
-                    # Otherwise, just add the value as a string
-                    client_values.add(str(val))
+            # ClientCompanyName may be a linked-record list, so count through the exploded bridge
+            client_values = set(explode_list_column(df, 'ClientCompanyName').cat.categories)
             # Get unique values and sort
             client_options = ["All"] + sorted(client_values)
             selected_client = st.selectbox("Filter by Client", client_options)
@@ -1295,11 +1252,30 @@ def render_analytics_dashboard():
     with refresh_col:
         if st.button("🔄 Refresh All Data", use_container_width=True, type="primary"):
             with st.spinner("Loading data from all Airtable bases..."):
-                # Fetch data from all three bases
-                st.session_state.utilization_data = get_utilization_data()
-                st.session_state.pnl_data = get_pnl_data()
-                st.session_state.sow_data = get_sow_data()
-                st.success("✅ Data loaded successfully!")
+                # Fetch data from all three bases concurrently (each base has its own rate limit)
+                start_time = datetime.now()
+                results = load_in_parallel({
+                    'Utilization': get_utilization_data,
+                    'PnL': get_pnl_data,
+                    'SOW': get_sow_data
+                })
+                total_seconds = (datetime.now() - start_time).total_seconds()
+                
+                st.session_state.utilization_data = results['Utilization']['data']
+                st.session_state.pnl_data = results['PnL']['data']
+                st.session_state.sow_data = results['SOW']['data']
+                
+                for name, result in results.items():
+                    if result['error']:
+                        st.error(f"❌ Error loading {name} data: {result['error']}")
+                
+                # Report per-base timings
+                timings = ", ".join(
+                    f"{name} {result['seconds']:.2f}s ({len(result['data']):,} records)"
+                    for name, result in results.items()
+                )
+                st.success(f"✅ Data loaded successfully in {total_seconds:.2f} seconds!")
+                st.caption(f"Per-base load times: {timings}")
     
     # Define the tabs with icons
     tab_options = {
@@ -1373,18 +1349,8 @@ def render_analytics_dashboard():
                 client_filter = st.multiselect("Client", client_options, 
                                              default=default_clients)
             elif st.session_state.pnl_data is not None and not st.session_state.pnl_data.empty and 'Client' in st.session_state.pnl_data.columns:
-                # Handle case where Client column might contain lists
-                client_values = set()
-                for val in st.session_state.pnl_data['Client']:
-                    if isinstance(val, list):
-                        # If it's a list, add each item individually
-                        for client in val:
-                            client_values.add(str(client))
-                    else:
-                        # Otherwise, just add the value as a string
-                        client_values.add(str(val))
-                # Get unique values and sort
-                client_options = sorted(client_values)
+                # Client may be a linked-record list, so take the options from the exploded bridge
+                client_options = sorted(explode_list_column(st.session_state.pnl_data, 'Client').cat.categories)
                 default_clients = st.session_state.common_filters.get('Client', []) if isinstance(st.session_state.common_filters.get('Client', []), list) else []
                 client_filter = st.multiselect("Client", client_options,
                                              default=default_clients)
@@ -1421,18 +1387,8 @@ def render_analytics_dashboard():
                 default_sites = st.session_state.common_filters.get('Site', []) if isinstance(st.session_state.common_filters.get('Site', []), list) else []
                 site_filter = st.multiselect("Site", site_options, default=default_sites)
             elif st.session_state.pnl_data is not None and not st.session_state.pnl_data.empty and 'Site_Location' in st.session_state.pnl_data.columns:
-                # Handle case where Site_Location contains lists
-                site_values = set()
-                for val in st.session_state.pnl_data['Site_Location']:
-                    if isinstance(val, list):
-                        # If it's a list, add each item individually
-                        for site in val:
-                            site_values.add(str(site))
-                    else:
-                        # Otherwise, just add the value as a string
-                        site_values.add(str(val))
-                # Get unique values and sort
-                site_options = sorted(site_values)
+                # Site_Location is a lookup list, so take the options from the exploded bridge
+                site_options = sorted(explode_list_column(st.session_state.pnl_data, 'Site_Location').cat.categories)
                 default_sites = st.session_state.common_filters.get('Site', []) if isinstance(st.session_state.common_filters.get('Site', []), list) else []
                 site_filter = st.multiselect("Site", site_options, default=default_sites)
             else:
@@ -1505,13 +1461,8 @@ def render_analytics_dashboard():
         # Refresh button that clears cache and reloads data
         with load_col2:
             if st.button("🔄 Refresh Data", key="refresh_utilization", use_container_width=True):
-                # Clear the cache to force a fresh fetch from Airtable
-                try:
-                    # Try to clear specific function's cache first
-                    get_utilization_data.clear()
-                except:
-                    # If that doesn't work, use general cache clearing
-                    st.cache_data.clear()
+                # Drop the synced copy so records deleted in Airtable disappear too
+                clear_sync_state('UTILIZATION')
                 
                 with st.spinner("Refreshing utilization data from Airtable..."):
                     utilization_df = get_utilization_data(tab_filters)
@@ -1529,7 +1480,9 @@ def render_analytics_dashboard():
                 st.write(f"Filtered data: {len(filtered_df)} records (from {len(st.session_state.utilization_data)} total)")
             
             # Pass interactive=True parameter to always show expanded visualization options
-            create_utilization_dashboard(filtered_df, interactive=True)
+            # (charts read the rollup built at load time, sliced by the common filters)
+            create_utilization_dashboard(filtered_df, interactive=True,
+                                         rollup=get_utilization_rollup(st.session_state.utilization_data, st.session_state.common_filters))
         else:
             st.info("No utilization data loaded. Please use the 'Load Utilization Data' button above.")
     
@@ -1558,13 +1511,8 @@ def render_analytics_dashboard():
         # Refresh button that clears cache and reloads data
         with load_col2:
             if st.button("🔄 Refresh Data", key="refresh_financial", use_container_width=True):
-                # Clear the cache to force a fresh fetch from Airtable
-                try:
-                    # Try to clear specific function's cache first
-                    get_pnl_data.clear()
-                except:
-                    # If that doesn't work, use general cache clearing
-                    st.cache_data.clear()
+                # Drop the synced copy so records deleted in Airtable disappear too
+                clear_sync_state('PNL')
                 
                 with st.spinner("Refreshing financial data from Airtable..."):
                     pnl_df = get_pnl_data()
@@ -1581,8 +1529,8 @@ def render_analytics_dashboard():
                 st.info(f"Showing data with applied filters: {', '.join([f'{k}: {v}' for k, v in st.session_state.common_filters.items()])}")
                 st.write(f"Filtered data: {len(filtered_df)} records (from {len(st.session_state.pnl_data)} total)")
             
-            # Pass the filtered dataframe to the PnL dashboard
-            create_pnl_dashboard(filtered_df)
+            # Pass the filtered dataframe to the PnL dashboard, with the loaded data's aggregates sliced by the same filters
+            create_pnl_dashboard(filtered_df, aggregates=get_pnl_aggregates(st.session_state.pnl_data, st.session_state.common_filters))
         else:
             st.info("No financial data loaded. Please use the 'Load Financial Data' button above.")
     
@@ -1611,13 +1559,8 @@ def render_analytics_dashboard():
         # Refresh button that clears cache and reloads data
         with load_col2:
             if st.button("🔄 Refresh Data", key="refresh_sow", use_container_width=True):
-                # Clear the cache to force a fresh fetch from Airtable
-                try:
-                    # Try to clear specific function's cache first
-                    get_sow_data.clear()
-                except:
-                    # If that doesn't work, use general cache clearing
-                    st.cache_data.clear()
+                # Drop the synced copy so records deleted in Airtable disappear too
+                clear_sync_state('SOW')
                 
                 with st.spinner("Refreshing SOW data from Airtable..."):
                     sow_df = get_sow_data()
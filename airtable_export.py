@@ -1,9 +1,34 @@
 import streamlit as st
 import pandas as pd
-import requests
+import asyncio
 import json
 from datetime import datetime
 from config import AIRTABLE_CONFIG
+from modules.airtable.client import get_airtable_client
+
+async def _export_batches(path, api_key, batches):
+    """
+    Send export batches concurrently through the shared Airtable client
+    
+    Returns:
+        List of (exported_count, error_message) tuples in batch order
+    """
+    client = get_airtable_client()
+    
+    async def send_batch(batch):
+        # Format the batch for Airtable
+        airtable_records = {"records": [{"fields": record} for record in batch]}
+        
+        try:
+            response = await client.request_async('POST', path, api_key=api_key, json=airtable_records)
+            
+            if response.status_code == 200:
+                return len(batch), None
+            return 0, f"Batch export failed: {response.status_code} - {response.text}"
+        except Exception as e:
+            return 0, f"Error during export: {str(e)}"
+    
+    return await asyncio.gather(*(send_batch(batch) for batch in batches))
 
 def export_to_airtable(df, table_name, mapping=None, api_key=None, base_id=None):
     """
@@ -20,21 +45,16 @@ def export_to_airtable(df, table_name, mapping=None, api_key=None, base_id=None)
         Tuple of (success_count, error_count, errors)
     """
     # Get API credentials
-    api_key = api_key or st.session_state.get('airtable_api_key') or AIRTABLE_CONFIG['API_KEY']
-    base_id = base_id or st.session_state.get('airtable_base_id') or AIRTABLE_CONFIG['BASE_ID']
+    client = get_airtable_client()
+    api_key = client.resolve_api_key(api_key)
+    base_id = client.resolve_base_id(base_id)
     
     if not api_key or not base_id:
         st.error("Airtable credentials not configured. Please set them up in the integration settings.")
         return (0, 0, ["Missing Airtable credentials"])
     
-    # Prepare headers
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    # Create URL
-    url = f"{AIRTABLE_CONFIG['API_URL']}/{base_id}/{table_name}"
+    # Table path below the API URL
+    path = f"{base_id}/{table_name}"
     
     # Apply mapping if provided
     if mapping:
@@ -52,28 +72,17 @@ def export_to_airtable(df, table_name, mapping=None, api_key=None, base_id=None)
     batch_size = 10
     batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
     
-    # Process each batch
+    # Process the batches, paced by the shared per-base rate limiter
     with st.spinner(f"Exporting {len(records)} records to Airtable..."):
-        for batch in batches:
-            # Format the batch for Airtable
-            airtable_records = {"records": [{"fields": record} for record in batch]}
-            
-            try:
-                # Send the batch to Airtable
-                response = requests.post(url, headers=headers, json=airtable_records)
-                
-                if response.status_code == 200:
-                    success_count += len(batch)
-                else:
-                    error_count += len(batch)
-                    error_message = f"Batch export failed: {response.status_code} - {response.text}"
-                    errors.append(error_message)
-                    st.warning(error_message)
-            except Exception as e:
-                error_count += len(batch)
-                error_message = f"Error during export: {str(e)}"
-                errors.append(error_message)
-                st.warning(error_message)
+        results = asyncio.run(_export_batches(path, api_key, batches))
+    
+    for batch, (exported, error_message) in zip(batches, results):
+        if error_message is None:
+            success_count += exported
+        else:
+            error_count += len(batch)
+            errors.append(error_message)
+            st.warning(error_message)
     
     return (success_count, error_count, errors)
 
@@ -5,23 +5,16 @@ import os
 import json
 from datetime import datetime
 from config import AIRTABLE_CONFIG, THEME_CONFIG
+from modules.airtable.client import get_airtable_client
+from modules.airtable.cache import get_response_cache, clear_airtable_cache
+from modules.airtable.sync import clear_sync_state
 
 def get_airtable_credentials():
-    """Get Airtable credentials from environment variables or session state"""
-    # Check for credentials in session state first
-    if 'airtable_api_key' in st.session_state and 'airtable_base_id' in st.session_state:
-        return {
-            'api_key': st.session_state['airtable_api_key'],
-            'base_id': st.session_state['airtable_base_id']
-        }
-    
-    # Otherwise try environment variables
-    api_key = os.environ.get('AIRTABLE_API_KEY', AIRTABLE_CONFIG['API_KEY'])
-    base_id = os.environ.get('AIRTABLE_BASE_ID', AIRTABLE_CONFIG['BASE_ID'])
-    
+    """Get Airtable credentials from session state, environment variables or config"""
+    client = get_airtable_client()
     return {
-        'api_key': api_key,
-        'base_id': base_id
+        'api_key': client.resolve_api_key(),
+        'base_id': client.resolve_base_id()
     }
 
 def fetch_airtable_table(table_name, max_records=100):
@@ -34,15 +27,10 @@ def fetch_airtable_table(table_name, max_records=100):
         st.error("Airtable credentials not configured. Please set them up in the settings.")
         return None
     
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    url = f"{AIRTABLE_CONFIG['API_URL']}/{base_id}/{table_name}"
-    
     try:
-        response = requests.get(url, headers=headers, params={'maxRecords': max_records})
+        response = get_airtable_client().request(
+            'GET', f"{base_id}/{table_name}", api_key=api_key, params={'maxRecords': max_records}
+        )
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -59,16 +47,9 @@ def create_airtable_record(table_name, record_data):
         st.error("Airtable credentials not configured. Please set them up in the settings.")
         return None
     
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    url = f"{AIRTABLE_CONFIG['API_URL']}/{base_id}/{table_name}"
-    
     try:
         data = {'fields': record_data}
-        response = requests.post(url, headers=headers, json=data)
+        response = get_airtable_client().request('POST', f"{base_id}/{table_name}", api_key=api_key, json=data)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -85,16 +66,11 @@ def update_airtable_record(table_name, record_id, record_data):
         st.error("Airtable credentials not configured. Please set them up in the settings.")
         return None
     
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    url = f"{AIRTABLE_CONFIG['API_URL']}/{base_id}/{table_name}/{record_id}"
-    
     try:
         data = {'fields': record_data}
-        response = requests.patch(url, headers=headers, json=data)
+        response = get_airtable_client().request(
+            'PATCH', f"{base_id}/{table_name}/{record_id}", api_key=api_key, json=data
+        )
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -154,14 +130,10 @@ def render_airtable_settings():
             st.error("Please enter both API Key and Base ID")
         else:
             with st.spinner("Testing connection to Airtable..."):
-                test_url = f"{AIRTABLE_CONFIG['API_URL']}/{credentials['base_id']}"
-                headers = {
-                    'Authorization': f'Bearer {credentials["api_key"]}',
-                    'Content-Type': 'application/json'
-                }
-                
                 try:
-                    response = requests.get(f"{test_url}/metadata", headers=headers)
+                    response = get_airtable_client().request(
+                        'GET', f"{credentials['base_id']}/metadata", api_key=credentials['api_key']
+                    )
                     if response.status_code == 200:
                         st.success("Successfully connected to Airtable!")
                         
@@ -181,6 +153,42 @@ def render_airtable_settings():
                             st.error(f"Error message: {response.text}")
                 except requests.exceptions.RequestException as e:
                     st.error(f"Connection error: {str(e)}")
+    
+    render_airtable_cache_status()
+
+def render_airtable_cache_status():
+    """Render size and hit statistics for the on-disk Airtable response cache"""
+    st.subheader("Response Cache")
+    
+    cache = get_response_cache()
+    stats = cache.stats()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Entries", f"{stats['entries']:,}")
+    col2.metric("Size on Disk", f"{stats['file_bytes'] / (1024 * 1024):.1f} MB")
+    col3.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+    col4.metric("Background Refreshes", f"{stats['refreshes']:,}")
+    
+    st.caption(
+        f"{stats['hits']:,} fresh hits, {stats['stale_hits']:,} stale hits, {stats['misses']:,} misses, "
+        f"{stats['refresh_errors']:,} failed refreshes since the app started. "
+        f"Entries are fresh for {cache.ttl // 60} minutes and kept for {cache.max_age // 86400} days."
+    )
+    
+    if stats['by_base']:
+        st.dataframe(
+            pd.DataFrame([
+                {'Base': base_key, 'Entries': info['entries'], 'Size (KB)': round(info['payload_bytes'] / 1024, 1)}
+                for base_key, info in sorted(stats['by_base'].items())
+            ]),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    if st.button("🗑️ Clear Cache"):
+        clear_airtable_cache()
+        clear_sync_state()
+        st.success("✅ Airtable cache cleared. The next load will fetch fresh data.")
 
 def render_sow_generator():
     """Render the Statement of Work (SOW) generator interface"""
@@ -1,54 +1,32 @@
 import pandas as pd
+import numpy as np
 import streamlit as st
 import plotly.express as px
 from config import LOCAL_TZ
+from modules.utils.filter_engine import get_filter_index
+from modules.utils.patient_dimension import get_patient_dimension
 
 def analyze_service_counts_per_patient(df):
     """Analyze how many services each patient has taken"""
     if df.empty:
         return pd.DataFrame()
     
-    # Group by email and count unique services
-    service_counts = (df.groupby("Email")
-                     .agg({"Service": "nunique"})
-                     .reset_index())
-    
-    # Create distribution of service counts
-    service_dist = (service_counts["Service"]
-                   .value_counts()
-                   .reset_index())
-    service_dist.columns = ["Number_of_Services", "Patient_Count"]
-    service_dist = service_dist.sort_values("Number_of_Services")
-    
-    return service_dist
+    # Distribution of distinct service counts, from the shared patient dimension
+    return get_patient_dimension(df).service_distribution()
 
 def analyze_patients(df):
     """Analyze patient data and return unique patients, booking frequency, and service usage"""
     if df.empty:
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
     
-    # Get unique patients with their most recent appointment
-    unique_patients = (df[["Email", "Customer", "Phone", "Start Date"]]
-                      .sort_values("Start Date", ascending=False)
-                      .groupby(["Email", "Customer", "Phone"])
-                      .first()
-                      .reset_index())
+    patients = get_patient_dimension(df)
     
-    # Analyze booking frequency and patterns
-    booking_freq = (df.groupby("Email")
-                   .agg({
-                       "Customer": "first",
-                       "Service": "count",
-                       "Business": "nunique",
-                       "Duration (min)": "sum",
-                       "Start Date": ["min", "max"],
-                       "Status": lambda x: (x == "Cancelled").mean() * 100
-                   })
-                   .reset_index())
+    # Get unique patients with their most recent appointment
+    unique_patients = patients.contacts.reset_index()
     
-    # Rename columns
-    booking_freq.columns = ["Email", "Customer", "Total_Appointments", "Unique_Businesses", 
-                          "Total_Duration", "First_Visit", "Last_Visit", "Cancellation_Rate"]
+    # Booking frequency and patterns
+    booking_freq = patients.patients[["Customer", "Total_Appointments", "Unique_Businesses", "Total_Duration",
+                                      "First_Visit", "Last_Visit", "Cancellation_Rate"]].reset_index()
     
     # Calculate days between first and last visit
     booking_freq["Days_Between_Visits"] = (
@@ -58,52 +36,99 @@ def analyze_patients(df):
     # Sort by total appointments
     booking_freq = booking_freq.sort_values("Total_Appointments", ascending=False)
     
-    # Analyze service preferences
-    service_usage = (df.groupby(["Email", "Customer"])
-                    .agg({
-                        "Service": ["count", lambda x: ", ".join(sorted(x.unique()))],
-                        "Business": lambda x: x.mode().iloc[0] if not x.empty else "",
-                        "Duration (min)": "mean"
-                    })
-                    .reset_index())
-    
-    # Rename columns
-    service_usage.columns = ["Email", "Customer", "Service_Count", "Services", 
-                           "Preferred_Business", "Avg_Duration"]
+    # Service preferences
+    service_usage = patients.usage[["Service_Count", "Services", "Preferred_Business", "Avg_Duration"]].reset_index()
     
     # Get service counts per patient
     service_counts_dist = analyze_service_counts_per_patient(df)
     
     return unique_patients, booking_freq, service_usage, service_counts_dist
 
+# Appointment columns kept by the coded frame (text columns become categoricals)
+CODED_APPOINTMENT_COLUMNS = ["Business", "Service", "Status", "Email", "Start Date", "Duration (min)"]
+CATEGORICAL_APPOINTMENT_COLUMNS = ["Business", "Service", "Status", "Email"]
+
+def coded_appointments(df):
+    """
+    Narrow copy of the appointments with categorical text columns
+    
+    Business, Service, Status and Email become categoricals (sorted
+    categories, except for emails). A boolean 'Cancelled' indicator is
+    precomputed from the status, and each service's and patient's first
+    appointment at a business is flagged so distinct counts become sums.
+    Cached with the frame's FilterIndex, so the columns are hashed once per
+    loaded (or filtered) frame.
+    
+    Args:
+        df: DataFrame of appointments
+    
+    Returns:
+        DataFrame aligned with df
+    """
+    def build():
+        columns = [col for col in CODED_APPOINTMENT_COLUMNS if col in df.columns]
+        coded = df[columns].astype({col: "category" for col in CATEGORICAL_APPOINTMENT_COLUMNS if col in columns and col != "Email"})
+        if "Email" in columns:
+            # Emails are only counted, so their (many) categories are left unsorted
+            codes, emails = pd.factorize(coded["Email"])
+            coded["Email"] = pd.Categorical.from_codes(codes, emails)
+        if "Status" in columns:
+            coded["Cancelled"] = coded["Status"] == "Cancelled"
+        
+        # First appointment of each service and each patient at a business (their sums are distinct counts)
+        if "Business" in columns:
+            business = coded["Business"].cat.codes.to_numpy().astype("int64")
+            for column, indicator in (("Service", "Business_New_Service"), ("Email", "Business_New_Patient")):
+                if column in columns:
+                    values = coded[column].cat.codes.to_numpy().astype("int64")
+                    pairs = pd.Series(business * (len(coded[column].cat.categories) + 1) + values + 1)
+                    coded[indicator] = (values >= 0) & ~pairs.duplicated().to_numpy()
+        
+        return coded
+    
+    return get_filter_index(df).derived(("coded_appointments", tuple(df.columns)), build)
+
+def _plain(column):
+    """Categorical column of grouped results as plain values"""
+    return column.astype(column.cat.categories.dtype)
+
 def analyze_service_mix(df):
     """Analyze service mix and return service counts and duration analysis"""
     if df.empty:
         return pd.DataFrame(), pd.DataFrame()
     
-    # Count services
-    service_counts = df["Service"].value_counts().reset_index()
-    service_counts.columns = ["Service", "Count"]
+    coded = coded_appointments(df)
+    services = coded["Service"].cat
+    codes = services.codes.to_numpy()
+    present = codes[codes >= 0]
+    
+    # Count services from their codes, in value_counts order (ties keep first appearance)
+    counts = np.bincount(present, minlength=len(services.categories))
+    seen, first_seen = np.unique(present, return_index=True)
+    seen = seen[np.argsort(first_seen, kind="stable")]
+    service_counts = pd.Series(counts[seen], index=services.categories[seen]).sort_values(ascending=False)
     
     # Calculate total and threshold for "Other" category
-    total = service_counts["Count"].sum()
+    total = service_counts.sum()
     thresh = total * 0.05
     
     # Group small services into "Other"
-    small_services = service_counts[service_counts["Count"] < thresh]
-    if not small_services.empty:
-        other = pd.DataFrame([{"Service": "Other", "Count": small_services["Count"].sum()}])
-        service_counts = pd.concat([service_counts[service_counts["Count"] >= thresh], other], ignore_index=True)
+    small = (service_counts < thresh).to_numpy()
+    names = service_counts.index.to_numpy(dtype=object)[~small]
+    values = service_counts.to_numpy()[~small]
+    if small.any():
+        names = np.append(names, "Other")
+        values = np.append(values, service_counts.to_numpy()[small].sum())
+    service_counts = pd.DataFrame({"Service": names, "Count": values})
     
     # Analyze service duration
-    duration_analysis = (df.groupby("Service")
-                        .agg({
-                            "Duration (min)": ["mean", "min", "max", "count"]
-                        })
+    duration_analysis = (coded.groupby("Service", observed=True)["Duration (min)"]
+                        .agg(["mean", "min", "max", "count"])
                         .reset_index())
     
     # Rename columns
     duration_analysis.columns = ["Service", "Avg_Duration", "Min_Duration", "Max_Duration", "Appointment_Count"]
+    duration_analysis["Service"] = _plain(duration_analysis["Service"])
     duration_analysis = duration_analysis.sort_values("Appointment_Count", ascending=False)
     
     return service_counts, duration_analysis
@@ -113,20 +138,20 @@ def analyze_clients(df):
     if df.empty:
         return pd.DataFrame()
     
-    # Calculate client metrics
-    client_analysis = (df.groupby("Business")
-                      .agg({
-                          "Start Date": "count",  # Use Start Date for counting appointments
-                          "Duration (min)": "mean",
-                          "Status": lambda x: (x == "Cancelled").mean() * 100,
-                          "Service": "nunique",
-                          "Email": "nunique"
-                      })
+    # Calculate client metrics in one pass over the coded columns
+    client_analysis = (coded_appointments(df)
+                      .groupby("Business", observed=True)
+                      .agg(
+                          Total_Appointments=("Start Date", "count"),  # Use Start Date for counting appointments
+                          Avg_Duration=("Duration (min)", "mean"),
+                          Cancellation_Rate=("Cancelled", "mean"),
+                          Unique_Services=("Business_New_Service", "sum"),
+                          Recurring_Patients=("Business_New_Patient", "sum")
+                      )
                       .reset_index())
     
-    # Rename columns
-    client_analysis.columns = ["Business", "Total_Appointments", "Avg_Duration", 
-                             "Cancellation_Rate", "Unique_Services", "Recurring_Patients"]
+    client_analysis["Business"] = _plain(client_analysis["Business"])
+    client_analysis["Cancellation_Rate"] = client_analysis["Cancellation_Rate"] * 100
     
     # Round numeric columns
     client_analysis = client_analysis.round(2)
@@ -13,6 +13,7 @@ import numpy as np
 import time
 import uuid
 import sys
+import tempfile
 import asyncio
 from streamlit_extras.stylable_container import stylable_container
 from streamlit_extras.app_logo import add_logo
@@ -23,8 +24,10 @@ import traceback
 # Import custom modules
 from config import THEME_CONFIG, DATE_PRESETS, APP_TAGLINE, LOGO_PATH, AIRTABLE_CONFIG
 from ms_integrations import fetch_bookings_data, fetch_calendar_events, fetch_businesses_for_appointments, track_booking_cancellations, fetch_cancellation_emails
-from phone_formatter import format_phone_strict, create_phone_analysis, format_phone_dataframe, prepare_outlook_contacts, create_appointments_flow, process_uploaded_phone_list
+from phone_formatter import validate_phone_column, read_phone_upload_chunks, stream_phone_validation, PHONE_VALIDATION_PREVIEW_ROWS, PHONE_VALIDATION_MODES, phone_cache_stats, create_phone_analysis, format_phone_dataframe, prepare_outlook_contacts, create_appointments_flow, process_uploaded_phone_list
 from airtable_integration import render_airtable_tabs, get_airtable_credentials, fetch_airtable_table
+from modules.airtable.client import get_airtable_client
+from modules.utils.patient_dimension import get_patient_dimension
 from icons import render_logo, render_tab_bar, render_icon, render_empty_state, render_info_box
 from sow_creator import render_sow_creator
 from airtable_export import render_export_options, export_bookings_to_airtable, export_patients_to_airtable, analyze_airtable_data
@@ -482,6 +485,12 @@ def render_dashboard_tab(active_subtab):
                             customer_search = ""
                 
                 # Apply filters to the dataframe
+                table_filters = {
+                    'business': selected_business,
+                    'status': selected_status,
+                    'service': selected_service,
+                    'customer': customer_search
+                }
                 filtered_df = df.copy()
                 
                 if selected_business != "All" and 'Business' in filtered_df.columns:
@@ -904,7 +913,7 @@ def render_dashboard_tab(active_subtab):
                 st.subheader("Patient Analysis")
                 
                 # Analyze unique patients
-                unique_patients, service_distribution = analyze_unique_patients(filtered_df)
+                unique_patients, service_distribution = analyze_unique_patients(filtered_df, source=df, filters=table_filters)
                 
                 if not unique_patients.empty:
                     # Create two columns
@@ -1560,6 +1569,27 @@ def render_tools_tab(active_subtab):
             horizontal=True,
             key="phone_validation_source_choice"
         )
+        
+        # Validation mode (strict formatting rules or full libphonenumber validation across worker processes)
+        mode_col, region_col = st.columns([2, 1])
+        with mode_col:
+            mode_label = st.radio(
+                "Validation Mode:",
+                list(PHONE_VALIDATION_MODES.keys()),
+                horizontal=True,
+                key="phone_validation_mode",
+                help="Full validation checks each number against libphonenumber's numbering plans. It's slower, so numbers are validated in parallel worker processes."
+            )
+            validation_mode = PHONE_VALIDATION_MODES[mode_label]
+        with region_col:
+            validation_region = st.selectbox(
+                "Default Region:",
+                ["US", "CA", "GB", "IE", "AE", "PH", "DK", "IN", "AU", "MX", "BR", "DE", "FR", "ES"],
+                index=0,
+                key="phone_validation_region",
+                disabled=validation_mode != "libphonenumber",
+                help="Region assumed for numbers without a country code."
+            )
         st.markdown("<hr style='margin-top: 0.5rem; margin-bottom: 1rem;'>", unsafe_allow_html=True)
 
         if source_choice == "Validate from Fetched Appointments":
@@ -1577,31 +1607,9 @@ def render_tools_tab(active_subtab):
 
                     if st.button("Validate Phones from Appointments", type="primary", use_container_width=True, key="validate_phones_from_bookings_btn"):
                         with st.spinner("Validating phone numbers from appointments..."):
-                            # --- Replicate validation logic --- 
-                            results = []
-                            valid_count = 0
-                            invalid_count = 0
-                            empty_count = 0
-                            for index, row in df_bookings.iterrows():
-                                original_phone = str(row['Phone']) if pd.notna(row['Phone']) else ""
-                                formatted_phone, is_valid = format_phone_strict(original_phone)
-                                status = "Empty" if not original_phone else ("Valid" if is_valid else "Invalid")
-                                if status == "Valid": valid_count += 1
-                                elif status == "Invalid": invalid_count += 1
-                                else: empty_count += 1
-                                
-                                result_row = row.to_dict()
-                                result_row['Original Phone Value'] = original_phone
-                                result_row['Formatted Phone'] = formatted_phone
-                                result_row['Validation Status'] = status
-                                results.append(result_row)
-                            # --- End Replicated Logic ---
-                            results_df_bookings = pd.DataFrame(results)
+                            results_df_bookings, summary_bookings = validate_phone_column(df_bookings, 'Phone', validation_mode, validation_region)
                             st.session_state.phone_validation_results_bookings = results_df_bookings
-                            st.session_state.phone_validation_summary_bookings = {
-                                "total_processed": len(results_df_bookings),
-                                "valid": valid_count, "invalid": invalid_count, "empty": empty_count
-                            }
+                            st.session_state.phone_validation_summary_bookings = summary_bookings
                             st.success(f"Processed {len(results_df_bookings)} phone numbers from appointments.")
                     
                     # Display results if available (for bookings data)
@@ -1644,12 +1652,11 @@ def render_tools_tab(active_subtab):
             
             if uploaded_file is not None:
                 try:
-                    if uploaded_file.name.endswith('.csv'):
-                        df_upload = pd.read_csv(uploaded_file)
-                    else:
-                        df_upload = pd.read_excel(uploaded_file)
+                    # Only a preview is loaded here; validation streams the whole file in chunks
+                    df_upload = next(iter(read_phone_upload_chunks(uploaded_file, uploaded_file.name, chunksize=PHONE_VALIDATION_PREVIEW_ROWS)), pd.DataFrame())
+                    uploaded_file.seek(0)
                     
-                    st.success(f"File '{uploaded_file.name}' uploaded successfully with {len(df_upload)} rows.")
+                    st.success(f"File '{uploaded_file.name}' uploaded successfully ({uploaded_file.size / 1_000_000:.1f} MB).")
                     st.session_state.uploaded_phone_df = df_upload
 
                 except Exception as e:
@@ -1672,43 +1679,43 @@ def render_tools_tab(active_subtab):
 
                         if phone_column:
                             if st.button("Validate Phone Numbers", type="primary", use_container_width=True, key="validate_phones_button_unique"): # Changed key
-                                with st.spinner(f"Validating phone numbers in column '{phone_column}'... Please wait."):
-                                    results = []
-                                    valid_count = 0
-                                    invalid_count = 0
-                                    empty_count = 0
+                                progress_bar = st.progress(0.0)
+                                progress_text = st.empty()
+                                
+                                def show_progress(rows_processed, rows_per_second):
+                                    progress_bar.progress(min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0))
+                                    progress_text.caption(f"Validated {rows_processed:,} rows ({rows_per_second:,.0f} rows/sec)")
+                                
+                                try:
+                                    # Results are written to temporary CSV files as each chunk is validated. The
+                                    # previous run's files are deleted first; the latest run's are deleted with the session
+                                    previous_output = st.session_state.pop("phone_validation_output_dir", None)
+                                    if previous_output is not None:
+                                        previous_output.cleanup()
+                                    st.session_state.phone_validation_output_dir = tempfile.TemporaryDirectory(prefix="phone_validation_")
+                                    output_dir = st.session_state.phone_validation_output_dir.name
+                                    output_path = os.path.join(output_dir, "all_results.csv")
+                                    valid_output_path = os.path.join(output_dir, "valid_only.csv")
                                     
-                                    for index, row in df_upload.iterrows():
-                                        original_phone = str(row[phone_column]) if pd.notna(row[phone_column]) else ""
-                                        formatted_phone, is_valid = format_phone_strict(original_phone)
-                                        
-                                        status = ""
-                                        if not original_phone:
-                                            status = "Empty"
-                                            empty_count += 1
-                                        elif is_valid:
-                                            status = "Valid"
-                                            valid_count +=1
-                                        else:
-                                            status = "Invalid"
-                                            invalid_count +=1
-                                        
-                                        result_row = row.to_dict()
-                                        result_row['Original Phone Value'] = original_phone
-                                        result_row['Formatted Phone'] = formatted_phone
-                                        result_row['Validation Status'] = status
-                                        results.append(result_row)
+                                    uploaded_file.seek(0)
+                                    results_df_upload, summary_upload = stream_phone_validation(
+                                        read_phone_upload_chunks(uploaded_file, uploaded_file.name),
+                                        phone_column,
+                                        output_path,
+                                        valid_output=valid_output_path,
+                                        on_progress=show_progress,
+                                        mode=validation_mode,
+                                        region=validation_region
+                                    )
+                                    summary_upload["output_path"] = output_path
+                                    summary_upload["valid_output_path"] = valid_output_path
                                     
-                                    results_df_upload = pd.DataFrame(results) # Use a different df name
+                                    progress_bar.progress(1.0)
                                     st.session_state.phone_validation_results_upload = results_df_upload
-                                    
-                                    st.session_state.phone_validation_summary_upload = {
-                                        "total_processed": len(results_df_upload),
-                                        "valid": valid_count,
-                                        "invalid": invalid_count,
-                                        "empty": empty_count
-                                    }
-                                    st.success(f"Processed {len(results_df_upload)} phone numbers from uploaded file.")
+                                    st.session_state.phone_validation_summary_upload = summary_upload
+                                    st.success(f"Processed {summary_upload['total_processed']:,} phone numbers from uploaded file in {summary_upload['seconds']:.1f}s ({summary_upload['rows_per_second']:,.0f} rows/sec).")
+                                except Exception as e:
+                                    st.error(f"Error validating file: {e}")
             
             # Display results if available (for uploaded file)
             if st.session_state.phone_validation_results_upload is not None:
@@ -1791,9 +1798,13 @@ def render_tools_tab(active_subtab):
         elif selected_api == "Airtable API":
             st.subheader("Airtable API Configuration")
             
-            # Mock configuration settings
-            st.text_input("API Key", value="key************", type="password", key="airtable_api_key")
-            st.text_input("Base ID", value="app***************", key="airtable_base_id")
+            client = get_airtable_client()
+            credentials = get_airtable_credentials()
+            
+            # Overrides only apply to the test request; saved credentials live in the Airtable settings
+            inspector_api_key = st.text_input("API Key", value="", type="password", key="inspector_airtable_api_key",
+                                              help="Leave empty to use the configured API key")
+            inspector_base_id = st.text_input("Base ID", value=credentials['base_id'] or "", key="inspector_airtable_base_id")
             
             # Table selection
             tables = ["Patients", "Appointments", "Services", "Invoices"]
@@ -1802,34 +1813,29 @@ def render_tools_tab(active_subtab):
             # Test button
             if st.button("Test API Connection"):
                 with st.spinner("Testing API connection..."):
-                    time.sleep(2)  # Simulate API call
-                    st.success("API connection successful!")
-                    
-                    # Show mock response
-                    st.subheader("API Response")
-                    
-                    response = {
-                        "records": [
-                            {
-                                "id": "rec123",
-                                "fields": {
-                                    "Name": "John Doe",
-                                    "Phone": "(123) 456-7890",
-                                    "Email": "john.doe@example.com"
-                                }
-                            },
-                            {
-                                "id": "rec456",
-                                "fields": {
-                                    "Name": "Jane Smith",
-                                    "Phone": "(555) 123-4567",
-                                    "Email": "jane.smith@example.com"
-                                }
-                            }
-                        ]
-                    }
-                    
-                    st.json(response)
+                    try:
+                        response = client.request(
+                            'GET', f"{inspector_base_id}/{selected_table}",
+                            api_key=inspector_api_key or None, params={'maxRecords': 3}
+                        )
+                        
+                        if response.status_code == 200:
+                            st.success("API connection successful!")
+                        else:
+                            st.error(f"API request failed with status code {response.status_code}")
+                        
+                        # Show the response
+                        st.subheader("API Response")
+                        try:
+                            st.json(response.json())
+                        except ValueError:
+                            st.code(response.text)
+                    except Exception as e:
+                        st.error(f"Connection error: {str(e)}")
+            
+            # Metrics of the shared Airtable client
+            with st.expander("Airtable Client Metrics"):
+                st.json(client.get_metrics())
     
     elif active_subtab == "date_tools":
         st.header("Date & Time Tools")
@@ -2236,12 +2242,14 @@ def render_content_tab(active_subtab):
             "document"
         )
 
-def analyze_unique_patients(df):
+def analyze_unique_patients(df, source=None, filters=None):
     """
     Analyze unique patients grouped by email and return unique patient counts and service distribution
     
     Args:
         df: DataFrame containing appointment data
+        source: Loaded frame df was filtered from, if any
+        filters: Filter state that selected df from source
         
     Returns:
         unique_patients_df: DataFrame with unique patients
@@ -2250,12 +2258,10 @@ def analyze_unique_patients(df):
     if df.empty or 'Email' not in df.columns:
         return pd.DataFrame(), pd.DataFrame()
     
+    patients = get_patient_dimension(df, source=source, filters=filters)
+    
     # Get unique patients with their most recent appointment
-    unique_patients = (df[["Email", "Customer", "Phone", "Start Date"]]
-                      .sort_values("Start Date", ascending=False)
-                      .groupby("Email")
-                      .first()
-                      .reset_index())
+    unique_patients = patients.latest.reset_index()
     
     # Count total unique patients
     total_unique_patients = len(unique_patients)
@@ -2263,16 +2269,7 @@ def analyze_unique_patients(df):
     # Analyze service distribution per patient
     # Count how many unique services each patient has used
     if 'Service' in df.columns:
-        # Group by email and count unique services
-        services_per_patient = df.groupby('Email')['Service'].nunique().reset_index()
-        services_per_patient.columns = ['Email', 'Service_Count']
-        
-        # Create distribution of service counts
-        service_distribution = services_per_patient['Service_Count'].value_counts().reset_index()
-        service_distribution.columns = ['Number_of_Services', 'Patient_Count']
-        
-        # Sort by number of services
-        service_distribution = service_distribution.sort_values('Number_of_Services')
+        service_distribution = patients.service_distribution()
         
         # Calculate percentage
         service_distribution['Percentage'] = service_distribution['Patient_Count'] / total_unique_patients * 100
@@ -2286,6 +2283,8 @@ def display_phone_validation_output(results_df, summary, results_type="general")
     st.markdown("---")
     st.markdown("#### Validation Results")
     st.dataframe(results_df, use_container_width=True, height=400)
+    if summary and summary.get('total_processed', 0) > len(results_df):
+        st.caption(f"Showing the first {len(results_df):,} of {summary['total_processed']:,} validated rows. Download the results below for every row.")
 
     if summary:
         st.markdown("##### Validation Summary")
@@ -2320,9 +2319,30 @@ def display_phone_validation_output(results_df, summary, results_type="general")
         
         if summary.get('valid', 0) > 0:
             st.markdown("##### Country Analysis of Valid Numbers")
-            valid_numbers_df = results_df[results_df['Validation Status'] == 'Valid'].copy()
+            country_counts = summary.get('country_counts')
+            valid_numbers_df = results_df[results_df['Validation Status'] == 'Valid'].copy() if not country_counts else pd.DataFrame()
             
-            if not valid_numbers_df.empty:
+            if country_counts:
+                # Countries detected while validating (covers every row, not only the displayed ones)
+                display_counts = pd.DataFrame(list(country_counts.items()), columns=['Country', 'Count']).sort_values(by='Count', ascending=False)
+                
+                fig_country_bar = px.bar(
+                    display_counts,
+                    x='Country',
+                    y='Count',
+                    title=f'Phone Numbers by Country ({len(display_counts)} countries found)',
+                    labels={'Count': 'Number of Valid Phones', 'Country': 'Country'},
+                    color='Country'
+                )
+                fig_country_bar.update_layout(
+                    xaxis_title="Country", 
+                    yaxis_title="Number of Valid Phones", 
+                    height=500,
+                    xaxis={'tickangle': -45} # Angled labels for better readability
+                )
+                st.plotly_chart(fig_country_bar, use_container_width=True)
+                st.caption("Country identification is based on phone number formats in your data.")
+            elif not valid_numbers_df.empty:
                 # Extract country information from the "Validation Status" column directly
                 # This ensures we use only the countries actually identified in the data
                 
@@ -2435,13 +2455,49 @@ def display_phone_validation_output(results_df, summary, results_type="general")
     else:
         st.info("Validation summary data is not available.")
 
+    cache_stats = phone_cache_stats()
+    st.caption(f"Phone format cache: {cache_stats['size']:,} numbers cached, {cache_stats['hit_rate']:.0%} hit rate")
+    
     dl_col1, dl_col2 = st.columns(2)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # Streamed validations were written to files as they ran
+    output_path = summary.get('output_path') if summary else None
+    if output_path and os.path.exists(output_path):
+        with dl_col1:
+            with open(output_path, 'rb') as results_file:
+                st.download_button(
+                    label="Download All Results (CSV)",
+                    data=results_file,
+                    file_name=f"phone_validation_all_results_{results_type}_{timestamp}.csv",
+                    mime="text/csv",
+                    type="primary",
+                    use_container_width=True,
+                    key=f"download_phone_all_results_{results_type}"
+                )
+        with dl_col2:
+            valid_output_path = summary.get('valid_output_path')
+            if summary.get('valid', 0) > 0 and valid_output_path and os.path.exists(valid_output_path):
+                with open(valid_output_path, 'rb') as valid_file:
+                    st.download_button(
+                        label="Download Valid Numbers Only (CSV)",
+                        data=valid_file,
+                        file_name=f"phone_validation_valid_only_{results_type}_{timestamp}.csv",
+                        mime="text/csv",
+                        type="secondary",
+                        use_container_width=True,
+                        key=f"download_phone_valid_only_{results_type}"
+                    )
+            else:
+                st.button("Download Valid Numbers Only (CSV)", disabled=True, use_container_width=True, help="No valid phone numbers found to download.", key=f"download_phone_valid_disabled_{results_type}")
+        return
+    
     with dl_col1:
         csv_all = results_df.to_csv(index=False).encode('utf-8')
         st.download_button(
             label="Download All Results (CSV)",
             data=csv_all,
-            file_name=f"phone_validation_all_results_{results_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            file_name=f"phone_validation_all_results_{results_type}_{timestamp}.csv",
             mime="text/csv",
             type="primary",
             use_container_width=True,
@@ -2454,7 +2510,7 @@ def display_phone_validation_output(results_df, summary, results_type="general")
             st.download_button(
                 label="Download Valid Numbers Only (CSV)",
                 data=csv_valid,
-                file_name=f"phone_validation_valid_only_{results_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                file_name=f"phone_validation_valid_only_{results_type}_{timestamp}.csv",
                 mime="text/csv",
                 type="secondary",
                 use_container_width=True,
@@ -2472,7 +2528,8 @@ def render_outlook_import_prep_tool():
         create_status_chart, 
         create_country_chart,
         create_duplicate_chart,
-        prepare_outlook_contacts
+        prepare_outlook_contacts,
+        get_contact_index
     )
     
     st.header("Outlook Contact Import Preparation Tool")
@@ -2489,6 +2546,7 @@ def render_outlook_import_prep_tool():
             <li>Validate and format phone numbers for selected countries</li>
             <li>Detect duplicate contacts by phone, email, and name</li>
             <li>Find similar names using fuzzy matching</li>
+            <li>Flag contacts already exported by earlier runs</li>
             <li>Export in Outlook-compatible format</li>
         </ul>
     </div>
@@ -2506,13 +2564,26 @@ def render_outlook_import_prep_tool():
         else:
             fuzzy_threshold = 85
     
+    check_existing = st.checkbox("Check against previously exported contacts", value=True,
+                                 help="Flag contacts that were already exported for Outlook, and remember the contacts you export")
+    contact_index = get_contact_index() if check_existing else None
+    
+    if contact_index is not None:
+        with st.expander("Exported contacts index"):
+            index_stats = contact_index.stats()
+            st.caption(f"{index_stats['contacts']:,} contacts indexed ({index_stats['file_bytes'] / 1024 / 1024:.1f} MB)")
+            if st.button("Clear exported contacts index", key="outlook_import_clear_index"):
+                contact_index.clear()
+                st.success("Exported contacts index cleared")
+    
     uploaded_file = st.file_uploader("Choose a contacts file", type=["csv", "xlsx", "xls"],
                                     key="outlook_import_file_uploader",
                                     help="Upload a CSV or Excel file with your contacts")
     
     if uploaded_file is not None:
         with st.spinner("Processing your file..."):
-            result, error = process_contacts_file(uploaded_file, fuzzy_match=enable_fuzzy, fuzzy_threshold=fuzzy_threshold)
+            result, error = process_contacts_file(uploaded_file, fuzzy_match=enable_fuzzy, fuzzy_threshold=fuzzy_threshold,
+                                                  contact_index=contact_index)
         
         if error:
             st.error(error)
@@ -2520,15 +2591,19 @@ def render_outlook_import_prep_tool():
             # Display statistics
             st.success("File processed successfully!")
             
-            col1, col2, col3, col4, col5 = st.columns(5)
+            col1, col2, col3, col4, col5, col6 = st.columns(6)
             col1.metric("Total Contacts", result['stats']['total'])
             col2.metric("Valid Phone Numbers", result['stats']['valid'])
             col3.metric("Invalid Numbers", result['stats']['invalid'])
             col4.metric("Duplicates", result['stats']['duplicates'])
             col5.metric("Unique Valid Contacts", result['stats']['unique_valid'])
+            col6.metric("Already in Outlook", result['stats']['existing'] if contact_index is not None else "-")
+            
+            # Exported contacts are remembered so later uploads can be checked against them
+            on_export = contact_index.add_contacts if contact_index is not None else None
             
             # Create tabs for different views
-            tab1, tab2, tab3, tab4, tab5 = st.tabs(["Overview", "Valid Contacts", "Invalid Contacts", "Duplicates", "All Contacts"])
+            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Overview", "Valid Contacts", "Invalid Contacts", "Duplicates", "Already in Outlook", "All Contacts"])
             
             with tab1:
                 st.subheader("Phone Number Analysis")
@@ -2567,22 +2642,31 @@ def render_outlook_import_prep_tool():
                             label="Download All Valid Contacts for Outlook",
                             data=outlook_contacts.to_csv(index=False),
                             file_name="outlook_contacts_all.csv",
-                            mime="text/csv"
+                            mime="text/csv",
+                            on_click=on_export,
+                            args=(result['valid'], result['columns'])
                         )
                         st.caption("File is formatted for direct import into Outlook")
                     
                     with col2:
                         # Download only unique valid contacts
                         unique_valid = result['valid'][~result['valid']['Is Duplicate']]
+                        if contact_index is not None:
+                            unique_valid = unique_valid[~unique_valid['In Outlook']]
                         if not unique_valid.empty:
                             unique_outlook_contacts = prepare_outlook_contacts(unique_valid)
                             st.download_button(
                                 label="Download Unique Valid Contacts for Outlook",
                                 data=unique_outlook_contacts.to_csv(index=False),
                                 file_name="outlook_contacts_unique.csv",
-                                mime="text/csv"
+                                mime="text/csv",
+                                on_click=on_export,
+                                args=(unique_valid, result['columns'])
                             )
-                            st.caption("Contains only unique contacts, removes duplicates")
+                            if contact_index is not None:
+                                st.caption("Contains only unique contacts, removes duplicates and contacts already in Outlook")
+                            else:
+                                st.caption("Contains only unique contacts, removes duplicates")
             
             with tab2:
                 if result['valid'].empty:
@@ -2642,6 +2726,22 @@ def render_outlook_import_prep_tool():
                     )
             
             with tab5:
+                if contact_index is None:
+                    st.info("Enable the check against previously exported contacts to see contacts already in Outlook.")
+                elif result['existing'].empty:
+                    st.success("None of these contacts were exported before.")
+                else:
+                    st.write(f"Found {len(result['existing'])} contacts that were already exported for Outlook")
+                    st.dataframe(result['existing'], use_container_width=True)
+                    
+                    st.download_button(
+                        label="Download Existing Contacts CSV",
+                        data=result['existing'].to_csv(index=False),
+                        file_name="existing_contacts.csv",
+                        mime="text/csv"
+                    )
+            
+            with tab6:
                 st.write("All processed contacts")
                 st.dataframe(result['all'], use_container_width=True)
                 
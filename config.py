@@ -77,12 +77,39 @@ AIRTABLE_CONFIG = {
     'API_URL': 'https://api.airtable.com/v0'
 }
 
+# Airtable rate limiting (documented limit is 5 requests per second per base; a 429 blocks the base for 30 seconds)
+AIRTABLE_RATE_LIMIT = float(os.getenv("AIRTABLE_RATE_LIMIT", "5"))
+AIRTABLE_RATE_LIMIT_PENALTY = int(os.getenv("AIRTABLE_RATE_LIMIT_PENALTY", "30"))
+
+# Pooled HTTP connections kept open to the Airtable API
+AIRTABLE_POOL_SIZE = int(os.getenv("AIRTABLE_POOL_SIZE", "10"))
+
+# Disk cache for Airtable responses (fresh for the TTL, then served stale while refreshing in the background)
+AIRTABLE_CACHE_PATH = os.getenv("AIRTABLE_CACHE_PATH", os.path.join(".cache", "airtable_cache.sqlite"))
+AIRTABLE_CACHE_TTL = int(os.getenv("AIRTABLE_CACHE_TTL", "3600"))
+AIRTABLE_CACHE_MAX_AGE = int(os.getenv("AIRTABLE_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# Incremental Airtable sync (seconds between record-ID sweeps that detect deletions)
+AIRTABLE_SYNC_SWEEP_INTERVAL = int(os.getenv("AIRTABLE_SYNC_SWEEP_INTERVAL", "900"))
+
+# Local index of contacts exported for Outlook (checked by the import prep tool to flag contacts already imported)
+CONTACT_INDEX_PATH = os.getenv("CONTACT_INDEX_PATH", os.path.join(".cache", "contact_index.sqlite"))
+
 # Specific Airtable Bases
 AIRTABLE_BASES = {
     'SOW': {
         'BASE_ID': 'appQuoOqTLlUsPfYm',
         'TABLE_ID': 'tblznIpP01lAlbbGx',
-        'TABLE_NAME': 'SOW'
+        'TABLE_NAME': 'SOW',
+        # Field returned by record-ID sweeps of unprojected queries (keeps the sweep payload small)
+        'SWEEP_FIELD': 'ScheduledEndDate',
+        # Column dtypes by field name (the SOW base has no field ID map)
+        'FIELD_TYPES': {
+            'ScheduledPlanningStartDate': 'datetime',
+            'ScheduledEndDate': 'datetime',
+            'ActualPlanningStartDate': 'datetime',
+            'ActualEndDate': 'datetime'
+        }
     },
     'UTILIZATION': {
         'BASE_ID': 'appJRwD6KL1MWi2Md',
@@ -104,6 +131,42 @@ AIRTABLE_BASES = {
             'MSK': 'fld7Eu23UBQHLQ4Up',
             'SKIN_SCREENING': 'fldkTAUWBHwqejp5B',
             'BIOMETRICS_AND_LABS': 'fldPr31M8RkcRU95E'
+        },
+        # Dashboard column names for each field key (used when fields are returned by ID)
+        'COLUMN_NAMES': {
+            'CLIENT': 'Client',
+            'SITE': 'Site',
+            'DATE_OF_SERVICE': 'Date of Service',
+            'YEAR': 'Year',
+            'HEADCOUNT': 'Headcount',
+            'WALKINS': 'Walkins',
+            'INTERESTED_PATIENTS': 'Interested Patients',
+            'TOTAL_BOOKING_APPTS': 'Total Booking Appts',
+            'TOTAL_COMPLETED_APPTS': 'Total Completed Appts',
+            'DENTAL': 'Dental',
+            'AUDIOLOGY': 'Audiology',
+            'VISION': 'Vision',
+            'MSK': 'MSK',
+            'SKIN_SCREENING': 'Skin Screening',
+            'BIOMETRICS_AND_LABS': 'Biometrics and Labs'
+        },
+        # Column dtypes for each field key (category, float32, float64, datetime or list)
+        'FIELD_TYPES': {
+            'CLIENT': 'category',
+            'SITE': 'category',
+            'DATE_OF_SERVICE': 'datetime',
+            'YEAR': 'category',
+            'HEADCOUNT': 'float32',
+            'WALKINS': 'float32',
+            'INTERESTED_PATIENTS': 'float32',
+            'TOTAL_BOOKING_APPTS': 'float32',
+            'TOTAL_COMPLETED_APPTS': 'float32',
+            'DENTAL': 'float32',
+            'AUDIOLOGY': 'float32',
+            'VISION': 'float32',
+            'MSK': 'float32',
+            'SKIN_SCREENING': 'float32',
+            'BIOMETRICS_AND_LABS': 'float32'
         }
     },
     'PNL': {
@@ -127,6 +190,44 @@ AIRTABLE_BASES = {
             'NET_PROFIT': 'fldgUJQhTxLd8xKw9',
             'NET_PROFIT_PERCENT': 'fldJGQ4NECEO8e8uW',
             'LAST_MODIFIED': 'fldVxMqI3Azfhlp1X'
+        },
+        # Dashboard column names for each field key (used when fields are returned by ID)
+        'COLUMN_NAMES': {
+            'CLIENT': 'Client',
+            'SITE_LOCATION': 'Site_Location',
+            'SERVICE_DAYS': 'Service_Days',
+            'SERVICE_MONTH': 'Service_Month',
+            'REVENUE_WELLNESS_FUND': 'Revenue_WellnessFund',
+            'REVENUE_DENTAL_CLAIM': 'Revenue_DentalClaim',
+            'REVENUE_MEDICAL_CLAIM': 'Revenue_MedicalClaim_InclCancelled',
+            'REVENUE_EVENT_TOTAL': 'Revenue_EventTotal',
+            'REVENUE_MISSED_APPOINTMENTS': 'Revenue_MissedAppointments',
+            'REVENUE_TOTAL': 'Revenue_Total',
+            'REVENUE_PER_DAY_AVG': 'Revenue_PerDay_Avg',
+            'EXPENSE_COGS_TOTAL': 'Expense_COGS_Total',
+            'EXPENSE_COGS_PER_DAY_AVG': 'Expense_COGS_PerDay_Avg',
+            'NET_PROFIT': 'Net_Profit',
+            'NET_PROFIT_PERCENT': 'Net_Profit_%',
+            'LAST_MODIFIED': 'Last Modified'
+        },
+        # Column dtypes for each field key (currency stays float64 so totals keep their cents)
+        'FIELD_TYPES': {
+            'CLIENT': 'list',
+            'SITE_LOCATION': 'list',
+            'SERVICE_DAYS': 'float32',
+            'SERVICE_MONTH': 'datetime',
+            'REVENUE_WELLNESS_FUND': 'float64',
+            'REVENUE_DENTAL_CLAIM': 'float64',
+            'REVENUE_MEDICAL_CLAIM': 'float64',
+            'REVENUE_EVENT_TOTAL': 'float64',
+            'REVENUE_MISSED_APPOINTMENTS': 'float64',
+            'REVENUE_TOTAL': 'float64',
+            'REVENUE_PER_DAY_AVG': 'float64',
+            'EXPENSE_COGS_TOTAL': 'float64',
+            'EXPENSE_COGS_PER_DAY_AVG': 'float64',
+            'NET_PROFIT': 'float64',
+            'NET_PROFIT_PERCENT': 'float32',
+            'LAST_MODIFIED': 'datetime'
         }
     },
     'KPI': {
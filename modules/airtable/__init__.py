@@ -1,15 +1,31 @@
 # This file makes the airtable directory a Python package
+from modules.airtable.client import AirtableClient, AirtableError, get_airtable_client
+from modules.airtable.cache import AirtableResponseCache, get_response_cache, clear_airtable_cache
 from modules.airtable.fetch import fetch_from_airtable
+from modules.airtable.schema import get_base_schema, resolve_columns
+from modules.airtable.sync import sync_from_airtable, clear_sync_state
 from modules.airtable.utilization import get_utilization_data
 from modules.airtable.pnl import get_pnl_data
 from modules.airtable.sow import get_sow_data
 from modules.airtable.kpi import get_kpi_data, calculate_performance_score
+from modules.airtable.parallel import load_in_parallel
 
 __all__ = [
+    'AirtableClient',
+    'AirtableError',
+    'get_airtable_client',
+    'AirtableResponseCache',
+    'get_response_cache',
+    'clear_airtable_cache',
     'fetch_from_airtable',
+    'get_base_schema',
+    'resolve_columns',
+    'sync_from_airtable',
+    'clear_sync_state',
     'get_utilization_data',
     'get_pnl_data',
     'get_sow_data',
     'get_kpi_data',
-    'calculate_performance_score'
+    'calculate_performance_score',
+    'load_in_parallel'
 ] 
\ No newline at end of file
@@ -0,0 +1,193 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from config import AIRTABLE_CACHE_PATH, AIRTABLE_CACHE_TTL, AIRTABLE_CACHE_MAX_AGE
+
+class AirtableResponseCache:
+    """
+    SQLite-backed cache for Airtable responses that survives restarts
+    
+    Entries are keyed by base, table and query parameters and stored as
+    compressed JSON. Entries younger than the TTL are fresh; older entries are
+    still served, but the caller should refresh them in the background.
+    Entries older than max_age are pruned.
+    """
+    
+    def __init__(self, path=AIRTABLE_CACHE_PATH, ttl=AIRTABLE_CACHE_TTL, max_age=AIRTABLE_CACHE_MAX_AGE):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    base_key TEXT,
+                    payload BLOB,
+                    size INTEGER,
+                    created REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created)")
+        
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0}
+    
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connection that commits on success (rolls back on error) and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+    
+    @staticmethod
+    def make_key(*parts):
+        """Build a stable cache key from JSON-serializable parts"""
+        raw = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """
+        Read an entry without touching the hit statistics
+        
+        Returns:
+            Tuple of (value, age_seconds), or None if the key isn't cached
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload, created FROM responses WHERE key = ?", (key,)).fetchone()
+        
+        if row is None:
+            return None
+        
+        payload, created = row
+        return json.loads(zlib.decompress(payload)), time.time() - created
+    
+    def lookup(self, key):
+        """
+        Read an entry and record a hit, stale hit or miss
+        
+        Returns:
+            Tuple of (value, is_fresh); value is None on a miss
+        """
+        entry = self.get(key)
+        
+        if entry is None:
+            self._count('misses')
+            return None, False
+        
+        value, age = entry
+        fresh = age < self.ttl
+        self._count('hits' if fresh else 'stale_hits')
+        return value, fresh
+    
+    def set(self, key, value, base_key=''):
+        """Store an entry and prune entries older than max_age"""
+        payload = zlib.compress(json.dumps(value, default=str).encode('utf-8'))
+        now = time.time()
+        
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, base_key, payload, size, created) VALUES (?, ?, ?, ?, ?)",
+                (key, base_key, payload, len(payload), now)
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+    
+    def refresh_in_background(self, key, fetch, base_key=''):
+        """
+        Re-fetch a stale entry on a daemon thread
+        
+        Args:
+            key: Cache key to refresh
+            fetch: Zero-argument callable returning the new value (must not use Streamlit UI)
+            base_key: Base the entry belongs to (for the admin view)
+            
+        Returns:
+            False if a refresh for this key is already running
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+        
+        def run():
+            try:
+                value = fetch()
+                if value is not None:
+                    self.set(key, value, base_key)
+                    self._count('refreshes')
+            except Exception:
+                self._count('refresh_errors')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        threading.Thread(target=run, daemon=True).start()
+        return True
+    
+    def clear(self, base_key=None):
+        """Delete cached entries (every base if base_key is None)"""
+        with self._connect() as conn:
+            if base_key is None:
+                conn.execute("DELETE FROM responses")
+            else:
+                conn.execute("DELETE FROM responses WHERE base_key = ?", (base_key,))
+    
+    def stats(self):
+        """Cache size and hit statistics for the admin view"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT base_key, COUNT(*), COALESCE(SUM(size), 0) FROM responses GROUP BY base_key"
+            ).fetchall()
+        
+        with self._lock:
+            stats = dict(self._stats)
+            stats['refreshing'] = len(self._refreshing)
+        
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        stats['entries'] = sum(count for _, count, _ in rows)
+        stats['payload_bytes'] = sum(size for _, _, size in rows)
+        stats['file_bytes'] = sum(
+            os.path.getsize(path) for path in (self.path, self.path + '-wal') if os.path.exists(path)
+        )
+        stats['by_base'] = {base_key or 'Other': {'entries': count, 'payload_bytes': size} for base_key, count, size in rows}
+        return stats
+
+# One cache per process; the SQLite file is shared by every worker
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Get the shared Airtable response cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AirtableResponseCache()
+        return _cache
+
+def clear_airtable_cache(base_key=None):
+    """
+    Delete cached Airtable responses so the next load goes to the API
+    
+    Args:
+        base_key: Only clear this base (clears every base if None)
+    """
+    get_response_cache().clear(base_key)
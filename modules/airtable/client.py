@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+from config import AIRTABLE_CONFIG, AIRTABLE_POOL_SIZE
+from modules.airtable.ratelimit import get_rate_limiter
+
+class AirtableError(Exception):
+    """Raised when Airtable answers with a non-success status code"""
+    
+    def __init__(self, status_code, message=''):
+        super().__init__(f"Airtable returned status code {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+
+class AirtableClient:
+    """
+    Shared Airtable API client
+    
+    Keeps one pooled requests.Session so TLS connections are reused across pages,
+    resolves credentials, paces every request through the per-base rate limiter,
+    retries failures, follows pagination and records request metrics.
+    """
+    
+    def __init__(self, api_url=AIRTABLE_CONFIG['API_URL'], pool_size=AIRTABLE_POOL_SIZE):
+        self.api_url = api_url.rstrip('/')
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        
+        self._metrics_lock = threading.Lock()
+        self.reset_metrics()
+    
+    def resolve_api_key(self, api_key=None):
+        """Resolve the API key: explicit value, then session state, then config"""
+        return api_key or st.session_state.get('airtable_api_key') or AIRTABLE_CONFIG['API_KEY']
+    
+    def resolve_base_id(self, base_id=None):
+        """Resolve the default base ID: explicit value, then session state, then config"""
+        return base_id or st.session_state.get('airtable_base_id') or AIRTABLE_CONFIG['BASE_ID']
+    
+    def _record(self, **increments):
+        """Add to the metric counters"""
+        with self._metrics_lock:
+            for name, value in increments.items():
+                self._metrics[name] += value
+    
+    def reset_metrics(self):
+        """Reset the request metrics"""
+        with self._metrics_lock:
+            self._metrics = {
+                'requests': 0,
+                'retries': 0,
+                'rate_limited': 0,
+                'errors': 0,
+                'records': 0,
+                'bytes_received': 0,
+                'request_seconds': 0.0
+            }
+    
+    def get_metrics(self):
+        """Snapshot of the request metrics"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['avg_request_ms'] = (
+            metrics['request_seconds'] / metrics['requests'] * 1000 if metrics['requests'] else 0.0
+        )
+        return metrics
+    
+    async def request_async(self, method, path, retry_attempts=3, timeout=30, api_key=None, **kwargs):
+        """
+        Send a rate-limited request to Airtable
+        
+        Waits for the base's limiter before every attempt. A 429 applies the penalty
+        backoff to the base and retries; network errors and 5xx responses are retried
+        with exponential backoff for idempotent methods only, so a POST is never
+        replayed after Airtable may have processed it. All waits are awaited, never slept.
+        
+        Args:
+            method: HTTP method ('GET', 'POST', 'PATCH', ...)
+            path: Path below the API URL, starting with the base ID (e.g. 'appXXX/tblYYY')
+            retry_attempts: Number of attempts before giving up
+            timeout: Request timeout in seconds
+            api_key: Optional API key (resolved from session state or config otherwise)
+            **kwargs: Passed through to requests (params, json)
+            
+        Returns:
+            The last requests.Response received
+        """
+        path = path.strip('/')
+        url = f"{self.api_url}/{path}"
+        headers = {'Authorization': f'Bearer {self.resolve_api_key(api_key)}'}
+        
+        limiter = get_rate_limiter(path.split('/')[0])
+        idempotent = method.upper() in ('GET', 'PATCH', 'PUT', 'DELETE')
+        
+        for attempt in range(retry_attempts):
+            if attempt > 0:
+                self._record(retries=1)
+            
+            await limiter.acquire()
+            
+            start_time = time.time()
+            try:
+                response = await asyncio.to_thread(
+                    lambda: self.session.request(method=method, url=url, headers=headers, timeout=timeout, **kwargs)
+                )
+            except requests.exceptions.RequestException:
+                self._record(requests=1, errors=1, request_seconds=time.time() - start_time)
+                if not idempotent or attempt == retry_attempts - 1:  # Last attempt
+                    raise
+                await asyncio.sleep(2 ** attempt)
+                continue
+            
+            self._record(
+                requests=1,
+                bytes_received=len(response.content),
+                request_seconds=time.time() - start_time
+            )
+            
+            if response.status_code == 429:
+                # The next acquire() waits out the penalty for every caller on this base
+                self._record(rate_limited=1)
+                limiter.penalize()
+                if attempt < retry_attempts - 1:
+                    continue
+            elif response.status_code >= 500 and idempotent and attempt < retry_attempts - 1:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            
+            break
+        
+        if response.status_code >= 400:
+            self._record(errors=1)
+        
+        return response
+    
+    def request(self, method, path, retry_attempts=3, timeout=30, api_key=None, **kwargs):
+        """Synchronous wrapper around request_async for Streamlit callers"""
+        return asyncio.run(self.request_async(method, path, retry_attempts, timeout, api_key, **kwargs))
+    
+    async def list_records_async(self, base_id, table, params=None, retry_attempts=3, api_key=None, on_page=None):
+        """
+        Follow Airtable pagination and collect every record for a query
+        
+        Args:
+            base_id: Airtable base ID
+            table: Table ID or name
+            params: Query parameters (not modified)
+            retry_attempts: Number of retry attempts per page
+            api_key: Optional API key
+            on_page: Optional callback called with (page_number, records_on_page)
+            
+        Returns:
+            List of records
+            
+        Raises:
+            AirtableError: If Airtable answers a page with a non-200 status
+        """
+        params = dict(params or {})
+        
+        all_records = []
+        page = 1
+        
+        while True:
+            response = await self.request_async(
+                'GET', f"{base_id}/{table}", retry_attempts, api_key=api_key, params=params
+            )
+            
+            if response.status_code != 200:
+                raise AirtableError(response.status_code, response.text)
+            
+            data = response.json()
+            records = data.get('records', [])
+            all_records.extend(records)
+            self._record(records=len(records))
+            
+            if on_page is not None:
+                on_page(page, len(records))
+            
+            # Check if there are more records
+            if 'offset' not in data:
+                break
+            
+            params['offset'] = data['offset']
+            page += 1
+        
+        return all_records
+    
+    def list_records(self, base_id, table, params=None, retry_attempts=3, api_key=None, on_page=None):
+        """Synchronous wrapper around list_records_async"""
+        return asyncio.run(self.list_records_async(base_id, table, params, retry_attempts, api_key, on_page))
+
+# One client (and connection pool) per process, shared by every Airtable module
+_client = None
+_client_lock = threading.Lock()
+
+def get_airtable_client():
+    """Get the shared Airtable client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AirtableClient()
+        return _client
@@ -1,26 +1,70 @@
 import streamlit as st
 import requests
+import asyncio
 import time
 from datetime import datetime
-from config import AIRTABLE_BASES, AIRTABLE_CONFIG
+from config import AIRTABLE_BASES
+from modules.airtable.client import AirtableError, get_airtable_client
+from modules.airtable.cache import get_response_cache
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def fetch_from_airtable(base_key, query_params=None, retry_attempts=3, cache_key=None):
+# Airtable returns at most 100 records per page
+AIRTABLE_PAGE_SIZE = 100
+
+def formula_value(value):
+    """Quote a value for use inside an Airtable formula string literal"""
+    text = str(value).replace('\\', '\\\\').replace("'", "\\'")
+    return f"'{text}'"
+
+def field_ref(field_id):
+    """Reference a field by ID inside an Airtable formula"""
+    return f"{{{field_id}}}"
+
+def combine_formulas(formulas):
+    """Combine formula clauses with AND, returning None when there are none"""
+    formulas = [f for f in (formulas or []) if f]
+    if not formulas:
+        return None
+    if len(formulas) == 1:
+        return formulas[0]
+    return f"AND({','.join(formulas)})"
+
+def build_query_params(field_ids=None, formulas=None, max_records=1000):
     """
-    Fetch data from a specific Airtable base defined in AIRTABLE_BASES
+    Build Airtable list-records query parameters
     
     Args:
-        base_key: Key of the base in AIRTABLE_BASES (e.g., 'SOW', 'UTILIZATION', 'PNL')
-        query_params: Dictionary of query parameters to include in the request
-        retry_attempts: Number of retry attempts for failed requests
-        cache_key: Optional custom cache key for fine-grained cache control
+        field_ids: Field IDs to return (fields are then keyed by ID in the response)
+        formulas: List of filterByFormula clauses, combined with AND
+        max_records: Maximum number of records to return
         
     Returns:
-        Dictionary containing the API response
+        Dictionary of query parameters for fetch_from_airtable
     """
-    # Record start time for performance tracking
-    start_time = time.time()
+    params = {'pageSize': AIRTABLE_PAGE_SIZE}
+    
+    if max_records:
+        params['maxRecords'] = max_records
+    
+    if field_ids:
+        params['fields[]'] = list(field_ids)
+        params['returnFieldsByFieldId'] = 'true'
+    
+    formula = combine_formulas(formulas)
+    if formula:
+        params['filterByFormula'] = formula
+    
+    return params
+
+def get_base_request(base_key):
+    """
+    Resolve the base ID, table ID and display name for a base defined in AIRTABLE_BASES
     
+    Args:
+        base_key: Key of the base in AIRTABLE_BASES (e.g., 'SOW', 'UTILIZATION', 'PNL')
+        
+    Returns:
+        Tuple of (base_id, table_id, table_name), or None if the base or credentials are missing
+    """
     if base_key not in AIRTABLE_BASES:
         st.error(f"❌ Base key '{base_key}' not found in AIRTABLE_BASES configuration")
         return None
@@ -31,101 +75,150 @@ def fetch_from_airtable(base_key, query_params=None, retry_attempts=3, cache_key
     table_name = base_info.get('TABLE_NAME', 'Unknown Table')
     
     # Get API credentials
-    api_key = st.session_state.get('airtable_api_key', AIRTABLE_CONFIG['API_KEY'])
+    api_key = get_airtable_client().resolve_api_key()
     
     if not api_key or not base_id:
         st.error("❌ Airtable credentials not configured. Please set them up in the integration settings.")
         return None
     
-    # Prepare headers
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
+    return base_id, table_id, table_name
+
+async def fetch_all_pages_async(base_id, table_id, params, retry_attempts=3, progress_bar=None, status_text=None):
+    """
+    Collect every record for a query through the shared Airtable client
     
-    # Create URL
-    url = f"{AIRTABLE_CONFIG['API_URL']}/{base_id}/{table_id}"
+    Args:
+        base_id: Airtable base ID
+        table_id: Table ID or name
+        params: Query parameters (not modified)
+        retry_attempts: Number of retry attempts for failed requests
+        progress_bar: Optional st.progress element to update
+        status_text: Optional st.empty element for status messages
+        
+    Returns:
+        List of records, or None if Airtable returned an error
+    """
+    page_size = params.get('pageSize', AIRTABLE_PAGE_SIZE)
+    total_pages_est = 1  # Initial estimate, will be updated
     
-    # Add query parameters if provided
-    params = query_params or {}
+    def on_page(page, records_count):
+        nonlocal total_pages_est
+        
+        # If the first page is full there might be more pages
+        if page == 1 and records_count == page_size:
+            total_pages_est = max(5, total_pages_est)  # At least 5 pages as a conservative estimate
+        
+        # Update progress
+        if progress_bar is not None:
+            progress = min(0.9, page / total_pages_est) if total_pages_est > 0 else 0.5
+            progress_bar.progress(progress)
+        if status_text is not None:
+            status_text.text(f"Fetched page {page} with {records_count} records...")
+    
+    try:
+        return await get_airtable_client().list_records_async(
+            base_id, table_id, params, retry_attempts, on_page=on_page
+        )
+    except AirtableError as e:
+        st.error(f"❌ Error fetching data from Airtable: Status code {e.status_code}")
+        return None
+
+def fetch_all_pages(base_id, table_id, params, retry_attempts=3, progress_bar=None, status_text=None):
+    """Synchronous wrapper around fetch_all_pages_async"""
+    return asyncio.run(fetch_all_pages_async(base_id, table_id, params, retry_attempts, progress_bar, status_text))
+
+def fetch_from_airtable(base_key, query_params=None, retry_attempts=3, cache_key=None, sync=False):
+    """
+    Fetch data from a specific Airtable base defined in AIRTABLE_BASES
+    
+    Args:
+        base_key: Key of the base in AIRTABLE_BASES (e.g., 'SOW', 'UTILIZATION', 'PNL')
+        query_params: Dictionary of query parameters to include in the request
+        retry_attempts: Number of retry attempts for failed requests
+        cache_key: Optional custom cache key for fine-grained cache control
+            (responses are cached on disk, see modules.airtable.cache)
+        sync: Keep a local copy of the table and only fetch records changed since
+            the previous call (see modules.airtable.sync)
+        
+    Returns:
+        Dictionary containing the API response
+    """
+    if sync:
+        from modules.airtable.sync import sync_from_airtable
+        return sync_from_airtable(base_key, query_params, retry_attempts)
+    
+    # The base/table IDs are part of the key because callers may point a base key
+    # at a different table for a single request
+    base_config = AIRTABLE_BASES.get(base_key, {})
+    base_id = base_config.get('BASE_ID')
+    table_id = base_config.get('TABLE_ID') or base_config.get('TABLE_NAME')
+    
+    cache = get_response_cache()
+    key = cache.make_key('fetch', base_id, table_id, query_params or {}, cache_key)
+    cached, fresh = cache.lookup(key)
+    
+    if cached is not None:
+        if not fresh:
+            # Serve the stale copy now and refresh it for the next rerun
+            api_key = get_airtable_client().resolve_api_key()
+            if api_key and base_id and table_id:
+                cache.refresh_in_background(
+                    key,
+                    lambda: _fetch_quietly(base_id, table_id, query_params, retry_attempts, api_key),
+                    base_key
+                )
+        return cached
+    
+    response = _fetch_from_airtable_uncached(base_key, query_params, retry_attempts)
+    if response is not None:
+        cache.set(key, response, base_key)
+    return response
+
+def _prepare_params(query_params):
+    """Copy query parameters and apply the default record limit and page size"""
+    # Copied so paging doesn't mutate the caller's dict
+    params = dict(query_params or {})
     
     # Set a higher record limit (default to 1000 instead of 100)
     if 'maxRecords' not in params:
         params['maxRecords'] = 1000
+    
+    # Request full pages explicitly
+    if 'pageSize' not in params:
+        params['pageSize'] = AIRTABLE_PAGE_SIZE
+    
+    return params
+
+def _fetch_quietly(base_id, table_id, query_params, retry_attempts, api_key):
+    """Full fetch without Streamlit UI, used for background cache refreshes"""
+    records = get_airtable_client().list_records(
+        base_id, table_id, _prepare_params(query_params), retry_attempts, api_key=api_key
+    )
+    return {'records': records}
+
+def _fetch_from_airtable_uncached(base_key, query_params=None, retry_attempts=3):
+    """Full fetch with progress reporting, used by fetch_from_airtable on a cache miss"""
+    # Record start time for performance tracking
+    start_time = time.time()
+    
+    request_info = get_base_request(base_key)
+    if request_info is None:
+        return None
+    base_id, table_id, table_name = request_info
+    
+    params = _prepare_params(query_params)
 
     try:
         # Create a progress bar for fetching
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        # Initialize records list and offset
-        all_records = []
-        offset = None
-        page = 1
-        total_pages_est = 1  # Initial estimate, will be updated
-        
         # Use pagination to fetch all records
         with st.spinner(f"📊 Fetching data from {table_name}..."):
-            while True:
-                # Add offset to params if we have one
-                if offset:
-                    params['offset'] = offset
-                
-                # Retry logic
-                for attempt in range(retry_attempts):
-                    try:
-                        # Update status
-                        status_text.text(f"Fetching page {page} (attempt {attempt+1}/{retry_attempts})...")
-                        
-                        # Make the request
-                        response = requests.get(url, headers=headers, params=params, timeout=30)
-                        
-                        # Break if successful
-                        if response.status_code == 200:
-                            break
-                        
-                        # Wait before retrying (exponential backoff)
-                        time.sleep(2 ** attempt)
-                    except requests.exceptions.RequestException as e:
-                        if attempt == retry_attempts - 1:  # Last attempt
-                            raise
-                        time.sleep(2 ** attempt)  # Wait before retrying
-                
-                # Check if the request was successful
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Add records to our list
-                    if 'records' in data:
-                        records_count = len(data.get('records', []))
-                        all_records.extend(data['records'])
-                        
-                        # Estimate total pages based on first page
-                        if page == 1 and records_count > 0:
-                            # If we got the max records per page, there might be more pages
-                            if records_count == params['maxRecords']:
-                                # Rough estimate based on first page size
-                                total_pages_est = max(5, total_pages_est)  # At least 5 pages as a conservative estimate
-                        
-                        # Update progress
-                        progress = min(0.9, page / total_pages_est) if total_pages_est > 0 else 0.5
-                        progress_bar.progress(progress)
-                        status_text.text(f"Fetched page {page} with {records_count} records...")
-                        
-                        # Check if there are more records
-                        if 'offset' in data:
-                            offset = data['offset']
-                            page += 1
-                        else:
-                            # No more records
-                            break
-                    else:
-                        # No records in response
-                        break
-                else:
-                    error_msg = f"Error fetching data from Airtable: Status code {response.status_code}"
-                    st.error(f"❌ {error_msg}")
-                    return None
+            all_records = fetch_all_pages(base_id, table_id, params, retry_attempts, progress_bar, status_text)
+        
+        if all_records is None:
+            return None
         
         # Clear the temporary status message
         status_text.empty()
@@ -156,4 +249,4 @@ def fetch_from_airtable(base_key, query_params=None, retry_attempts=3, cache_key
     except Exception as e:
         # Handle other unexpected errors
         st.error(f"❌ Unexpected error when fetching from Airtable: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
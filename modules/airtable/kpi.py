@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-from modules.airtable.fetch import fetch_from_airtable
-from config import AIRTABLE_CONFIG
+from modules.airtable.client import get_airtable_client
+from modules.airtable.fetch import fetch_from_airtable, build_query_params, field_ref, formula_value
+from modules.utils.data_processing import airtable_to_dataframe, primary_list_value
 
 # Add the KPI table to the AIRTABLE_BASES in config.py if needed
 KPI_TABLE_ID = "tblzlzDIB1HuNIdgw"
@@ -22,6 +22,29 @@ KPI_FIELDS = {
     'IF_NO_WHY': 'fldtUCvGpspiqmSWz'
 }
 
+# Fields read by get_kpi_data (everything else is left on the server)
+KPI_QUERY_FIELDS = [
+    'SELECT', 'TAGS', 'DATE', 'EARGYM_PROMOTION', 'CROSSBOOKING', 'BOTD_EOD_FILLED',
+    'PHOTOS_VIDEOS_TESTIMONIALS', 'XRAYS_DENTAL_NOTES_UPLOADED', 'IF_NO_WHY'
+]
+
+# Column name and dtype for each field read by get_kpi_data ('Sites (from Tags)' is a lookup list)
+KPI_SCHEMA = {
+    KPI_FIELDS['SELECT']: ('Leader', 'text'),
+    KPI_FIELDS['TAGS']: ('Tags', 'list'),
+    KPI_FIELDS['DATE']: ('Date', 'text'),
+    KPI_FIELDS['EARGYM_PROMOTION']: ('EargymPromotion', 'float64'),
+    KPI_FIELDS['CROSSBOOKING']: ('Crossbooking', 'float64'),
+    KPI_FIELDS['BOTD_EOD_FILLED']: ('BOTDandEODFilled', 'text'),
+    KPI_FIELDS['PHOTOS_VIDEOS_TESTIMONIALS']: ('PhotosVideosTestimonials', 'float64'),
+    KPI_FIELDS['XRAYS_DENTAL_NOTES_UPLOADED']: ('XraysAndDentalNotesUploaded', 'text'),
+    KPI_FIELDS['IF_NO_WHY']: ('IfNoWhy', 'text')
+}
+
+# Scored columns: numeric counts default to 0, Yes/No answers become 1/0
+KPI_NUMERIC_COLUMNS = ['EargymPromotion', 'Crossbooking', 'PhotosVideosTestimonials']
+KPI_YES_NO_COLUMNS = ['BOTDandEODFilled', 'XraysAndDentalNotesUploaded']
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_kpi_data(date_range=None, leader=None, site=None):
     """
@@ -35,28 +58,34 @@ def get_kpi_data(date_range=None, leader=None, site=None):
     Returns:
         DataFrame containing KPI data
     """
-    # Create a cache key based on filters including a timestamp for cache busting
-    cache_key = f"kpi_data_{date_range}_{leader}_{site}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    # Create a cache key based on filters (Refresh Data clears the KPI entries in the response cache)
+    cache_key = f"kpi_data_{date_range}_{leader}_{site}"
+    
+    # Push the filters down to Airtable so only matching events are transferred
+    filter_formulas = []
+    
+    if date_range and date_range[0] is not None and date_range[1] is not None:
+        start_date, end_date = date_range
+        date_field = field_ref(KPI_FIELDS['DATE'])
+        filter_formulas.append(f"IS_AFTER({date_field}, DATEADD({formula_value(start_date.isoformat())}, -1, 'days'))")
+        filter_formulas.append(f"IS_BEFORE({date_field}, DATEADD({formula_value(end_date.isoformat())}, 1, 'days'))")
+    
+    if leader:
+        filter_formulas.append(f"{field_ref(KPI_FIELDS['SELECT'])}={formula_value(leader)}")
     
-    # Fetch data from Airtable using a custom fetch method since we have a different base ID
-    query_params = {}  # Add any query parameters if needed
+    if site:
+        filter_formulas.append(f"FIND({formula_value(site)}, ARRAYJOIN({field_ref(KPI_FIELDS['TAGS'])}))")
+    
+    # Only request the fields used for scoring, keyed by field ID
+    query_params = build_query_params([KPI_FIELDS[key] for key in KPI_QUERY_FIELDS], filter_formulas)
     
     # Get API credentials
-    api_key = st.session_state.get('airtable_api_key', AIRTABLE_CONFIG['API_KEY'])
+    api_key = get_airtable_client().resolve_api_key()
     
     if not api_key:
         st.error("❌ Airtable API key not configured. Please set it up in the integration settings.")
         return pd.DataFrame()
     
-    # Prepare headers
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    # Create URL with the right base ID and table ID 
-    url = f"{AIRTABLE_CONFIG['API_URL']}/{KPI_BASE_ID}/{KPI_TABLE_ID}"
-    
     try:
         # Use existing fetch_from_airtable function but with overridden base info
         base_info = {
@@ -74,7 +103,7 @@ def get_kpi_data(date_range=None, leader=None, site=None):
         AIRTABLE_BASES['KPI'] = base_info['KPI']
         
         # Now fetch the data
-        response = fetch_from_airtable('KPI', cache_key=cache_key)
+        response = fetch_from_airtable('KPI', query_params, cache_key=cache_key)
         
         # Restore the original base config
         if original_kpi_base:
@@ -86,46 +115,30 @@ def get_kpi_data(date_range=None, leader=None, site=None):
             st.warning("No KPI data available. Please check your Airtable connection.")
             return pd.DataFrame()
         
-        # Process the records
-        records = []
-        for i, record in enumerate(response['records']):
-            field_data = record['fields']
-            
-            # --- Temporary Debug Print for Site Name Field ---
-            actual_site_field_name = "Sites (from Tags)" # Actual name of the lookup field
-            raw_tags_value = field_data.get(actual_site_field_name) 
-            if i < 5: # Print for the first 5 records
-                print(f"Debug Record {i}: Raw '{actual_site_field_name}' (ID {KPI_FIELDS['TAGS']}) value: {raw_tags_value}, Type: {type(raw_tags_value)}")
-            # --- End Temporary Debug Print ---
-            
-            site_name = 'Unknown Site' # Default
-            if isinstance(raw_tags_value, list) and len(raw_tags_value) > 0:
-                # If it's a list, assume the first item is the site name string
-                if isinstance(raw_tags_value[0], str):
-                    site_name = raw_tags_value[0].strip()
-                elif raw_tags_value[0] is not None:
-                    site_name = str(raw_tags_value[0]).strip() # Attempt to convert
-            elif isinstance(raw_tags_value, str) and raw_tags_value.strip():
-                site_name = raw_tags_value.strip()
-            
-            row = {
-                'id': record['id'],
-                'Leader': field_data.get('Select', ''),
-                'Site': site_name,
-                'Date': field_data.get('Date', ''),
-                'EargymPromotion': _parse_numeric(field_data.get('# of Eargym Promotion', 0)),
-                'Crossbooking': _parse_numeric(field_data.get('# of crossbooking', 0)),
-                'BOTDandEODFilled': _parse_yes_no(field_data.get('Are BOTD and EOD already filled?', '')),
-                'PhotosVideosTestimonials': _parse_numeric(field_data.get('Number of photos/Videos/Testimonials posted at the Teams channel', 0)),
-                'XraysAndDentalNotesUploaded': _parse_yes_no(field_data.get('Are all Xray\'s and Dental Notes uploaded to the right platforms?', '')),
-                'IfNoWhy': field_data.get('If No, Why?', '')
-            }
-            records.append(row)
+        # Build typed columns straight from the records (fields are keyed by field ID)
+        df = airtable_to_dataframe(response, schema=KPI_SCHEMA)
+        
+        if df.empty:
+            return df
+        
+        # The site is the first entry of the 'Sites (from Tags)' lookup list
+        site_names = primary_list_value(df['Tags']).astype(object).str.strip()
+        df['Site'] = site_names.where(site_names.str.len() > 0, 'Unknown Site')
+        df['Leader'] = df['Leader'].fillna('')
+        df['IfNoWhy'] = df['IfNoWhy'].fillna('')
+        
+        for column in KPI_NUMERIC_COLUMNS:
+            df[column] = df[column].fillna(0)
         
-        # Convert to DataFrame
-        df = pd.DataFrame(records)
+        for column in KPI_YES_NO_COLUMNS:
+            df[column] = df[column].str.lower().eq('yes').astype(int)
         
-        # Apply filters if provided
+        df = df[[
+            'id', 'Leader', 'Site', 'Date', 'EargymPromotion', 'Crossbooking', 'BOTDandEODFilled',
+            'PhotosVideosTestimonials', 'XraysAndDentalNotesUploaded', 'IfNoWhy'
+        ]]
+        
+        # Re-apply the filters locally for exact matching on the reduced result
         if date_range and date_range[0] is not None and date_range[1] is not None:
             start_date, end_date = date_range
             
@@ -150,20 +163,79 @@ def get_kpi_data(date_range=None, leader=None, site=None):
         st.error(f"❌ Error fetching KPI data: {str(e)}")
         return pd.DataFrame()
 
-def _parse_numeric(value):
-    """Parse a numeric value, handling various formats"""
-    if pd.isna(value) or value == '':
-        return 0
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return 0
+# Minimum requirements per event (the first two are counts, photos include videos/testimonials)
+KPI_MINIMUMS = {
+    'EargymPromotion': 1,  # 100% of all audio exams
+    'Crossbooking': 2,  # Minimum 2 crossbookings
+    'PhotosVideosTestimonials': 3  # Minimum 3 photos/videos/testimonials
+}
 
-def _parse_yes_no(value):
-    """Convert Yes/No to 1/0 for scoring"""
-    if isinstance(value, str):
-        return 1 if value.lower() == 'yes' else 0
-    return 0
+# Scored KPI categories and their default weights
+DEFAULT_KPI_WEIGHTS = {
+    'EargymPromotion': 1,
+    'Crossbooking': 1,
+    'BOTDandEODFilled': 1,
+    'PhotosVideosTestimonials': 1,
+    'XraysAndDentalNotesUploaded': 1
+}
+
+def _leader_kpi_components(df):
+    """
+    Aggregate KPI events per leader and build the normalized score components
+    
+    Returns:
+        Tuple of (per-leader aggregate DataFrame, DataFrame of the five 0-1 score
+        components in DEFAULT_KPI_WEIGHTS order)
+    """
+    # Share of each minimum met per event (partial credit, capped at 1)
+    met = {
+        f"{column}MinMet": (df[column] / minimum).clip(upper=1.0)
+        for column, minimum in KPI_MINIMUMS.items()
+    }
+    
+    # Whether every minimum was met at the event (as a percentage once averaged)
+    all_met = (
+        (df['EargymPromotion'] >= KPI_MINIMUMS['EargymPromotion']) &
+        (df['Crossbooking'] >= KPI_MINIMUMS['Crossbooking']) &
+        (df['PhotosVideosTestimonials'] >= KPI_MINIMUMS['PhotosVideosTestimonials']) &
+        (df['BOTDandEODFilled'] == 1) &
+        (df['XraysAndDentalNotesUploaded'] == 1)
+    ) * 100.0
+    
+    events = df[['Leader', 'id'] + list(DEFAULT_KPI_WEIGHTS)].assign(**met, MinimumsMet=all_met)
+    
+    # One aggregation for every per-leader statistic
+    scores = events.groupby('Leader').agg(
+        EargymPromotion=('EargymPromotion', 'mean'),
+        Crossbooking=('Crossbooking', 'mean'),
+        BOTDandEODFilled=('BOTDandEODFilled', 'mean'),
+        PhotosVideosTestimonials=('PhotosVideosTestimonials', 'mean'),
+        XraysAndDentalNotesUploaded=('XraysAndDentalNotesUploaded', 'mean'),
+        EargymMinMet=('EargymPromotionMinMet', 'mean'),  # Average of whether minimum was met across all events
+        CrossbookingMinMet=('CrossbookingMinMet', 'mean'),
+        PhotosMinMet=('PhotosVideosTestimonialsMinMet', 'mean'),
+        EventCount=('id', 'count'),  # Count of records for this leader
+        MinimumsMet=('MinimumsMet', 'mean')
+    )
+    
+    # Max values for normalization (1 if nothing was recorded)
+    maxima = df[list(KPI_MINIMUMS)].max().where(lambda m: m > 0, 1)
+    
+    # Normalize numeric scores (0-1 scale) with bonus for exceeding minimums
+    # Base score is minimum met (0-1) plus bonus for exceeding minimum
+    scores['NormalizedEargymPromotion'] = scores['EargymMinMet'] * 0.7 + (scores['EargymPromotion'] / maxima['EargymPromotion']) * 0.3
+    scores['NormalizedCrossbooking'] = scores['CrossbookingMinMet'] * 0.7 + (scores['Crossbooking'] / maxima['Crossbooking']) * 0.3
+    scores['NormalizedPhotosVideosTestimonials'] = scores['PhotosMinMet'] * 0.7 + (scores['PhotosVideosTestimonials'] / maxima['PhotosVideosTestimonials']) * 0.3
+    
+    components = pd.DataFrame({
+        'EargymPromotion': scores['NormalizedEargymPromotion'],
+        'Crossbooking': scores['NormalizedCrossbooking'],
+        'BOTDandEODFilled': scores['BOTDandEODFilled'],
+        'PhotosVideosTestimonials': scores['NormalizedPhotosVideosTestimonials'],
+        'XraysAndDentalNotesUploaded': scores['XraysAndDentalNotesUploaded']
+    })
+    
+    return scores, components
 
 def calculate_performance_score(df, weights=None):
     """
@@ -181,71 +253,13 @@ def calculate_performance_score(df, weights=None):
     
     # Default weights if not provided
     if weights is None:
-        weights = {
-            'EargymPromotion': 1,
-            'Crossbooking': 1,
-            'BOTDandEODFilled': 1,
-            'PhotosVideosTestimonials': 1,
-            'XraysAndDentalNotesUploaded': 1
-        }
-    
-    # Set minimum requirements
-    MINIMUM_EARGYM = 1  # 100% of all audio exams
-    MINIMUM_CROSSBOOKING = 2  # Minimum 2 crossbookings
-    MINIMUM_PHOTOS = 3  # Minimum 3 photos/videos/testimonials
+        weights = DEFAULT_KPI_WEIGHTS
     
-    # Make a copy of the dataframe to avoid modifying the original
-    score_df = df.copy()
+    scores, components = _leader_kpi_components(df)
     
-    # Calculate if minimums are met (1 for met, partial credit for partial)
-    score_df['EargymMinMet'] = score_df['EargymPromotion'].apply(
-        lambda x: min(x / MINIMUM_EARGYM, 1.0) if MINIMUM_EARGYM > 0 else 1.0
-    )
-    
-    score_df['CrossbookingMinMet'] = score_df['Crossbooking'].apply(
-        lambda x: min(x / MINIMUM_CROSSBOOKING, 1.0) if MINIMUM_CROSSBOOKING > 0 else 1.0
-    )
-    
-    score_df['PhotosMinMet'] = score_df['PhotosVideosTestimonials'].apply(
-        lambda x: min(x / MINIMUM_PHOTOS, 1.0) if MINIMUM_PHOTOS > 0 else 1.0
-    )
-    
-    # Aggregate data by leader
-    scores = score_df.groupby('Leader').agg({
-        'EargymPromotion': 'mean',
-        'Crossbooking': 'mean',
-        'BOTDandEODFilled': 'mean',
-        'PhotosVideosTestimonials': 'mean',
-        'XraysAndDentalNotesUploaded': 'mean',
-        'EargymMinMet': 'mean',  # Average of whether minimum was met across all events
-        'CrossbookingMinMet': 'mean',
-        'PhotosMinMet': 'mean',
-        'id': 'count'  # Count of records for this leader
-    }).rename(columns={'id': 'EventCount'})
-    
-    # Get max values for normalization
-    max_eargym = df['EargymPromotion'].max() if df['EargymPromotion'].max() > 0 else 1
-    max_crossbooking = df['Crossbooking'].max() if df['Crossbooking'].max() > 0 else 1
-    max_photos = df['PhotosVideosTestimonials'].max() if df['PhotosVideosTestimonials'].max() > 0 else 1
-    
-    # Normalize numeric scores (0-1 scale) with bonus for exceeding minimums
-    # Base score is minimum met (0-1) plus bonus for exceeding minimum
-    scores['NormalizedEargymPromotion'] = scores['EargymMinMet'] * 0.7 + (scores['EargymPromotion'] / max_eargym) * 0.3
-    scores['NormalizedCrossbooking'] = scores['CrossbookingMinMet'] * 0.7 + (scores['Crossbooking'] / max_crossbooking) * 0.3
-    scores['NormalizedPhotosVideosTestimonials'] = scores['PhotosMinMet'] * 0.7 + (scores['PhotosVideosTestimonials'] / max_photos) * 0.3
-    
-    # Create weighted score
-    # Normalize weights to sum to 1
-    total_weight = sum(weights.values())
-    normalized_weights = {k: v/total_weight for k, v in weights.items()}
-    
-    scores['WeightedScore'] = (
-        scores['NormalizedEargymPromotion'] * normalized_weights['EargymPromotion'] +
-        scores['NormalizedCrossbooking'] * normalized_weights['Crossbooking'] +
-        scores['BOTDandEODFilled'] * normalized_weights['BOTDandEODFilled'] +
-        scores['NormalizedPhotosVideosTestimonials'] * normalized_weights['PhotosVideosTestimonials'] +
-        scores['XraysAndDentalNotesUploaded'] * normalized_weights['XraysAndDentalNotesUploaded']
-    )
+    # Create weighted score (weights normalized to sum to 1)
+    weight_vector = pd.Series({category: weights.get(category, 0) for category in DEFAULT_KPI_WEIGHTS}, dtype=float)
+    scores['WeightedScore'] = components.dot(weight_vector / weight_vector.sum())
     
     # Convert to 100-point scale for display
     scores['PerformanceScore'] = scores['WeightedScore'] * 100
@@ -253,15 +267,7 @@ def calculate_performance_score(df, weights=None):
     # Calculate ranks
     scores['Rank'] = scores['PerformanceScore'].rank(ascending=False, method='min')
     
-    # Calculate percentage of events where all minimums were met
-    scores['MinimumsMet'] = score_df.groupby('Leader').apply(
-        lambda x: (
-            (x['EargymPromotion'] >= MINIMUM_EARGYM) & 
-            (x['Crossbooking'] >= MINIMUM_CROSSBOOKING) & 
-            (x['PhotosVideosTestimonials'] >= MINIMUM_PHOTOS) &
-            (x['BOTDandEODFilled'] == 1) &
-            (x['XraysAndDentalNotesUploaded'] == 1)
-        ).mean() * 100
-    )
+    # Percentage of events where all minimums were met, kept as the last column
+    scores['MinimumsMet'] = scores.pop('MinimumsMet')
     
-    return scores 
\ No newline at end of file
+    return scores
@@ -0,0 +1,40 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+def load_in_parallel(loaders):
+    """
+    Run several Airtable loaders concurrently
+    
+    Each base has its own rate limiter, so loading them side by side makes the
+    total time that of the slowest base rather than the sum of all of them.
+    Worker threads are attached to the current Streamlit script context so the
+    loaders can keep writing status messages.
+    
+    Args:
+        loaders: Dictionary mapping a display name to a zero-argument loader
+            (e.g. {'Utilization': get_utilization_data})
+        
+    Returns:
+        Dictionary mapping each name to a dict with 'data' (DataFrame),
+        'seconds' (load time) and 'error' (message or None)
+    """
+    ctx = get_script_run_ctx()
+    
+    def run(loader):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        start_time = time.time()
+        try:
+            data, error = loader(), None
+        except Exception as e:
+            data, error = pd.DataFrame(), str(e)
+        return {'data': data, 'seconds': time.time() - start_time, 'error': error}
+    
+    if not loaders:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+        futures = {name: executor.submit(run, loader) for name, loader in loaders.items()}
+        return {name: future.result() for name, future in futures.items()}
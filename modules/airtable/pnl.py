@@ -1,8 +1,20 @@
 import streamlit as st
 import pandas as pd
 from config import AIRTABLE_BASES
-from modules.airtable.fetch import fetch_from_airtable
+from modules.airtable.fetch import fetch_from_airtable, build_query_params, field_ref, formula_value
+from modules.airtable.schema import get_base_schema, resolve_columns
 from modules.utils.data_processing import airtable_to_dataframe
+from modules.utils.pnl_aggregates import get_pnl_aggregates
+
+# Alternative names for the columns the dashboards rely on
+PNL_COLUMN_ALIASES = {
+    'Client': ['client', 'Company', 'company', 'Organization', 'Client Name'],
+    'Site_Location': ['Site Location', 'Location', 'location', 'Site', 'Event Location'],
+    'Service_Month': ['Service Month', 'Month', 'Date', 'Service Date', 'Event Date'],
+    'Revenue_Total': ['Revenue Total', 'Total Revenue', 'Revenue', 'Gross Revenue'],
+    'Expense_COGS_Total': ['Expense COGS Total', 'Total Expenses', 'Expenses', 'COGS', 'Cost of Goods Sold'],
+    'Net_Profit': ['Net Profit', 'Profit', 'Net Income', 'Margin', 'Earnings']
+}
 
 def get_pnl_data(filters=None):
     """
@@ -14,120 +26,37 @@ def get_pnl_data(filters=None):
     Returns:
         Processed DataFrame with PnL data
     """
-    # Create query parameters based on filters
-    params = {'maxRecords': 1000}  # Default to 1000 records max
+    base_config = AIRTABLE_BASES['PNL']
+    field_mapping = base_config.get('FIELDS', {})
+    
+    # Push filters down to Airtable so only matching records are transferred
+    filter_formulas = []
     
     if filters:
-        if 'client' in filters:
-            params['filterByFormula'] = f"FIND('{filters['client']}', {{Client}})"
+        if filters.get('client'):
+            filter_formulas.append(f"FIND({formula_value(filters['client'])}, {field_ref(field_mapping['CLIENT'])})")
+    
+    # Only request the mapped columns, keyed by field ID
+    params = build_query_params(field_mapping.values(), filter_formulas)
     
     # Fetch data from Airtable
-    pnl_data = fetch_from_airtable('PNL', params)
+    # Sync incrementally against the LAST_MODIFIED field instead of re-reading the table
+    pnl_data = fetch_from_airtable('PNL', params, sync=True)
     
     if not pnl_data:
         return pd.DataFrame()
     
-    # Convert to DataFrame
-    df = airtable_to_dataframe(pnl_data)
+    # Convert to a typed DataFrame (columns renamed and converted per the base schema)
+    df = airtable_to_dataframe(pnl_data, schema=get_base_schema('PNL'))
     
     # Process the DataFrame
     if not df.empty:
-        # Create debug expander for field mapping info
-        with st.expander("Field Mapping Details", expanded=False):
-            st.write("Mapping fields for PnL data:")
-            
-            # Map field IDs to readable names if present
-            field_mapping = AIRTABLE_BASES['PNL'].get('FIELDS', {})
-            field_map_inverted = {v: k for k, v in field_mapping.items()}
-            
-            # Rename columns using the field mapping
-            df = df.rename(columns=field_map_inverted)
-            
-            # Define required fields and alternatives with expanded potential column names
-            required_fields = [
-                'CLIENT', 'SITE_LOCATION', 'SERVICE_MONTH', 'REVENUE_TOTAL', 
-                'EXPENSE_COGS_TOTAL', 'NET_PROFIT'
-            ]
-            
-            for field in required_fields:
-                if field not in df.columns:
-                    # Try some common alternatives
-                    alternatives = {
-                        'CLIENT': ['Client', 'client', 'Company', 'company', 'Organization', 'Client Name'],
-                        'SITE_LOCATION': ['Site Location', 'Site_Location', 'Location', 'location', 'Site', 'Event Location'],
-                        'SERVICE_MONTH': ['Service Month', 'Month', 'Date', 'Service_Month', 'Service Date', 'Event Date'],
-                        'REVENUE_TOTAL': ['Revenue Total', 'Total Revenue', 'Revenue', 'Revenue_Total', 'Gross Revenue'],
-                        'EXPENSE_COGS_TOTAL': ['Expense COGS Total', 'Total Expenses', 'Expenses', 'Expense_COGS_Total', 'COGS', 'Cost of Goods Sold'],
-                        'NET_PROFIT': ['Net Profit', 'Profit', 'Net Income', 'Net_Profit', 'Margin', 'Earnings']
-                    }
-                    
-                    # Try to find a matching column
-                    found = False
-                    for alt in alternatives.get(field, []):
-                        if alt in df.columns:
-                            df[field] = df[alt]
-                            found = True
-                            st.write(f"Found alternative for '{field}': '{alt}'")
-                            break
-                    
-                    if not found:
-                        # Try to find a column that contains the field name as a substring
-                        for col in df.columns:
-                            if any(alt.lower() in col.lower() for alt in alternatives.get(field, [])):
-                                df[field] = df[col]
-                                found = True
-                                st.write(f"Found column containing '{field}' in name: '{col}'")
-                                break
-                    
-                    if not found:
-                        st.warning(f"Could not find a mapping for required field '{field}'")
-        
-        # Convert date fields - try multiple potential names
-        date_fields = ['SERVICE_MONTH', 'Service_Month', 'Service Month', 'Month', 'LAST_MODIFIED', 'Last Modified']
-        for field in date_fields:
-            if field in df.columns:
-                # Check if the column contains lists and extract first item if needed
-                if df[field].apply(lambda x: isinstance(x, list)).any():
-                    # Handle list values - take the first item from each list
-                    df[field] = df[field].apply(
-                        lambda x: x[0] if isinstance(x, list) and len(x) > 0 else 
-                                 (x if not isinstance(x, list) else None)
-                    )
-                
-                # Add more detailed logging for debugging
-                st.write(f"Converting '{field}' to datetime. Sample values: {df[field].head(3).tolist()}")
-                
-                try:
-                    # Try to convert with a specific format first if possible
-                    df[field] = pd.to_datetime(df[field], errors='coerce', format='%Y-%m-%d')
-                except ValueError:
-                    # Fall back to the default parser
-                    df[field] = pd.to_datetime(df[field], errors='coerce')
-                
-                # Show any rows with NaT values after conversion
-                nat_count = df[field].isna().sum()
-                if nat_count > 0:
-                    st.warning(f"{nat_count} rows have invalid/missing dates in '{field}'")
-        
-        # Convert numeric fields - try multiple potential names
-        currency_fields = [
-            'REVENUE_WELLNESS_FUND', 'REVENUE_DENTAL_CLAIM', 'REVENUE_MEDICAL_CLAIM',
-            'REVENUE_EVENT_TOTAL', 'REVENUE_MISSED_APPOINTMENTS', 'REVENUE_TOTAL',
-            'REVENUE_PER_DAY_AVG', 'EXPENSE_COGS_TOTAL', 'EXPENSE_COGS_PER_DAY_AVG', 
-            'NET_PROFIT', 'Revenue_WellnessFund', 'Revenue_DentalClaim',
-            'Revenue_MedicalClaim_InclCancelled', 'Revenue_EventTotal',
-            'Revenue_MissedAppointments', 'Revenue_Total', 'Revenue_PerDay_Avg',
-            'Expense_COGS_Total', 'Expense_COGS_PerDay_Avg', 'Net_Profit'
-        ]
-        
-        for field in currency_fields:
-            if field in df.columns:
-                df[field] = pd.to_numeric(df[field], errors='coerce')
+        # Map any alternative column names onto the dashboard names (including partial matches)
+        df, missing = resolve_columns(df, 'PNL', PNL_COLUMN_ALIASES, substring=True)
+        if missing:
+            st.warning(f"Could not find a mapping for required fields: {', '.join(missing)}")
         
-        # Convert percentage fields
-        percentage_fields = ['NET_PROFIT_PERCENT', 'Net_Profit_%', 'Profit Margin', 'Margin']
-        for field in percentage_fields:
-            if field in df.columns:
-                df[field] = pd.to_numeric(df[field], errors='coerce')
+        # Build the client/month/location aggregates both PnL dashboards read from
+        get_pnl_aggregates(df)
     
     return df 
\ No newline at end of file
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+from config import AIRTABLE_RATE_LIMIT, AIRTABLE_RATE_LIMIT_PENALTY
+
+class AirtableRateLimiter:
+    """
+    Token bucket pacing requests to a single Airtable base
+    
+    Each request reserves a token. When the bucket is empty the reservation goes
+    into debt and the caller awaits until its slot comes up, so concurrent callers
+    are served in order at the configured rate. A 429 response blocks the whole
+    base for the penalty period, as documented by Airtable.
+    """
+    
+    def __init__(self, rate=AIRTABLE_RATE_LIMIT, burst=None, penalty=AIRTABLE_RATE_LIMIT_PENALTY):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.penalty = penalty
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._penalties = 0
+        # Thread lock rather than asyncio.Lock: several script threads (each with its
+        # own event loop) share one limiter per base
+        self._lock = threading.Lock()
+    
+    def _reserve(self):
+        """Take a token and return how long the caller has to wait for it, with the current penalty count"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now), self._penalties
+    
+    async def acquire(self):
+        """
+        Wait (without blocking the event loop) until a request may be sent
+        
+        A 429 received while the caller sleeps invalidates its slot, so the
+        caller reserves a new one after the penalty instead of firing inside it.
+        """
+        wait, penalties = self._reserve()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            with self._lock:
+                penalized = self._penalties != penalties
+            if not penalized:
+                break
+            wait, penalties = self._reserve()
+    
+    def penalize(self):
+        """Block the base after a 429 response"""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + self.penalty)
+            self._penalties += 1
+            # Callers still waiting reserve again after the penalty, so their debt is dropped
+            self._tokens = 0.0
+            self._updated = now
+
+# One limiter per base, shared by every module that talks to Airtable
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(base_id):
+    """Get the shared rate limiter for a base"""
+    with _limiters_lock:
+        if base_id not in _limiters:
+            _limiters[base_id] = AirtableRateLimiter()
+        return _limiters[base_id]
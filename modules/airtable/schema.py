@@ -0,0 +1,100 @@
+import threading
+from config import AIRTABLE_BASES
+
+# Built schemas keyed by base key
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+def get_base_schema(base_key):
+    """
+    Column schema for a base, built from the FIELDS, COLUMN_NAMES and FIELD_TYPES maps in config.py
+    
+    Args:
+        base_key: Key of the base in AIRTABLE_BASES (e.g., 'UTILIZATION', 'PNL')
+        
+    Returns:
+        Dictionary mapping each source field (field ID, or field name for bases
+        without a FIELDS map) to a (column name, dtype) tuple, or None if the
+        base declares no FIELD_TYPES
+    """
+    with _schemas_lock:
+        if base_key in _schemas:
+            return _schemas[base_key]
+    
+    base_config = AIRTABLE_BASES.get(base_key, {})
+    field_types = base_config.get('FIELD_TYPES')
+    
+    if not field_types:
+        return None
+    
+    fields = base_config.get('FIELDS', {})
+    column_names = base_config.get('COLUMN_NAMES', {})
+    
+    schema = {
+        fields.get(key, key): (column_names.get(key, key), dtype)
+        for key, dtype in field_types.items()
+    }
+    
+    with _schemas_lock:
+        _schemas[base_key] = schema
+    
+    return schema
+
+# Resolved alias renames keyed by (base key, column names)
+_column_maps = {}
+
+def _resolve_column_map(columns, aliases, substring):
+    """Work out the alias renames and still-missing columns for one column set"""
+    present = set(columns)
+    rename = {}
+    missing = []
+    
+    for canonical, alternatives in aliases.items():
+        if canonical in present:
+            continue
+        
+        # Exact alias match first, then (optionally) a column containing an alias
+        source = next((alt for alt in alternatives if alt in present and alt not in rename), None)
+        if source is None and substring:
+            lowered = [alt.lower() for alt in alternatives]
+            source = next(
+                (col for col in columns
+                 if isinstance(col, str) and col not in rename and any(alt in col.lower() for alt in lowered)),
+                None
+            )
+        
+        if source is None:
+            missing.append(canonical)
+        else:
+            rename[source] = canonical
+    
+    return rename, missing
+
+def resolve_columns(df, base_key, aliases, substring=False):
+    """
+    Rename alternative column names to the canonical dashboard names
+    
+    The rename is worked out once per distinct set of columns and cached, so
+    repeated loads of the same table only pay for a single DataFrame.rename.
+    
+    Args:
+        df: DataFrame built from an Airtable response
+        base_key: Key of the base in AIRTABLE_BASES (part of the cache key)
+        aliases: Dictionary mapping each canonical column to alternative names
+        substring: Also match columns whose name contains an alternative
+        
+    Returns:
+        Tuple of (renamed DataFrame, list of canonical columns that couldn't be found)
+    """
+    key = (base_key, tuple(df.columns), substring)
+    resolved = _column_maps.get(key)
+    
+    if resolved is None:
+        resolved = _resolve_column_map(list(df.columns), aliases, substring)
+        _column_maps[key] = resolved
+    
+    rename, missing = resolved
+    if rename:
+        df = df.rename(columns=rename)
+    
+    return df, missing
@@ -0,0 +1,205 @@
+import streamlit as st
+import requests
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from config import AIRTABLE_BASES, AIRTABLE_SYNC_SWEEP_INTERVAL
+from modules.airtable.fetch import (
+    AIRTABLE_PAGE_SIZE, get_base_request, fetch_all_pages, field_ref, formula_value, combine_formulas
+)
+from modules.airtable.cache import get_response_cache
+
+# Overlap applied to each watermark so clock skew between us and Airtable can't drop edits
+SYNC_WATERMARK_OVERLAP = timedelta(minutes=2)
+
+# Local copies keyed by (base_key, filter formula, projected fields); also persisted
+# in the response cache under "sync:<base_key>" so they survive restarts
+_sync_store = {}
+_sync_lock = threading.Lock()
+
+def _sync_key(base_key, params):
+    """Build the local-copy key for a base and query"""
+    return (base_key, params.get('filterByFormula'), tuple(params.get('fields[]', ())))
+
+def _disk_key(base_id, table_id, key):
+    """Response-cache key for a persisted local copy"""
+    return get_response_cache().make_key('sync', base_id, table_id, list(key))
+
+def _load_state(disk_key):
+    """Load a persisted local copy, or None if there isn't one"""
+    entry = get_response_cache().get(disk_key)
+    if entry is None:
+        return None
+    
+    state, _ = entry
+    state['watermark'] = datetime.fromisoformat(state['watermark'])
+    return state
+
+def _save_state(disk_key, base_key, state):
+    """Persist a local copy to the response cache"""
+    get_response_cache().set(disk_key, dict(state, watermark=state['watermark'].isoformat()), f"sync:{base_key}")
+
+def _modified_since_formula(base_key, watermark):
+    """
+    Formula matching records created or modified after the watermark
+    
+    Uses the table's LAST_MODIFIED field when config.py defines one, otherwise
+    falls back to Airtable's LAST_MODIFIED_TIME() function.
+    """
+    fields = AIRTABLE_BASES[base_key].get('FIELDS', {})
+    if 'LAST_MODIFIED' in fields:
+        modified = field_ref(fields['LAST_MODIFIED'])
+    else:
+        modified = "LAST_MODIFIED_TIME()"
+    
+    since = formula_value(watermark.strftime('%Y-%m-%dT%H:%M:%S.000Z'))
+    return f"OR(IS_AFTER({modified}, {since}), IS_AFTER(CREATED_TIME(), {since}))"
+
+def _sweep_field(base_key, params):
+    """
+    Single field returned by a record-ID sweep
+    
+    The query's first projected field when it has one, otherwise the base's
+    SWEEP_FIELD from config.py, falling back to its first mapped field ID.
+    """
+    projected = params.get('fields[]')
+    if projected:
+        return list(projected)[0]
+    
+    base = AIRTABLE_BASES[base_key]
+    if 'SWEEP_FIELD' in base:
+        return base['SWEEP_FIELD']
+    
+    fields = base.get('FIELDS', {})
+    return next(iter(fields.values()), None)
+
+def _sweep_params(base_key, params):
+    """
+    Query parameters for a record-ID sweep
+    
+    Keeps the original filter but only returns a single field, so the sweep costs
+    the same number of pages as a full fetch with a fraction of the payload, even
+    for queries that don't project any fields.
+    """
+    sweep = {k: v for k, v in params.items() if k not in ('fields[]', 'maxRecords', 'offset')}
+    field = _sweep_field(base_key, params)
+    if field:
+        sweep['fields[]'] = [field]
+    return sweep
+
+def sync_from_airtable(base_key, query_params=None, retry_attempts=3):
+    """
+    Incrementally sync a base into a local copy and return the full result
+    
+    The first call fetches every matching record. Later calls only fetch records
+    modified since the previous watermark and merge them by record ID. Every
+    AIRTABLE_SYNC_SWEEP_INTERVAL seconds a cheap record-ID sweep drops records
+    that were deleted (or no longer match the filter).
+    
+    Args:
+        base_key: Key of the base in AIRTABLE_BASES (e.g., 'SOW', 'UTILIZATION', 'PNL')
+        query_params: Dictionary of query parameters to include in the request
+        retry_attempts: Number of retry attempts for failed requests
+        
+    Returns:
+        Dictionary containing the API response, in the same shape as fetch_from_airtable
+    """
+    start_time = time.time()
+    
+    request_info = get_base_request(base_key)
+    if request_info is None:
+        return None
+    base_id, table_id, table_name = request_info
+    
+    # The local copy mirrors the whole filtered table, so maxRecords isn't applied
+    params = {k: v for k, v in (query_params or {}).items() if k not in ('maxRecords', 'offset')}
+    params.setdefault('pageSize', AIRTABLE_PAGE_SIZE)
+    key = _sync_key(base_key, params)
+    disk_key = _disk_key(base_id, table_id, key)
+    
+    with _sync_lock:
+        state = _sync_store.get(key)
+        state = dict(state, records=dict(state['records'])) if state else None
+    
+    # After a restart, pick up from the copy saved on disk instead of refetching everything
+    if state is None:
+        state = _load_state(disk_key)
+    
+    # Take the new watermark before querying so edits made during the fetch are picked up next time
+    next_watermark = datetime.now(timezone.utc) - SYNC_WATERMARK_OVERLAP
+    
+    try:
+        with st.spinner(f"🔄 Syncing {table_name}..."):
+            if state is None:
+                # First sync: full fetch of the filtered table
+                fetched = fetch_all_pages(base_id, table_id, params, retry_attempts)
+                if fetched is None:
+                    return None
+                state = {
+                    'records': {record['id']: record for record in fetched},
+                    'last_sweep': time.time()
+                }
+                changed, removed = len(fetched), 0
+            else:
+                # Delta: only records created or modified since the watermark
+                delta_params = dict(params)
+                delta_params['filterByFormula'] = combine_formulas([
+                    params.get('filterByFormula'),
+                    _modified_since_formula(base_key, state['watermark'])
+                ])
+                fetched = fetch_all_pages(base_id, table_id, delta_params, retry_attempts)
+                if fetched is None:
+                    return None
+                for record in fetched:
+                    state['records'][record['id']] = record
+                changed, removed = len(fetched), 0
+                
+                # Periodic sweep of record IDs to detect deletions
+                if time.time() - state['last_sweep'] >= AIRTABLE_SYNC_SWEEP_INTERVAL:
+                    swept = fetch_all_pages(base_id, table_id, _sweep_params(base_key, params), retry_attempts)
+                    if swept is not None:
+                        live_ids = {record['id'] for record in swept}
+                        stale_ids = [record_id for record_id in state['records'] if record_id not in live_ids]
+                        for record_id in stale_ids:
+                            del state['records'][record_id]
+                        removed = len(stale_ids)
+                        state['last_sweep'] = time.time()
+        
+        state['watermark'] = next_watermark
+        
+        with _sync_lock:
+            _sync_store[key] = state
+        _save_state(disk_key, base_key, state)
+        
+        duration = time.time() - start_time
+        st.success(
+            f"✅ Synced {table_name}: {len(state['records']):,} records "
+            f"({changed:,} fetched, {removed:,} removed, {duration:.2f} seconds)"
+        )
+        
+        return {'records': list(state['records'].values())}
+        
+    except requests.exceptions.RequestException as e:
+        # Handle network errors
+        st.error(f"❌ Network error when syncing from Airtable: {str(e)}")
+        return None
+    except Exception as e:
+        # Handle other unexpected errors
+        st.error(f"❌ Unexpected error when syncing from Airtable: {str(e)}")
+        return None
+
+def clear_sync_state(base_key=None):
+    """
+    Drop local copies so the next sync does a full fetch
+    
+    Args:
+        base_key: Only clear this base (clears every base if None)
+    """
+    with _sync_lock:
+        for key in list(_sync_store):
+            if base_key is None or key[0] == base_key:
+                del _sync_store[key]
+    
+    cache = get_response_cache()
+    for key in ([base_key] if base_key is not None else AIRTABLE_BASES):
+        cache.clear(f"sync:{key}")
@@ -1,8 +1,21 @@
 import streamlit as st
 import pandas as pd
 from config import AIRTABLE_BASES
-from modules.airtable.fetch import fetch_from_airtable
+from modules.airtable.fetch import fetch_from_airtable, build_query_params, field_ref, formula_value
+from modules.airtable.schema import get_base_schema, resolve_columns
 from modules.utils.data_processing import airtable_to_dataframe
+from modules.utils.rollups import get_utilization_rollup
+
+# Alternative names for the columns the dashboards rely on
+UTILIZATION_COLUMN_ALIASES = {
+    'Client': ['client', 'Company', 'company', 'Organization'],
+    'Site': ['site', 'Location', 'location'],
+    'Date of Service': ['date_of_service', 'Service Date', 'DOS'],
+    'Year': ['year', 'Calendar Year'],
+    'Headcount': ['headcount', 'Head Count', 'Employee Count'],
+    'Total Booking Appts': ['Bookings', 'Appointments Booked'],
+    'Total Completed Appts': ['Completed', 'Completed Appointments']
+}
 
 def get_utilization_data(filters=None):
     """
@@ -14,118 +27,50 @@ def get_utilization_data(filters=None):
     Returns:
         Processed DataFrame with utilization data
     """
-    # Create query parameters based on filters
-    params = {'maxRecords': 1000}  # Default to 1000 records max
+    base_config = AIRTABLE_BASES['UTILIZATION']
+    field_mapping = base_config.get('FIELDS', {})
+    
+    # Push filters down to Airtable so only matching records are transferred
+    filter_formulas = []
     
     if filters:
-        # Example: Add view filtering or formula filtering
-        if 'year' in filters:
-            params['filterByFormula'] = f"{{Year}}='{filters['year']}'"
+        if filters.get('year'):
+            filter_formulas.append(f"{field_ref(field_mapping['YEAR'])}={formula_value(filters['year'])}")
+        
+        if filters.get('client'):
+            filter_formulas.append(f"FIND({formula_value(filters['client'])}, {field_ref(field_mapping['CLIENT'])})")
+    
+    # Only request the mapped columns, keyed by field ID
+    params = build_query_params(field_mapping.values(), filter_formulas)
     
     # Fetch data from Airtable
-    utilization_data = fetch_from_airtable('UTILIZATION', params)
+    # Sync incrementally (the table has no last-modified field, so LAST_MODIFIED_TIME() is used)
+    utilization_data = fetch_from_airtable('UTILIZATION', params, sync=True)
     
     if not utilization_data:
         return pd.DataFrame()
     
-    # Convert to DataFrame
-    df = airtable_to_dataframe(utilization_data)
+    # Convert to a typed DataFrame (columns renamed and converted per the base schema)
+    df = airtable_to_dataframe(utilization_data, schema=get_base_schema('UTILIZATION'))
     
     # Process the DataFrame
     if not df.empty:
-        # Create debug expander for field mapping info
-        with st.expander("Field Mapping Details", expanded=False):
-            st.write("Mapping fields for Utilization data:")
-            
-            # Map field IDs to readable names if present
-            field_mapping = AIRTABLE_BASES['UTILIZATION'].get('FIELDS', {})
-            field_map_inverted = {v: k for k, v in field_mapping.items()}
-            
-            # Rename columns using the field mapping
-            df = df.rename(columns=field_map_inverted)
-            
-            # If we don't have mappings for some key fields, try to use common names
-            required_fields = [
-                'CLIENT', 'SITE', 'DATE_OF_SERVICE', 'YEAR', 'HEADCOUNT', 
-                'TOTAL_BOOKING_APPTS', 'TOTAL_COMPLETED_APPTS'
-            ]
-            
-            for field in required_fields:
-                if field not in df.columns:
-                    # Try some common alternatives
-                    alternatives = {
-                        'CLIENT': ['Client', 'client', 'Company', 'company', 'Organization'],
-                        'SITE': ['Site', 'site', 'Location', 'location'],
-                        'DATE_OF_SERVICE': ['Date of Service', 'date_of_service', 'Service Date', 'DOS'],
-                        'YEAR': ['Year', 'year', 'Calendar Year'],
-                        'HEADCOUNT': ['Headcount', 'headcount', 'Head Count', 'Employee Count'],
-                        'TOTAL_BOOKING_APPTS': ['Total Booking Appts', 'Bookings', 'Appointments Booked'],
-                        'TOTAL_COMPLETED_APPTS': ['Total Completed Appts', 'Completed', 'Completed Appointments']
-                    }
-                    
-                    # Try to find a matching column
-                    found = False
-                    for alt in alternatives.get(field, []):
-                        if alt in df.columns:
-                            df[field] = df[alt]
-                            found = True
-                            st.write(f"Found alternative for '{field}': '{alt}'")
-                            break
-                    
-                    if not found:
-                        st.warning(f"Could not find a mapping for required field '{field}'")
-        
-        # Convert date fields
-        date_fields = ['DATE_OF_SERVICE', 'Date of Service']
-        for field in date_fields:
-            if field in df.columns:
-                df[field] = pd.to_datetime(df[field], errors='coerce')
-        
-        # Convert numeric fields
-        numeric_fields = [
-            'HEADCOUNT', 'WALKINS', 'INTERESTED_PATIENTS',
-            'TOTAL_BOOKING_APPTS', 'TOTAL_COMPLETED_APPTS',
-            'DENTAL', 'AUDIOLOGY', 'VISION', 'MSK', 
-            'SKIN_SCREENING', 'BIOMETRICS_AND_LABS',
-            'Headcount', 'Walkins', 'Interested Patients',
-            'Total Booking Appts', 'Total Completed Appts',
-            'Dental', 'Audiology', 'Vision', 'MSK', 
-            'Skin Screening', 'Biometrics and Labs'
-        ]
-        
-        for field in numeric_fields:
-            if field in df.columns:
-                df[field] = pd.to_numeric(df[field], errors='coerce')
-        
-        # Calculate additional metrics - try with both potential field names
-        booking_rate_fields = [
-            ('TOTAL_BOOKING_APPTS', 'HEADCOUNT'),
-            ('Total Booking Appts', 'Headcount')
-        ]
-        
-        for booking_field, headcount_field in booking_rate_fields:
-            if booking_field in df.columns and headcount_field in df.columns:
-                df['Booking Rate'] = (df[booking_field] / df[headcount_field]).fillna(0)
-                break
+        # Map any alternative column names onto the dashboard names
+        df, missing = resolve_columns(df, 'UTILIZATION', UTILIZATION_COLUMN_ALIASES)
+        if missing:
+            st.warning(f"Could not find a mapping for required fields: {', '.join(missing)}")
         
-        show_rate_fields = [
-            ('TOTAL_COMPLETED_APPTS', 'TOTAL_BOOKING_APPTS'),
-            ('Total Completed Appts', 'Total Booking Appts')
-        ]
+        # Calculate additional metrics
+        if 'Total Booking Appts' in df.columns and 'Headcount' in df.columns:
+            df['Booking Rate'] = (df['Total Booking Appts'] / df['Headcount']).fillna(0)
         
-        for completed_field, booking_field in show_rate_fields:
-            if completed_field in df.columns and booking_field in df.columns:
-                df['Show Rate'] = (df[completed_field] / df[booking_field]).fillna(0)
-                break
+        if 'Total Completed Appts' in df.columns and 'Total Booking Appts' in df.columns:
+            df['Show Rate'] = (df['Total Completed Appts'] / df['Total Booking Appts']).fillna(0)
         
-        utilization_rate_fields = [
-            ('TOTAL_COMPLETED_APPTS', 'HEADCOUNT'),
-            ('Total Completed Appts', 'Headcount')
-        ]
+        if 'Total Completed Appts' in df.columns and 'Headcount' in df.columns:
+            df['Utilization Rate'] = (df['Total Completed Appts'] / df['Headcount']).fillna(0)
         
-        for completed_field, headcount_field in utilization_rate_fields:
-            if completed_field in df.columns and headcount_field in df.columns:
-                df['Utilization Rate'] = (df[completed_field] / df[headcount_field]).fillna(0)
-                break
+        # Build the day/week/month/quarter/year rollup the dashboard charts read from
+        get_utilization_rollup(df)
     
     return df 
\ No newline at end of file
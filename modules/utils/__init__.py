@@ -1,7 +1,21 @@
 # This file makes the utils directory a Python package
-from modules.utils.data_processing import airtable_to_dataframe, apply_filters
+from modules.utils.data_processing import (
+    airtable_to_dataframe, apply_filters, explode_list_column, list_contains_mask, primary_list_value
+)
+from modules.utils.rollups import UtilizationRollup, get_utilization_rollup
+from modules.utils.pnl_aggregates import PnLAggregates, get_pnl_aggregates
+from modules.utils.patient_dimension import PatientDimension, get_patient_dimension
 
 __all__ = [
     'airtable_to_dataframe',
-    'apply_filters'
-] 
\ No newline at end of file
+    'apply_filters',
+    'explode_list_column',
+    'list_contains_mask',
+    'primary_list_value',
+    'UtilizationRollup',
+    'get_utilization_rollup',
+    'PnLAggregates',
+    'get_pnl_aggregates',
+    'PatientDimension',
+    'get_patient_dimension'
+]
\ No newline at end of file
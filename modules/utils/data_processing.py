@@ -3,14 +3,61 @@ import numpy as np
 import streamlit as st
 from datetime import datetime, timedelta
 import re
+from modules.utils.filter_engine import get_filter_index, freeze_filter
 
-def airtable_to_dataframe(airtable_data, verbose=False):
+def _first_value(value):
+    """Unwrap single values that Airtable returns as lists (lookups, rollups)"""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+def _as_str_list(value):
+    """Normalize a list-of-strings cell (None becomes an empty list)"""
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None]
+    if value is None:
+        return []
+    return [str(value)]
+
+def _typed_column(values, dtype):
+    """
+    Build a typed column from raw Airtable values
+    
+    Args:
+        values: List of cell values, one per record
+        dtype: 'category', 'datetime', 'list', 'text' or a numeric dtype such as 'float32'
+        
+    Returns:
+        Array-like suitable for a DataFrame column
+    """
+    if dtype == 'list':
+        return pd.Series([_as_str_list(value) for value in values], dtype=object)
+    
+    values = [_first_value(value) for value in values]
+    
+    if dtype == 'text':
+        return pd.Series(values, dtype=object)
+    if dtype == 'category':
+        return pd.Categorical(values)
+    if dtype == 'datetime':
+        # Airtable always returns ISO 8601 dates and timestamps
+        return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='ISO8601')
+    
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype(dtype)
+
+def airtable_to_dataframe(airtable_data, verbose=False, schema=None):
     """
     Convert Airtable API response to a Pandas DataFrame with robust error handling
     
+    Columns are built directly from the records in a single pass. When a schema
+    is given, its fields are renamed and converted to their declared dtypes (and
+    always present, even if no record has a value); other fields are kept as-is.
+    
     Args:
         airtable_data: API response from Airtable
         verbose: Whether to show detailed processing information
+        schema: Optional mapping of source field (ID or name) to (column name, dtype),
+            see modules.airtable.schema.get_base_schema
         
     Returns:
         Pandas DataFrame with cleaned data
@@ -21,27 +68,38 @@ def airtable_to_dataframe(airtable_data, verbose=False):
         return pd.DataFrame()
     
     try:
-        records = []
-        record_errors = 0
-        
-        for record in airtable_data['records']:
-            try:
-                # Extract fields and add record ID
-                row = record.get('fields', {}).copy()
-                row['id'] = record.get('id', '')
-                row['createdTime'] = record.get('createdTime', '')
-                records.append(row)
-            except Exception as e:
-                record_errors += 1
-                if verbose:
-                    st.warning(f"⚠️ Error processing record: {str(e)}")
-                continue
+        records = airtable_data['records']
+        record_count = len(records)
         
-        if record_errors > 0 and verbose:
-            st.warning(f"⚠️ Encountered errors in {record_errors} records")
+        # One pass over the records, filling a value list per field
+        columns = {}
+        ids = [''] * record_count
+        created_times = [''] * record_count
+        
+        for i, record in enumerate(records):
+            ids[i] = record.get('id', '')
+            created_times[i] = record.get('createdTime', '')
             
-        # Create DataFrame from records
-        df = pd.DataFrame(records)
+            for name, value in record.get('fields', {}).items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * record_count
+                column[i] = value
+        
+        data = {}
+        
+        if schema:
+            for source, (column_name, dtype) in schema.items():
+                data[column_name] = _typed_column(columns.pop(source, [None] * record_count), dtype)
+        
+        for name, values in columns.items():
+            data[name] = pd.Series(values)
+        
+        data['id'] = ids
+        data['createdTime'] = created_times
+        
+        # Create DataFrame from the columns
+        df = pd.DataFrame(data) if record_count else pd.DataFrame()
         
         if verbose:
             st.success(f"✅ Successfully converted {len(df)} records to DataFrame")
@@ -61,6 +119,57 @@ def airtable_to_dataframe(airtable_data, verbose=False):
             st.error(f"❌ Error converting Airtable data to DataFrame: {str(e)}")
         return pd.DataFrame()
 
+def explode_list_column(df, column):
+    """
+    Bridge table for a linked-record or lookup column
+    
+    Lists are exploded in one vectorized step into a categorical Series with one
+    entry per (row, item), indexed by the row labels of df. Scalar cells pass
+    through as single items and empty lists are dropped.
+    
+    Args:
+        df: DataFrame containing the column
+        column: Name of the list column
+        
+    Returns:
+        Categorical Series of items indexed by the row labels of df
+    """
+    items = df[column].explode()
+    return items[items.notna()].astype(str).astype('category')
+
+def list_contains_mask(df, column, values):
+    """
+    Boolean mask of rows whose list column contains any of the values
+    
+    Args:
+        df: DataFrame containing the column
+        column: Name of the list (or scalar) column
+        values: Values to match, compared as strings
+        
+    Returns:
+        Boolean numpy array aligned with df
+    """
+    bridge = explode_list_column(df, column)
+    wanted = bridge.cat.categories.isin([str(v) for v in values])
+    return df.index.isin(bridge.index[wanted[bridge.cat.codes]])
+
+def primary_list_value(series):
+    """
+    First item of each list cell as a categorical (NaN for empty lists)
+    
+    Scalar cells are kept as they are, so columns that mix lists and plain
+    values (e.g. fields resolved through aliases) get one label per row too.
+    
+    Args:
+        series: Series of lists, as produced for 'list' schema fields
+        
+    Returns:
+        Categorical Series aligned with the input
+    """
+    items = series.reset_index(drop=True).explode()
+    first = items[~items.index.duplicated()]
+    return pd.Series(first.to_numpy(), index=series.index).astype('category')
+
 def clean_dataframe(df, date_cols=None, numeric_cols=None, text_cols=None, boolean_cols=None, verbose=False):
     """
     Clean and standardize a DataFrame for analysis
@@ -170,6 +279,11 @@ def apply_filters(df, filters, verbose=False):
     """
     Apply filters to a DataFrame with enhanced functionality and error handling
     
+    Masks come from the frame's FilterIndex (see modules.utils.filter_engine), so
+    each filter value is evaluated once per loaded frame and the combined mask
+    is memoized per filter state. The frame is only copied once, by the final
+    selection.
+    
     Args:
         df: DataFrame to filter
         filters: Dictionary of filter parameters
@@ -181,99 +295,14 @@ def apply_filters(df, filters, verbose=False):
     if not filters or df.empty:
         return df.copy()
     
-    filtered_df = df.copy()
-    applied_filters = []
-    
     try:
-        # Apply column filters
-        for column, value in filters.items():
-            if column in filtered_df.columns and value:
-                original_count = len(filtered_df)
-                
-                # List filter (multi-select)
-                if isinstance(value, list):
-                    if value and value[0] != "All":  # Skip if "All" is selected
-                        # Handle case where column might contain lists
-                        if any(isinstance(x, list) for x in filtered_df[column].dropna()):
-                            # For columns containing lists, check if filter value is in the list
-                            mask = filtered_df[column].apply(
-                                lambda x: any(str(v) in [str(i) for i in x] for v in value) if isinstance(x, list) 
-                                else str(x) in [str(v) for v in value] if x is not None else False
-                            )
-                            filtered_df = filtered_df[mask]
-                            filter_desc = f"{column} in [{', '.join(str(v) for v in value[:3])}{'...' if len(value) > 3 else ''}]"
-                        else:
-                            # Convert both sides to strings for comparison to handle mixed types
-                            value_str = [str(v) for v in value]
-                            filtered_df = filtered_df[filtered_df[column].astype(str).isin(value_str)]
-                            filter_desc = f"{column} in [{', '.join(str(v) for v in value[:3])}{'...' if len(value) > 3 else ''}]"
-                
-                # Date range filter
-                elif isinstance(value, tuple) and len(value) == 2:
-                    start_date, end_date = value
-                    if pd.api.types.is_datetime64_dtype(filtered_df[column]):
-                        filtered_df = filtered_df[(filtered_df[column] >= start_date) & 
-                                                (filtered_df[column] <= end_date)]
-                        filter_desc = f"{column} between {start_date.strftime('%Y-%m-%d')} and {end_date.strftime('%Y-%m-%d')}"
-                    else:
-                        # Try to convert to datetime if not already
-                        try:
-                            temp_col = pd.to_datetime(filtered_df[column], errors='coerce')
-                            filtered_df = filtered_df[(temp_col >= start_date) & (temp_col <= end_date)]
-                            filter_desc = f"{column} between {start_date.strftime('%Y-%m-%d')} and {end_date.strftime('%Y-%m-%d')}"
-                        except:
-                            # Skip if conversion fails
-                            if verbose:
-                                st.warning(f"⚠️ Could not apply date filter to column '{column}'")
-                            continue
-                
-                # Numeric range filter
-                elif isinstance(value, tuple) and len(value) > 2 and value[0] == 'range':
-                    min_val, max_val = value[1], value[2]
-                    try:
-                        if pd.api.types.is_numeric_dtype(filtered_df[column]):
-                            filtered_df = filtered_df[(filtered_df[column] >= min_val) & 
-                                                    (filtered_df[column] <= max_val)]
-                        else:
-                            # Try to convert to numeric
-                            temp_col = pd.to_numeric(filtered_df[column], errors='coerce')
-                            filtered_df = filtered_df[(temp_col >= min_val) & (temp_col <= max_val)]
-                        filter_desc = f"{column} between {min_val} and {max_val}"
-                    except:
-                        if verbose:
-                            st.warning(f"⚠️ Could not apply numeric range filter to column '{column}'")
-                        continue
-                
-                # Text search filter
-                elif isinstance(value, str) and value.lower() != "all":
-                    # Case-insensitive text search on string representation of values
-                    filtered_df = filtered_df[filtered_df[column].astype(str).str.contains(value, case=False, na=False)]
-                    filter_desc = f"{column} contains '{value}'"
-                
-                # Boolean filter
-                elif isinstance(value, bool):
-                    try:
-                        # Try direct comparison first
-                        filtered_df = filtered_df[filtered_df[column] == value]
-                        filter_desc = f"{column} is {value}"
-                    except:
-                        # Fall back to string comparison for mixed types
-                        filtered_df = filtered_df[filtered_df[column].astype(str).str.lower() == str(value).lower()]
-                        filter_desc = f"{column} is {value}"
-                
-                # Record the effect of this filter
-                filtered_count = len(filtered_df)
-                reduction = original_count - filtered_count
-                reduction_pct = (reduction / original_count * 100) if original_count > 0 else 0
-                
-                applied_filters.append({
-                    'column': column,
-                    'description': filter_desc,
-                    'records_before': original_count,
-                    'records_after': filtered_count,
-                    'reduction': reduction,
-                    'reduction_pct': reduction_pct
-                })
+        index = get_filter_index(df)
+        mask, applied_filters = index.cached(
+            ('apply_filters', freeze_filter(filters)),
+            lambda: _combined_filter_mask(index, df, filters, verbose)
+        )
+        
+        filtered_df = df[mask] if mask is not None else df.copy()
         
         if verbose and applied_filters:
             with st.expander("🔍 Filter Details", expanded=False):
@@ -282,13 +311,12 @@ def apply_filters(df, filters, verbose=False):
                     st.write(f"- {f['description']}: reduced records by {f['reduction']} ({f['reduction_pct']:.1f}%)")
                 
                 # Show the overall reduction
-                if applied_filters:
-                    initial_count = df.shape[0]
-                    final_count = filtered_df.shape[0]
-                    overall_reduction = initial_count - final_count
-                    overall_pct = (overall_reduction / initial_count * 100) if initial_count > 0 else 0
-                    
-                    st.write(f"**Overall:** {initial_count:,} → {final_count:,} records ({overall_pct:.1f}% reduction)")
+                initial_count = df.shape[0]
+                final_count = filtered_df.shape[0]
+                overall_reduction = initial_count - final_count
+                overall_pct = (overall_reduction / initial_count * 100) if initial_count > 0 else 0
+                
+                st.write(f"**Overall:** {initial_count:,} → {final_count:,} records ({overall_pct:.1f}% reduction)")
         
         return filtered_df
         
@@ -297,17 +325,213 @@ def apply_filters(df, filters, verbose=False):
             st.error(f"❌ Error applying filters: {str(e)}")
         return df  # Return original DataFrame on error
 
+def _filter_mask(index, df, column, value, verbose=False):
+    """
+    Mask and description for a single filter, or (None, None) if it doesn't apply
+    """
+    # List filter (multi-select)
+    if isinstance(value, list):
+        if value[0] == "All":  # Skip if "All" is selected
+            return None, None
+        # Values are compared as strings; list cells match on any item
+        description = f"{column} in [{', '.join(str(v) for v in value[:3])}{'...' if len(value) > 3 else ''}]"
+        return index.isin_mask(column, value), description
+    
+    # Date range filter
+    if isinstance(value, tuple) and len(value) == 2:
+        start_date, end_date = value
+        try:
+            mask = index.date_mask(column, start_date, end_date)
+        except Exception:
+            # Skip if conversion fails
+            if verbose:
+                st.warning(f"⚠️ Could not apply date filter to column '{column}'")
+            return None, None
+        return mask, f"{column} between {start_date.strftime('%Y-%m-%d')} and {end_date.strftime('%Y-%m-%d')}"
+    
+    # Numeric range filter
+    if isinstance(value, tuple) and len(value) > 2 and value[0] == 'range':
+        min_val, max_val = value[1], value[2]
+        try:
+            mask = index.range_mask(column, min_val, max_val)
+        except Exception:
+            if verbose:
+                st.warning(f"⚠️ Could not apply numeric range filter to column '{column}'")
+            return None, None
+        return mask, f"{column} between {min_val} and {max_val}"
+    
+    # Text search filter
+    if isinstance(value, str) and value.lower() != "all":
+        # Case-insensitive text search on string representation of values
+        return index.contains_mask(column, value), f"{column} contains '{value}'"
+    
+    # Boolean filter
+    if isinstance(value, bool):
+        return index.equals_mask(column, value), f"{column} is {value}"
+    
+    return None, None
+
+def _combined_filter_mask(index, df, filters, verbose=False):
+    """
+    AND together the masks of every applicable filter, recording each filter's effect
+    
+    Returns:
+        Tuple of (boolean mask or None if no filter applied, list of applied filter details)
+    """
+    mask = None
+    applied_filters = []
+    
+    for column, value in filters.items():
+        if column not in df.columns or not value:
+            continue
+        
+        filter_mask, description = _filter_mask(index, df, column, value, verbose)
+        if filter_mask is None:
+            continue
+        
+        original_count = len(df) if mask is None else int(mask.sum())
+        
+        # Combine in place so no intermediate frames or masks are created
+        if mask is None:
+            mask = filter_mask.copy()
+        else:
+            np.logical_and(mask, filter_mask, out=mask)
+        
+        # Record the effect of this filter
+        filtered_count = int(mask.sum())
+        reduction = original_count - filtered_count
+        reduction_pct = (reduction / original_count * 100) if original_count > 0 else 0
+        
+        applied_filters.append({
+            'column': column,
+            'description': description,
+            'records_before': original_count,
+            'records_after': filtered_count,
+            'reduction': reduction,
+            'reduction_pct': reduction_pct
+        })
+    
+    return mask, applied_filters
+
+# Aggregations calculate_metrics can compile into a single groupby().agg()
+METRIC_FUNCTIONS = ('sum', 'mean', 'median', 'min', 'max', 'count', 'nunique')
+
+# Aggregations that are 0 (rather than missing) for an empty group
+EMPTY_GROUP_ZERO_FUNCTIONS = ('sum', 'count', 'nunique')
+
+def _group_codes(df, groupby):
+    """
+    Integer group codes and group keys for df, cached per frame and groupby
+    
+    Later aggregations group on the integer codes, so the key columns are only
+    hashed once per loaded frame. Also returns every group key a plain
+    groupby reports, which includes unobserved categories of categorical keys.
+    """
+    keys = tuple(groupby) if isinstance(groupby, (list, tuple)) else (groupby,)
+    
+    def build():
+        grouped = df.groupby(list(keys), observed=True, sort=True)
+        observed = grouped.size().index
+        all_keys = observed
+        if any(isinstance(df[key].dtype, pd.CategoricalDtype) for key in keys):
+            all_keys = df.groupby(list(keys), observed=False, sort=True).size().index
+        return grouped.ngroup().to_numpy(), observed, all_keys
+    
+    return get_filter_index(df).derived(('group_codes', keys), build)
+
+def _compile_metrics(df, metrics_config, verbose=False):
+    """
+    Compile a metrics config into named aggregations
+    
+    Returns:
+        Tuple of (narrow working DataFrame, named aggregation dict, list of
+        (name, kind, parts) describing how to finish each metric)
+    """
+    columns = {}
+    aggregations = {}
+    finishers = []
+    
+    def aggregate(column, func):
+        label = f"__{func}__{column}"
+        columns[column] = df[column]
+        aggregations[label] = (column, func)
+        return label
+    
+    for i, metric in enumerate(metrics_config):
+        col = metric.get('column')
+        func = metric.get('function', 'sum')
+        name = metric.get('name', f"{func}({col})")
+        
+        if func == 'ratio':
+            # Sum of numerator over sum of denominator (e.g. completed / booked)
+            numerator, denominator = metric.get('numerator'), metric.get('denominator')
+            missing = [c for c in (numerator, denominator) if c not in df.columns]
+            if missing:
+                if verbose:
+                    st.warning(f"⚠️ Column '{missing[0]}' not found in DataFrame, skipping metric '{name}'")
+                continue
+            finishers.append((name, 'ratio', (aggregate(numerator, 'sum'), aggregate(denominator, 'sum'))))
+            continue
+        
+        if col not in df.columns:
+            if verbose:
+                st.warning(f"⚠️ Column '{col}' not found in DataFrame, skipping metric '{name}'")
+            continue
+        
+        if func == 'weighted_mean':
+            # Sum of value × weight over sum of weight, ignoring rows missing either
+            weight = metric.get('weight')
+            if weight not in df.columns:
+                if verbose:
+                    st.warning(f"⚠️ Column '{weight}' not found in DataFrame, skipping metric '{name}'")
+                continue
+            values = pd.to_numeric(df[col], errors='coerce')
+            weights = pd.to_numeric(df[weight], errors='coerce').where(values.notna())
+            product_col = f"__weighted_{i}"
+            weight_col = f"__weight_{i}"
+            columns[product_col] = values * weights
+            columns[weight_col] = weights
+            aggregations[product_col] = (product_col, 'sum')
+            aggregations[weight_col] = (weight_col, 'sum')
+            finishers.append((name, 'ratio', (product_col, weight_col)))
+        elif func in METRIC_FUNCTIONS:
+            finishers.append((name, 'value', (aggregate(col, func),)))
+        else:
+            if verbose:
+                st.warning(f"⚠️ Unknown function '{func}', skipping metric '{name}'")
+    
+    return pd.DataFrame(columns, index=df.index), aggregations, finishers
+
+def _finish_metrics(aggregated, finishers):
+    """Turn the aggregated columns into the named metric columns"""
+    result = pd.DataFrame(index=aggregated.index)
+    
+    for name, kind, parts in finishers:
+        if kind == 'ratio':
+            numerator, denominator = aggregated[parts[0]], aggregated[parts[1]]
+            result[name] = numerator / denominator.where(denominator != 0)
+        else:
+            result[name] = aggregated[parts[0]]
+    
+    return result
+
 def calculate_metrics(df, metrics_config, groupby=None, verbose=False):
     """
     Calculate multiple metrics from a DataFrame with support for grouping
     
+    The whole config is compiled into one named-aggregation groupby().agg(),
+    grouped on integer codes that are cached per frame.
+    
     Args:
         df: DataFrame to analyze
         metrics_config: List of dictionaries with metric configurations
             Each metric dict should have:
             - 'name': Display name for the metric
             - 'column': Column to calculate from
-            - 'function': Function to apply ('sum', 'mean', 'median', 'min', 'max', 'count', 'nunique', etc.)
+            - 'function': Function to apply ('sum', 'mean', 'median', 'min', 'max', 'count', 'nunique',
+              'weighted_mean' or 'ratio')
+            - 'weight': Weight column (for 'weighted_mean')
+            - 'numerator', 'denominator': Columns whose sums are divided (for 'ratio', instead of 'column')
             - 'format': (optional) Format string (e.g., '${:,.2f}', '{:.1%}')
             - 'suffix': (optional) Suffix to append (e.g., '%', '$')
         groupby: Column or list of columns to group by before calculating metrics
@@ -322,99 +546,70 @@ def calculate_metrics(df, metrics_config, groupby=None, verbose=False):
         return {} if groupby is None else pd.DataFrame()
     
     try:
+        work, aggregations, finishers = _compile_metrics(df, metrics_config, verbose)
+        
         # If groupby is provided, calculate metrics for each group
         if groupby is not None:
-            result = pd.DataFrame()
+            if not finishers:
+                return pd.DataFrame()
             
-            for metric in metrics_config:
-                col = metric.get('column')
-                func = metric.get('function', 'sum')
-                name = metric.get('name', f"{func}({col})")
-                
-                if col not in df.columns:
-                    if verbose:
-                        st.warning(f"⚠️ Column '{col}' not found in DataFrame, skipping metric '{name}'")
-                    continue
-                
-                # Use groupby and aggregate
-                if func == 'sum':
-                    grouped = df.groupby(groupby)[col].sum()
-                elif func == 'mean':
-                    grouped = df.groupby(groupby)[col].mean()
-                elif func == 'median':
-                    grouped = df.groupby(groupby)[col].median()
-                elif func == 'min':
-                    grouped = df.groupby(groupby)[col].min()
-                elif func == 'max':
-                    grouped = df.groupby(groupby)[col].max()
-                elif func == 'count':
-                    grouped = df.groupby(groupby)[col].count()
-                elif func == 'nunique':
-                    grouped = df.groupby(groupby)[col].nunique()
-                else:
-                    if verbose:
-                        st.warning(f"⚠️ Unknown function '{func}', skipping metric '{name}'")
-                    continue
-                
-                # Add to result DataFrame
-                result[name] = grouped
+            codes, keys, all_keys = _group_codes(df, groupby)
+            
+            # Rows with a missing group key get code -1 and are left out, as in a regular groupby
+            if (codes < 0).any():
+                work, codes = work[codes >= 0], codes[codes >= 0]
+            
+            aggregated = work.groupby(codes, sort=True).agg(**aggregations)
+            aggregated.index = keys.take(aggregated.index.to_numpy())
+            
+            # Unobserved categories are kept as empty groups, as in a regular groupby
+            if len(all_keys) > len(aggregated):
+                dtypes = aggregated.dtypes
+                aggregated = aggregated.reindex(all_keys)
+                for label, (_, func) in aggregations.items():
+                    if func in EMPTY_GROUP_ZERO_FUNCTIONS:
+                        aggregated[label] = aggregated[label].fillna(0).astype(dtypes[label])
             
-            return result.reset_index()
+            return _finish_metrics(aggregated, finishers).reset_index()
         
         # If no groupby, calculate metrics for the entire DataFrame
-        else:
-            result = {}
+        result = {}
+        
+        if not finishers:
+            return result
+        
+        aggregated = work.groupby(np.zeros(len(work), dtype=np.int8)).agg(**aggregations)
+        totals = _finish_metrics(aggregated, finishers).iloc[0]
+        
+        for metric in metrics_config:
+            func = metric.get('function', 'sum')
+            name = metric.get('name', f"{func}({metric.get('column')})")
+            format_str = metric.get('format')
+            suffix = metric.get('suffix', '')
             
-            for metric in metrics_config:
-                col = metric.get('column')
-                func = metric.get('function', 'sum')
-                name = metric.get('name', f"{func}({col})")
-                format_str = metric.get('format')
-                suffix = metric.get('suffix', '')
-                
-                if col not in df.columns:
-                    if verbose:
-                        st.warning(f"⚠️ Column '{col}' not found in DataFrame, skipping metric '{name}'")
-                    continue
-                
-                # Calculate the metric
-                if func == 'sum':
-                    value = df[col].sum()
-                elif func == 'mean':
-                    value = df[col].mean()
-                elif func == 'median':
-                    value = df[col].median()
-                elif func == 'min':
-                    value = df[col].min()
-                elif func == 'max':
-                    value = df[col].max()
-                elif func == 'count':
-                    value = df[col].count()
-                elif func == 'nunique':
-                    value = df[col].nunique()
-                else:
-                    if verbose:
-                        st.warning(f"⚠️ Unknown function '{func}', skipping metric '{name}'")
-                    continue
-                
-                # Format the value if a format string is provided
-                if format_str:
-                    try:
-                        formatted_value = format_str.format(value)
-                    except:
-                        formatted_value = f"{value}{suffix}"
-                else:
+            if name not in totals.index:
+                continue
+            
+            value = totals[name]
+            
+            # Format the value if a format string is provided
+            if format_str:
+                try:
+                    formatted_value = format_str.format(value)
+                except:
                     formatted_value = f"{value}{suffix}"
-                
-                # Add to result dictionary
-                result[name] = {
-                    'raw_value': value,
-                    'formatted_value': formatted_value
-                }
+            else:
+                formatted_value = f"{value}{suffix}"
             
-            return result
+            # Add to result dictionary
+            result[name] = {
+                'raw_value': value,
+                'formatted_value': formatted_value
+            }
+        
+        return result
     
     except Exception as e:
         if verbose:
             st.error(f"❌ Error calculating metrics: {str(e)}")
-        return {} if groupby is None else pd.DataFrame() 
\ No newline at end of file
+        return {} if groupby is None else pd.DataFrame()
@@ -0,0 +1,220 @@
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Filter masks kept per indexed frame (one entry per distinct filter)
+MAX_CACHED_MASKS = 64
+
+# Derived objects (rollups, aggregates, dimensions) kept per indexed frame, apart from the masks
+MAX_CACHED_DERIVED = 16
+
+def freeze_filter(value):
+    """Turn a filter value into a hashable cache key"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze_filter(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return (type(value).__name__,) + tuple(freeze_filter(v) for v in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+class FilterIndex:
+    """
+    Lookup structures for filtering one DataFrame repeatedly
+    
+    Built lazily per column and kept for the lifetime of the frame: categorical
+    codes for membership filters (via the exploded bridge for list columns),
+    sorted positions for date ranges, and converted numeric/text columns. Every
+    mask is a boolean numpy array aligned with the frame and is memoized per
+    filter value, so reruns with the same filter state don't rescan any rows.
+    Heavier derived objects are memoized in a separate store, so trying many
+    filter states only evicts masks.
+    """
+    
+    def __init__(self, df):
+        # Weak reference so the index never keeps its frame alive
+        self._df_ref = weakref.ref(df)
+        self.size = len(df)
+        self._columns = {}
+        self._masks = OrderedDict()
+        self._derived = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @property
+    def df(self):
+        return self._df_ref()
+    
+    def _memoized(self, store, limit, key, build):
+        """Look a value up in an LRU store, building and inserting it on a miss"""
+        with self._lock:
+            if key in store:
+                store.move_to_end(key)
+                return store[key]
+        
+        value = build()
+        
+        with self._lock:
+            store[key] = value
+            while len(store) > limit:
+                store.popitem(last=False)
+        
+        return value
+    
+    def cached(self, key, build):
+        """Return a memoized mask, building it on first use"""
+        return self._memoized(self._masks, MAX_CACHED_MASKS, key, build)
+    
+    def derived(self, key, build):
+        """
+        Return a memoized derived object (rollup, aggregates, coded columns), building it on first use
+        
+        The object must not hold a reference to the frame (the index only keeps
+        a weak one), so build what it needs from the frame eagerly.
+        """
+        return self._memoized(self._derived, MAX_CACHED_DERIVED, key, build)
+    
+    def _column(self, key, build):
+        """Per-column structure, built once"""
+        if key not in self._columns:
+            self._columns[key] = build()
+        return self._columns[key]
+    
+    def _codes(self, column):
+        """
+        (categories as strings, codes, row positions) for a column
+        
+        Object columns are exploded first so list cells match any of their items;
+        row positions map each code back to its row (None when one code per row).
+        """
+        def build():
+            series = self.df[column]
+            
+            if series.dtype == object:
+                items = series.reset_index(drop=True).explode()
+                items = items[items.notna()]
+                codes, categories = pd.factorize(items.astype(str))
+                return pd.Index(categories), codes, items.index.to_numpy()
+            
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                return series.cat.categories.astype(str), series.cat.codes.to_numpy(), None
+            
+            codes, categories = pd.factorize(series.astype(str))
+            return pd.Index(categories), codes, None
+        
+        return self._column(('codes', column), build)
+    
+    def isin_mask(self, column, values):
+        """Rows where the column (or any item of a list cell) matches one of the values as a string"""
+        def build():
+            categories, codes, positions = self._codes(column)
+            
+            # Code -1 (missing) indexes the trailing False
+            wanted = np.append(categories.isin([str(v) for v in values]), False)
+            hits = wanted[codes]
+            
+            if positions is None:
+                return hits
+            
+            mask = np.zeros(self.size, dtype=bool)
+            mask[positions[hits]] = True
+            return mask
+        
+        return self.cached(('isin', column, freeze_filter(values)), build)
+    
+    def _sorted_dates(self, column):
+        """(sorted datetime64 values, row order) for a column, NaT last"""
+        def build():
+            series = self.df[column]
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                series = pd.to_datetime(series, errors='coerce')
+            
+            values = series.to_numpy(dtype='datetime64[ns]')
+            order = np.argsort(values, kind='stable')
+            return values[order], order
+        
+        return self._column(('dates', column), build)
+    
+    def date_mask(self, column, start, end):
+        """Rows whose date falls between start and end (inclusive), via binary search"""
+        def build():
+            values, order = self._sorted_dates(column)
+            lo = np.searchsorted(values, np.datetime64(pd.Timestamp(start).tz_localize(None)), side='left')
+            hi = np.searchsorted(values, np.datetime64(pd.Timestamp(end).tz_localize(None)), side='right')
+            
+            mask = np.zeros(self.size, dtype=bool)
+            mask[order[lo:hi]] = True
+            return mask
+        
+        return self.cached(('dates', column, freeze_filter(start), freeze_filter(end)), build)
+    
+    def year_mask(self, column, year):
+        """Rows whose date falls in the given year"""
+        def build():
+            return self.date_mask(column, pd.Timestamp(year=year, month=1, day=1),
+                                  pd.Timestamp(year=year, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999))
+        
+        return self.cached(('year', column, year), build)
+    
+    def range_mask(self, column, min_val, max_val):
+        """Rows whose numeric value falls between min_val and max_val (inclusive)"""
+        def build():
+            values = self._column(
+                ('numeric', column),
+                lambda: pd.to_numeric(self.df[column], errors='coerce').to_numpy(dtype=float)
+            )
+            return (values >= min_val) & (values <= max_val)
+        
+        return self.cached(('range', column, min_val, max_val), build)
+    
+    def contains_mask(self, column, text):
+        """Rows whose string value contains the text (case-insensitive)"""
+        def build():
+            values = self._column(('text', column), lambda: self.df[column].astype(str).str.lower())
+            return values.str.contains(text.lower(), regex=False, na=False).to_numpy()
+        
+        return self.cached(('contains', column, text), build)
+    
+    def equals_mask(self, column, value):
+        """Rows where the column equals the value, falling back to a string comparison"""
+        def build():
+            try:
+                return (self.df[column] == value).to_numpy()
+            except Exception:
+                values = self._column(('text', column), lambda: self.df[column].astype(str).str.lower())
+                return (values == str(value).lower()).to_numpy()
+        
+        return self.cached(('equals', column, value), build)
+
+# Indexes keyed by id() of the frame; entries are dropped when the frame is collected
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _forget(key):
+    with _indexes_lock:
+        _indexes.pop(key, None)
+
+def get_filter_index(df):
+    """
+    Get the FilterIndex for a DataFrame, building it on first use
+    
+    Frames loaded into session state keep their index across Streamlit reruns.
+    The frame must not be modified in place after it has been indexed (masks and
+    derived objects would go stale): callers that add or change columns work on
+    a copy.
+    """
+    key = id(df)
+    
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+    
+    index = FilterIndex(df)
+    
+    with _indexes_lock:
+        _indexes[key] = (weakref.ref(df), index)
+    weakref.finalize(df, _forget, key)
+    
+    return index
@@ -0,0 +1,166 @@
+import pandas as pd
+import numpy as np
+from modules.utils.filter_engine import get_filter_index, freeze_filter
+
+# Appointment columns a patient is identified and described by
+PATIENT_KEY = 'Email'
+PATIENT_COLUMNS = ['Customer', 'Phone', 'Service', 'Business', 'Status', 'Duration (min)', 'Start Date']
+
+# Text columns grouped or counted by their category codes
+PATIENT_CODED_COLUMNS = [PATIENT_KEY, 'Customer', 'Phone', 'Service', 'Business']
+
+class PatientDimension:
+    """
+    Patient dimension of an appointments frame, built in one pass
+    
+    Text columns are hashed once into categoricals, and the appointments are
+    grouped on their codes per grain: per patient (email), per email and
+    customer name, and per email, customer and phone. Lambda aggregations
+    are replaced by vectorized equivalents: cancellation rates are means of
+    a boolean column, preferred businesses are modes taken from category
+    codes, and service lists are joined after one sort of the distinct
+    (group, service) code pairs. Rows with a missing key are left out, as
+    with groupby.
+    """
+    
+    def __init__(self, df):
+        self.columns = [col for col in PATIENT_COLUMNS if col in df.columns]
+        frame = df[[PATIENT_KEY] + self.columns]
+        frame = frame.astype({col: 'category' for col in PATIENT_CODED_COLUMNS if col in frame.columns})
+        
+        if 'Status' in self.columns:
+            # Rows without a status count as not cancelled
+            frame['Cancelled'] = frame['Status'] == "Cancelled"
+        
+        # Latest details first (by appointment start, most recent first)
+        latest_columns = [col for col in ['Customer', 'Phone', 'Start Date'] if col in self.columns]
+        recent = frame.sort_values('Start Date', ascending=False) if 'Start Date' in self.columns else frame
+        
+        self.latest = _decode(recent.groupby(PATIENT_KEY, observed=True)[latest_columns].first())
+        
+        self.patients = self._patients(frame)
+        
+        if 'Customer' in self.columns:
+            self.usage = self._usage(frame)
+        else:
+            self.usage = pd.DataFrame()
+        
+        if all(col in self.columns for col in ['Customer', 'Phone', 'Start Date']):
+            self.contacts = _decode(recent.groupby([PATIENT_KEY, 'Customer', 'Phone'], observed=True)[['Start Date']].first())
+        else:
+            self.contacts = pd.DataFrame()
+    
+    def _patients(self, frame):
+        """One row per email with booking counts, visit dates and the cancellation rate"""
+        grouped = frame.groupby(PATIENT_KEY, observed=True)
+        patients = pd.DataFrame(index=grouped.size().index)
+        
+        if 'Customer' in self.columns:
+            patients['Customer'] = grouped['Customer'].first()
+        if 'Service' in self.columns:
+            patients['Total_Appointments'] = grouped['Service'].count()
+            patients['Service_Count'] = grouped['Service'].nunique()
+        if 'Business' in self.columns:
+            patients['Unique_Businesses'] = grouped['Business'].nunique()
+        if 'Duration (min)' in self.columns:
+            patients['Total_Duration'] = grouped['Duration (min)'].sum()
+        if 'Start Date' in self.columns:
+            patients['First_Visit'] = grouped['Start Date'].min()
+            patients['Last_Visit'] = grouped['Start Date'].max()
+        if 'Status' in self.columns:
+            patients['Cancellation_Rate'] = grouped['Cancelled'].mean() * 100
+        
+        return _decode(patients)
+    
+    def _usage(self, frame):
+        """One row per (email, customer) with service counts, the service list and the preferred business"""
+        grouped = frame.groupby([PATIENT_KEY, 'Customer'], observed=True)
+        codes = grouped.ngroup().fillna(-1).astype(int).to_numpy()  # -1 for rows with a missing key
+        usage = pd.DataFrame(index=grouped.size().index)
+        
+        if 'Service' in self.columns:
+            usage['Service_Count'] = grouped['Service'].count()
+            
+            # Distinct services of each group, sorted once by (group, service code)
+            services = frame['Service'].cat
+            pairs = pd.DataFrame({'group': codes, 'service': services.codes.to_numpy()})
+            pairs = pairs[(pairs['group'] >= 0) & (pairs['service'] >= 0)].drop_duplicates()
+            pairs = pairs.sort_values(['group', 'service'])
+            
+            # Split the sorted services at the group boundaries
+            pair_groups = pairs['group'].to_numpy()
+            names = services.categories.to_numpy()[pairs['service'].to_numpy()].tolist()
+            starts = np.flatnonzero(np.r_[True, pair_groups[1:] != pair_groups[:-1]]) if len(pair_groups) else np.array([], dtype=int)
+            ends = np.r_[starts[1:], len(names)]
+            
+            service_lists = np.full(len(usage), "", dtype=object)
+            service_lists[pair_groups[starts]] = [", ".join(names[start:end]) for start, end in zip(starts.tolist(), ends.tolist())]
+            usage['Services'] = service_lists
+        
+        if 'Business' in self.columns:
+            usage['Preferred_Business'] = _group_mode(codes, frame['Business'], len(usage))
+        
+        if 'Duration (min)' in self.columns:
+            usage['Avg_Duration'] = grouped['Duration (min)'].mean()
+        
+        return _decode(usage)
+    
+    def service_distribution(self):
+        """Number of patients per count of distinct services used"""
+        distribution = self.patients['Service_Count'].value_counts().reset_index()
+        distribution.columns = ['Number_of_Services', 'Patient_Count']
+        return distribution.sort_values('Number_of_Services')
+
+def _decode(table):
+    """Turn the categorical keys and columns of a grouped table back into plain values"""
+    if isinstance(table.index, pd.MultiIndex):
+        levels = [table.index.get_level_values(level) for level in range(table.index.nlevels)]
+        table.index = pd.MultiIndex.from_arrays([level.astype(level.categories.dtype) for level in levels], names=table.index.names)
+    else:
+        table.index = table.index.astype(table.index.categories.dtype)
+    
+    for col in table.columns:
+        if isinstance(table[col].dtype, pd.CategoricalDtype):
+            table[col] = table[col].astype(table[col].cat.categories.dtype)
+    
+    return table
+
+def _group_mode(codes, values, group_count):
+    """
+    Most frequent value per group, from category codes
+    
+    Ties go to the smallest value, as with Series.mode().iloc[0] (categories
+    are sorted); groups without any value get "".
+    """
+    value_codes = values.cat.codes.to_numpy()
+    valid = (codes >= 0) & (value_codes >= 0)
+    
+    counts = pd.DataFrame({'group': codes[valid], 'value': value_codes[valid]}).value_counts().reset_index(name='count')
+    best = counts.sort_values(['group', 'count', 'value'], ascending=[True, False, True]).drop_duplicates('group')
+    
+    modes = np.full(group_count, "", dtype=object)
+    modes[best['group'].to_numpy()] = values.cat.categories.to_numpy()[best['value'].to_numpy()]
+    return modes
+
+def get_patient_dimension(df, source=None, filters=None):
+    """
+    Get the patient dimension of an appointments DataFrame, building it on first use
+    
+    Cached with the frame's FilterIndex, so every patient view of a loaded (or
+    filtered) frame reads the same dimension instead of regrouping the rows.
+    
+    Args:
+        df: DataFrame of appointments to describe
+        source: Frame df was filtered from. Filtered copies are rebuilt on every
+            rerun, so their dimensions are cached on the source frame instead
+        filters: Filter state that selected df from source (any value
+            freeze_filter accepts)
+        
+    Returns:
+        PatientDimension of df
+    """
+    if source is None:
+        return get_filter_index(df).derived(('patient_dimension', tuple(df.columns)), lambda: PatientDimension(df))
+    
+    key = ('patient_dimension', tuple(df.columns), freeze_filter(filters))
+    return get_filter_index(source).derived(key, lambda: PatientDimension(df))
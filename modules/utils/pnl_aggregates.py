@@ -0,0 +1,278 @@
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+from modules.utils.filter_engine import get_filter_index, freeze_filter
+from modules.utils.data_processing import apply_filters, explode_list_column, primary_list_value
+
+# Summed PnL measures (Service_Days defaults to 1 per record when missing)
+PNL_MEASURES = [
+    'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit', 'Service_Days',
+    'Revenue_WellnessFund', 'Revenue_DentalClaim', 'Revenue_MedicalClaim_InclCancelled',
+    'Revenue_MissedAppointments', 'Revenue_EventTotal'
+]
+
+# Dimensions kept in the aggregate cells; filters on these slice the cells directly
+PNL_CLIENT_COLUMN = 'Client'
+PNL_MONTH_COLUMN = 'Service_Month'
+PNL_LOCATION_COLUMN = 'Site_Location'
+PNL_DIMENSIONS = [PNL_CLIENT_COLUMN, PNL_MONTH_COLUMN, PNL_LOCATION_COLUMN]
+
+# Filtered slices kept per set of aggregates (one entry per distinct filter state)
+MAX_CACHED_SLICES = 32
+
+class PnLAggregates:
+    """
+    Pre-aggregated PnL measures shared by the financial dashboards
+    
+    Measures are summed once per (client, service month, location set) cell,
+    where the location set is the record's list of Site_Location items. Linked
+    clients are kept as a client set too: client views are labelled by each
+    record's primary client, while client filters match any linked client.
+    Client, month and location views are derived from the cells and memoized,
+    and common filters on the dimensions slice the cells instead of the raw frame.
+    """
+    
+    def __init__(self, cells, locations, measures, clients=None):
+        self.cells = cells
+        self.locations = locations
+        self.clients = clients
+        self.measures = measures
+        self._views = {}
+        self._slices = OrderedDict()
+    
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Aggregate a PnL DataFrame into cells
+        
+        Args:
+            df: DataFrame with PnL records
+        
+        Returns:
+            PnLAggregates for the frame
+        """
+        measures = {col: pd.to_numeric(df[col], errors='coerce').astype('float64') for col in PNL_MEASURES if col in df.columns}
+        if 'Service_Days' not in measures:
+            measures['Service_Days'] = pd.Series(1.0, index=df.index)  # Default to 1 day per record
+        
+        frame = pd.DataFrame(measures, index=df.index)
+        keys = []
+        
+        # Linked clients: labelled by the primary client, filtered on any of them
+        clients = pd.DataFrame({'Client_Set': pd.Series(dtype='int64'), 'Client_List': pd.Series(dtype='category')})
+        if PNL_CLIENT_COLUMN in df.columns:
+            keys.append(PNL_CLIENT_COLUMN)
+            if df[PNL_CLIENT_COLUMN].dtype == object:
+                frame[PNL_CLIENT_COLUMN] = primary_list_value(df[PNL_CLIENT_COLUMN])
+                frame['Client_Set'], clients = _list_sets(df, PNL_CLIENT_COLUMN, 'Client_Set', 'Client_List')
+                keys.append('Client_Set')
+            else:
+                frame[PNL_CLIENT_COLUMN] = df[PNL_CLIENT_COLUMN]
+        
+        if PNL_MONTH_COLUMN in df.columns:
+            frame[PNL_MONTH_COLUMN] = pd.to_datetime(df[PNL_MONTH_COLUMN], errors='coerce')
+            keys.append(PNL_MONTH_COLUMN)
+        
+        # Code each record's list of locations, with a bridge from code to location
+        locations = pd.DataFrame({'Location_Set': pd.Series(dtype='int64'), 'Site_Location_List': pd.Series(dtype='category')})
+        if PNL_LOCATION_COLUMN in df.columns:
+            frame['Location_Set'], locations = _list_sets(df, PNL_LOCATION_COLUMN, 'Location_Set', 'Site_Location_List')
+            keys.append('Location_Set')
+        
+        measure_columns = list(measures)
+        if keys:
+            cells = frame.groupby(keys, observed=True, dropna=False, sort=True)[measure_columns].sum(min_count=0).reset_index()
+        else:
+            cells = frame[measure_columns].sum().to_frame().T
+        
+        return cls(cells, locations, measure_columns, clients)
+    
+    def _view(self, key, build):
+        """Memoized derived table"""
+        if key not in self._views:
+            self._views[key] = build()
+        return self._views[key]
+    
+    def totals(self):
+        """Series of each measure summed over all records"""
+        return self._view('totals', lambda: self.cells[self.measures].sum())
+    
+    def by_client(self):
+        """DataFrame of summed measures per client"""
+        return self._view('client', lambda: _observed(self.cells.groupby(PNL_CLIENT_COLUMN, observed=True)[self.measures].sum().reset_index(), PNL_CLIENT_COLUMN))
+    
+    def monthly(self):
+        """DataFrame of summed measures per calendar month (month end, empty months included)"""
+        def build():
+            dated = self.cells[self.cells[PNL_MONTH_COLUMN].notna()]
+            return dated.groupby(pd.Grouper(key=PNL_MONTH_COLUMN, freq='M'))[self.measures].sum().reset_index()
+        
+        return self._view('monthly', build)
+    
+    def monthly_by_client(self, clients):
+        """DataFrame of summed measures per (month, client) for the given clients"""
+        def build():
+            dated = self.cells[self.cells[PNL_MONTH_COLUMN].notna() & self.cells[PNL_CLIENT_COLUMN].isin(clients)]
+            grouped = dated.groupby([pd.Grouper(key=PNL_MONTH_COLUMN, freq='M'), PNL_CLIENT_COLUMN], observed=True)[self.measures].sum().reset_index()
+            return _observed(grouped, PNL_CLIENT_COLUMN)
+        
+        return self._view(('monthly_by_client', tuple(clients)), build)
+    
+    def by_location(self):
+        """DataFrame of summed measures per location (records count toward each of their locations)"""
+        def build():
+            bridged = self.cells[['Location_Set'] + self.measures].merge(self.locations, on='Location_Set')
+            return _observed(bridged.groupby('Site_Location_List', observed=True)[self.measures].sum().reset_index(), 'Site_Location_List')
+        
+        return self._view('location', build)
+    
+    def _bridge(self, column):
+        """(bridge, set column, item column) for a list dimension, or None if the cells hold the values"""
+        if column == PNL_LOCATION_COLUMN:
+            return self.locations, 'Location_Set', 'Site_Location_List'
+        if column == PNL_CLIENT_COLUMN and 'Client_Set' in self.cells.columns:
+            return self.clients, 'Client_Set', 'Client_List'
+        return None
+    
+    def _dimension_mask(self, column, value):
+        """
+        Cell mask for one filter, mirroring apply_filters (None when the filter doesn't apply)
+        
+        Raises:
+            ValueError: If the filter can't be evaluated on the cells
+        """
+        bridge = self._bridge(column)
+        
+        if isinstance(value, list):
+            if value[0] == "All":
+                return None
+            wanted = [str(v) for v in value]
+            if bridge is not None:
+                items, set_column, item_column = bridge
+                matching = items.loc[items[item_column].astype(str).isin(wanted), set_column]
+                return self.cells[set_column].isin(matching).to_numpy()
+            return self.cells[column].astype(str).isin(wanted).to_numpy()
+        
+        if isinstance(value, tuple) and len(value) == 2 and column == PNL_MONTH_COLUMN:
+            start, end = (pd.Timestamp(bound).tz_localize(None) for bound in value)
+            months = self.cells[PNL_MONTH_COLUMN]
+            return ((months >= start) & (months <= end)).to_numpy()
+        
+        if isinstance(value, str):
+            if value.lower() == "all":
+                return None
+            text = value.lower()
+            if bridge is not None:
+                items, set_column, item_column = bridge
+                names = items[item_column].astype(str).str.lower()
+                matching = items.loc[names.str.contains(text, regex=False).to_numpy(), set_column]
+                return self.cells[set_column].isin(matching).to_numpy()
+            return self.cells[column].astype(str).str.lower().str.contains(text, regex=False, na=False).to_numpy()
+        
+        raise ValueError(f"Filter on '{column}' can't be applied to the PnL aggregates")
+    
+    def slice(self, filters, columns):
+        """
+        Aggregates restricted to the records matching a set of filters
+        
+        Args:
+            filters: Dictionary of filters (as passed to apply_filters)
+            columns: Columns of the source frame (filters on other columns are ignored)
+        
+        Returns:
+            PnLAggregates over the matching cells, memoized per filter state
+        
+        Raises:
+            ValueError: If a filter targets a column that isn't an aggregate dimension
+        """
+        applicable = {column: value for column, value in filters.items() if value and column in columns}
+        if not applicable:
+            return self
+        
+        key = freeze_filter(applicable)
+        if key in self._slices:
+            self._slices.move_to_end(key)
+            return self._slices[key]
+        
+        mask = np.ones(len(self.cells), dtype=bool)
+        for column, value in applicable.items():
+            if column not in PNL_DIMENSIONS:
+                raise ValueError(f"'{column}' is not a PnL aggregate dimension")
+            column_mask = self._dimension_mask(column, value)
+            if column_mask is not None:
+                np.logical_and(mask, column_mask, out=mask)
+        
+        sliced = PnLAggregates(self.cells[mask], self.locations, self.measures, self.clients)
+        
+        self._slices[key] = sliced
+        while len(self._slices) > MAX_CACHED_SLICES:
+            self._slices.popitem(last=False)
+        
+        return sliced
+
+def _list_sets(df, column, set_column, item_column):
+    """
+    Code each record's list of items, with a bridge from code to item
+    
+    Args:
+        df: DataFrame containing the list column
+        column: Name of the list column
+        set_column: Name of the set-code column in the bridge
+        item_column: Name of the item column in the bridge
+    
+    Returns:
+        Tuple of (set code per record, bridge DataFrame of set codes and categorical items)
+    """
+    items = explode_list_column(df, column)
+    positions = df.index.get_indexer(items.index)
+    
+    codes = items.cat.codes.to_numpy()
+    order = np.lexsort((codes, positions))
+    positions, codes = positions[order], codes[order]
+    
+    # Sorted item codes of each row, split at the row boundaries
+    starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]]) if len(positions) else np.array([], dtype=int)
+    row_sets = [()] * len(df)
+    for position, item_set in zip(positions[starts], np.split(codes, starts[1:])):
+        row_sets[position] = tuple(item_set.tolist())
+    
+    set_codes, unique_sets = pd.factorize(pd.Series(row_sets, dtype=object))
+    
+    sizes = [len(item_set) for item_set in unique_sets]
+    item_codes = np.concatenate([np.asarray(item_set, dtype='int64') for item_set in unique_sets]) if sum(sizes) else np.array([], dtype='int64')
+    bridge = pd.DataFrame({
+        set_column: np.repeat(np.arange(len(unique_sets)), sizes),
+        item_column: pd.Categorical.from_codes(item_codes, categories=items.cat.categories)
+    })
+    return set_codes, bridge
+
+def _observed(frame, column):
+    """Drop categories that don't occur in a grouped column (charts would otherwise list them)"""
+    if isinstance(frame[column].dtype, pd.CategoricalDtype):
+        frame[column] = frame[column].cat.remove_unused_categories()
+    return frame
+
+def get_pnl_aggregates(df, filters=None):
+    """
+    Get the PnL aggregates for a DataFrame, optionally sliced by common filters
+    
+    The aggregates are built once per loaded frame (cached with its FilterIndex),
+    and each filter state slices the precomputed cells. Filters on columns that
+    aren't aggregate dimensions fall back to aggregating the filtered rows.
+    
+    Args:
+        df: DataFrame with PnL records (the unfiltered frame when filters are given)
+        filters: Optional dictionary of common filters
+    
+    Returns:
+        PnLAggregates
+    """
+    aggregates = get_filter_index(df).derived(('pnl_aggregates', tuple(df.columns)), lambda: PnLAggregates.from_frame(df))
+    
+    if not filters:
+        return aggregates
+    
+    try:
+        return aggregates.slice(filters, df.columns)
+    except ValueError:
+        return PnLAggregates.from_frame(apply_filters(df, filters))
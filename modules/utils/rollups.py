@@ -0,0 +1,298 @@
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+from modules.utils.filter_engine import get_filter_index, freeze_filter
+from modules.utils.data_processing import apply_filters
+
+# Time resolutions kept in the rollup (display name -> pandas frequency)
+ROLLUP_FREQUENCIES = {
+    'Daily': 'D',
+    'Weekly': 'W',
+    'Monthly': 'M',
+    'Quarterly': 'Q',
+    'Yearly': 'Y'
+}
+
+# Dimensions and measures of the utilization rollup
+ROLLUP_DATE_COLUMN = 'Date of Service'
+ROLLUP_DIMENSIONS = ['Client', 'Site']
+ROLLUP_COUNT_COLUMNS = ['Headcount', 'Total Booking Appts', 'Total Completed Appts']
+ROLLUP_RATE_COLUMNS = ['Booking Rate', 'Show Rate', 'Utilization Rate']
+SERVICE_COLUMNS = ['Dental', 'Audiology', 'Vision', 'MSK', 'Skin Screening', 'Biometrics and Labs']
+
+# Filtered slices kept per rollup (one entry per distinct filter state)
+MAX_CACHED_SLICES = 32
+
+class UtilizationRollup:
+    """
+    Multi-resolution rollup of utilization data
+    
+    Counts and service columns are summed per (day, client, site) once, and the
+    weekly, monthly, quarterly and yearly levels are rolled up from the daily
+    level when the rollup is built. Rates are kept as (sum, count) pairs so their
+    row-level mean can be recovered at any level. Rows without a date only
+    contribute to the all-time totals, as with pd.Grouper. Common filters on the
+    client and site slice the daily level instead of the raw frame.
+    """
+    
+    def __init__(self, base, counts, rates, services, dimensions):
+        self.base = base
+        self.counts = counts
+        self.rates = rates
+        self.services = services
+        self.dimensions = dimensions
+        self._slices = OrderedDict()
+        
+        # Time levels, each rolled up from the daily level
+        self.levels = {}
+        if ROLLUP_DATE_COLUMN in self.base.columns:
+            dated = self.base[self.base[ROLLUP_DATE_COLUMN].notna()]
+            for freq in ROLLUP_FREQUENCIES.values():
+                grouper = pd.Grouper(key=ROLLUP_DATE_COLUMN, freq=freq)
+                self.levels[freq] = dated.groupby([grouper] + self.dimensions, observed=True, dropna=False).sum(min_count=0).reset_index()
+    
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Roll a utilization DataFrame up to the daily level and above
+        
+        Args:
+            df: DataFrame with utilization records
+        
+        Returns:
+            UtilizationRollup for the frame
+        """
+        services = [col for col in SERVICE_COLUMNS if col in df.columns]
+        counts = [col for col in ROLLUP_COUNT_COLUMNS if col in df.columns] + services
+        rates = [col for col in ROLLUP_RATE_COLUMNS if col in df.columns]
+        dimensions = [col for col in ROLLUP_DIMENSIONS if col in df.columns]
+        
+        # Narrow frame of summable measures
+        measures = {col: pd.to_numeric(df[col], errors='coerce') for col in counts}
+        for rate in rates:
+            values = pd.to_numeric(df[rate], errors='coerce')
+            measures[f"{rate} sum"] = values
+            measures[f"{rate} n"] = values.notna().astype('int64')
+        
+        # Utilization rate of the rows that include each service
+        if 'Utilization Rate' in rates:
+            utilization = measures['Utilization Rate sum']
+            for service in services:
+                offered = measures[service] > 0
+                measures[f"Utilization Rate sum|{service}"] = utilization.where(offered)
+                measures[f"Utilization Rate n|{service}"] = (offered & utilization.notna()).astype('int64')
+        
+        frame = pd.DataFrame(measures, index=df.index)
+        for dimension in dimensions:
+            frame[dimension] = df[dimension]
+        
+        if ROLLUP_DATE_COLUMN in df.columns:
+            frame[ROLLUP_DATE_COLUMN] = pd.to_datetime(df[ROLLUP_DATE_COLUMN], errors='coerce').dt.floor('D')
+            keys = [ROLLUP_DATE_COLUMN] + dimensions
+        else:
+            keys = dimensions
+        
+        # Base level: one row per (day, client, site), undated and unlabelled rows included
+        if keys:
+            base = frame.groupby(keys, observed=True, dropna=False, sort=True).sum(min_count=0).reset_index()
+        else:
+            base = frame.sum(min_count=0).to_frame().T
+        
+        return cls(base, counts, rates, services, dimensions)
+    
+    def _dimension_mask(self, column, value):
+        """
+        Daily-level mask for one filter, mirroring apply_filters (None when the filter doesn't apply)
+        
+        Raises:
+            ValueError: If the filter can't be evaluated on the daily level
+        """
+        if isinstance(value, list):
+            if value[0] == "All":
+                return None
+            if column in self.dimensions:
+                labels = self.base[column]
+                return (labels.notna() & labels.astype(str).isin([str(v) for v in value])).to_numpy()
+        elif isinstance(value, str):
+            if value.lower() == "all":
+                return None
+            if column in self.dimensions:
+                return self.base[column].astype(str).str.lower().str.contains(value.lower(), regex=False, na=False).to_numpy()
+        elif not isinstance(value, (tuple, bool)):
+            # apply_filters skips other filter values
+            return None
+        
+        raise ValueError(f"Filter on '{column}' can't be applied to the utilization rollup")
+    
+    def slice(self, filters, columns):
+        """
+        Rollup restricted to the records matching a set of filters
+        
+        Args:
+            filters: Dictionary of filters (as passed to apply_filters)
+            columns: Columns of the source frame (filters on other columns are ignored)
+        
+        Returns:
+            UtilizationRollup over the matching daily rows, memoized per filter state
+        
+        Raises:
+            ValueError: If a filter can't be evaluated on the client and site dimensions
+        """
+        applicable = {column: value for column, value in filters.items() if value and column in columns}
+        if not applicable:
+            return self
+        
+        key = freeze_filter(applicable)
+        if key in self._slices:
+            self._slices.move_to_end(key)
+            return self._slices[key]
+        
+        mask = np.ones(len(self.base), dtype=bool)
+        for column, value in applicable.items():
+            column_mask = self._dimension_mask(column, value)
+            if column_mask is not None:
+                np.logical_and(mask, column_mask, out=mask)
+        
+        sliced = UtilizationRollup(self.base[mask], self.counts, self.rates, self.services, self.dimensions)
+        
+        self._slices[key] = sliced
+        while len(self._slices) > MAX_CACHED_SLICES:
+            self._slices.popitem(last=False)
+        
+        return sliced
+    
+    def _finish(self, grouped):
+        """Turn summed measures into counts and mean rates"""
+        result = grouped[self.counts].copy()
+        for rate in self.rates:
+            result[rate] = grouped[f"{rate} sum"] / grouped[f"{rate} n"].replace(0, np.nan)
+        return result
+    
+    def series(self, freq='M', by=None):
+        """
+        Time series of counts and mean rates at one resolution
+        
+        Args:
+            freq: Pandas frequency ('D', 'W', 'M', 'Q' or 'Y')
+            by: Optional dimension ('Client' or 'Site') to split the series by
+        
+        Returns:
+            DataFrame with a 'Date of Service' period column (period end, like
+            pd.Grouper), the count columns and the mean rates. Without `by`,
+            empty periods are included with zero counts.
+        """
+        level = self.levels.get(freq)
+        if level is None:
+            return pd.DataFrame(columns=[ROLLUP_DATE_COLUMN] + self.counts + self.rates)
+        
+        keys = [ROLLUP_DATE_COLUMN] + ([by] if by else [])
+        grouped = level.groupby(keys, observed=True, sort=True).sum(numeric_only=True)
+        
+        if not by and not grouped.empty:
+            periods = pd.date_range(grouped.index.min(), grouped.index.max(), freq=freq, name=ROLLUP_DATE_COLUMN)
+            grouped = grouped.reindex(periods, fill_value=0)
+        
+        return self._finish(grouped).reset_index()
+    
+    def totals(self, by=None):
+        """
+        All-time counts and mean rates
+        
+        Args:
+            by: Optional dimension ('Client' or 'Site'); per-client totals also
+                carry a 'Site Count' of distinct sites
+        
+        Returns:
+            DataFrame with one row per group (a single row without `by`)
+        """
+        if not by:
+            return self._finish(self.base.sum(numeric_only=True).to_frame().T)
+        
+        grouped = self.base.groupby(by, observed=True, sort=True)
+        result = self._finish(grouped.sum(numeric_only=True))
+        
+        if by == 'Client' and 'Site' in self.base.columns:
+            result['Site Count'] = grouped['Site'].nunique()
+        
+        return result.reset_index()
+    
+    def service_series(self, freq='M'):
+        """
+        Service counts per period in long form
+        
+        Returns:
+            DataFrame with 'Date of Service', 'Count', 'Service' and a display
+            'Period' label, ordered by service then period
+        """
+        series = self.series(freq)
+        
+        if series.empty or not self.services:
+            return pd.DataFrame(columns=[ROLLUP_DATE_COLUMN, 'Count', 'Service', 'Period'])
+        
+        long = series.melt(id_vars=ROLLUP_DATE_COLUMN, value_vars=self.services, var_name='Service', value_name='Count')
+        long = long[[ROLLUP_DATE_COLUMN, 'Count', 'Service']]
+        long['Period'] = period_labels(long[ROLLUP_DATE_COLUMN], freq)
+        return long
+    
+    def service_totals(self, by=None):
+        """
+        All-time service counts
+        
+        Args:
+            by: Optional dimension to split the counts by
+        
+        Returns:
+            Series indexed by service without `by`, otherwise a DataFrame indexed
+            by the dimension with one column per service
+        """
+        if not by:
+            return self.base[self.services].sum().rename_axis('Service')
+        return self.base.groupby(by, observed=True, sort=True)[self.services].sum()
+    
+    def service_utilization(self):
+        """Mean utilization rate of the rows that include each service (services without any are omitted)"""
+        if 'Utilization Rate' not in self.rates or not self.services:
+            return pd.Series(dtype=float)
+        
+        sums = self.base[[f"Utilization Rate sum|{service}" for service in self.services]].sum().to_numpy()
+        counts = self.base[[f"Utilization Rate n|{service}" for service in self.services]].sum().to_numpy()
+        
+        utilization = pd.Series(sums / np.where(counts > 0, counts, np.nan), index=self.services)
+        return utilization[counts > 0]
+
+def period_labels(dates, freq):
+    """Display labels for period dates ('Jan 2024', 'Q1 2024', '2024', ...)"""
+    dates = pd.Series(dates)
+    if freq == 'Q':
+        return dates.dt.to_period('Q').dt.strftime('Q%q %Y')
+    if freq == 'Y':
+        return dates.dt.strftime('%Y')
+    if freq in ('D', 'W'):
+        return dates.dt.strftime('%d %b %Y')
+    return dates.dt.strftime('%b %Y')
+
+def get_utilization_rollup(df, filters=None):
+    """
+    Get the rollup for a utilization DataFrame, optionally sliced by common filters
+    
+    The rollup is built once per loaded frame (cached with its FilterIndex), and
+    each filter state slices its daily level, so every chart, frequency toggle
+    and rerun reads from it. Filters that can't be applied to the client and
+    site dimensions fall back to rolling up the filtered rows.
+    
+    Args:
+        df: DataFrame with utilization records (the unfiltered frame when filters are given)
+        filters: Optional dictionary of common filters
+    
+    Returns:
+        UtilizationRollup
+    """
+    rollup = get_filter_index(df).derived(('utilization_rollup', tuple(df.columns)), lambda: UtilizationRollup.from_frame(df))
+    
+    if not filters:
+        return rollup
+    
+    try:
+        return rollup.slice(filters, df.columns)
+    except ValueError:
+        return UtilizationRollup.from_frame(apply_filters(df, filters))
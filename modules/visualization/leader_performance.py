@@ -7,6 +7,201 @@ import numpy as np
 from config import THEME_CONFIG
 from modules.airtable.kpi import calculate_performance_score, get_kpi_data
 
+# Display labels for the scored KPI categories, in scoring order
+KPI_LABELS = {
+    'EargymPromotion': 'Eargym Promotion',
+    'Crossbooking': 'Crossbooking',
+    'BOTDandEODFilled': 'BOTD/EOD Forms',
+    'PhotosVideosTestimonials': 'Photos/Videos',
+    'XraysAndDentalNotesUploaded': 'Documentation'
+}
+
+# Score component and compliance columns of calculate_performance_score for each category
+SCORE_COMPONENT_COLUMNS = {
+    'EargymPromotion': 'NormalizedEargymPromotion',
+    'Crossbooking': 'NormalizedCrossbooking',
+    'BOTDandEODFilled': 'BOTDandEODFilled',
+    'PhotosVideosTestimonials': 'NormalizedPhotosVideosTestimonials',
+    'XraysAndDentalNotesUploaded': 'XraysAndDentalNotesUploaded'
+}
+COMPLIANCE_COLUMNS = {
+    'EargymPromotion': 'EargymMinMet',
+    'Crossbooking': 'CrossbookingMinMet',
+    'BOTDandEODFilled': 'BOTDandEODFilled',
+    'PhotosVideosTestimonials': 'PhotosMinMet',
+    'XraysAndDentalNotesUploaded': 'XraysAndDentalNotesUploaded'
+}
+
+# Count-based KPIs that are normalized by their maximum
+COUNT_KPIS = ['EargymPromotion', 'Crossbooking', 'PhotosVideosTestimonials']
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _leader_base_tables(kpi_df):
+    """
+    Weight-independent tables for the dashboard, cached per KPI data fingerprint
+    
+    Returns:
+        Dictionary with the date-sorted events and their 0-1 score components,
+        per-leader first/second-half component means, and per site/leader
+        averages with their normalized components
+    """
+    base = {}
+    
+    if 'Date' in kpi_df.columns:
+        events = kpi_df.sort_values('Date', kind='stable')
+        
+        # Count KPIs relative to their maximum (0 when nothing was recorded)
+        maxima = events[COUNT_KPIS].max()
+        components = pd.DataFrame({
+            column: events[column] / maxima[column] if maxima[column] > 0 else 0.0
+            for column in COUNT_KPIS
+        }, index=events.index)
+        components['BOTDandEODFilled'] = events['BOTDandEODFilled']
+        components['XraysAndDentalNotesUploaded'] = events['XraysAndDentalNotesUploaded']
+        components = components[list(KPI_LABELS)]
+        
+        # Split each leader's events into first and second half (leaders with 2+ events)
+        leader_groups = events.groupby('Leader', sort=False)
+        position = leader_groups.cumcount()
+        size = leader_groups['Leader'].transform('size')
+        eligible = size >= 2
+        half = np.where(position >= size // 2, 'second', 'first')
+        
+        base['events'] = events
+        base['event_components'] = components
+        base['halves'] = components[eligible].groupby(
+            [events['Leader'][eligible], half[eligible.to_numpy()]], sort=False
+        ).mean()
+    
+    if 'Site' in kpi_df.columns:
+        site_performance = kpi_df.groupby(['Site', 'Leader']).agg({
+            'EargymPromotion': 'mean',
+            'Crossbooking': 'mean',
+            'BOTDandEODFilled': 'mean',
+            'PhotosVideosTestimonials': 'mean',
+            'XraysAndDentalNotesUploaded': 'mean',
+            'id': 'count'
+        }).reset_index().rename(columns={'id': 'EventCount'})
+        
+        # Same normalization as the main performance score (non-zero divisors)
+        for column in COUNT_KPIS:
+            site_performance[SCORE_COMPONENT_COLUMNS[column]] = site_performance[column] / max(1.0, kpi_df[column].max())
+        
+        base['site_performance'] = site_performance
+    
+    return base
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_leader_dashboard_tables(kpi_df, scores_df, weights):
+    """
+    Derived tables for the leader performance dashboard
+    
+    Cached per (KPI data fingerprint, scores, weights), so reruns from slider
+    changes and tab switches re-render without recomputing. Weight-independent
+    aggregates come from _leader_base_tables; each weighted score is a single
+    dot product with the weights.
+    
+    Args:
+        kpi_df: DataFrame containing KPI data
+        scores_df: DataFrame from calculate_performance_score
+        weights: Dictionary of weights for each KPI category
+        
+    Returns:
+        Dictionary of DataFrames and values used by create_leader_performance_dashboard
+    """
+    base = _leader_base_tables(kpi_df)
+    weight_vector = pd.Series({column: float(weights[column]) for column in KPI_LABELS})
+    weight_sum = weight_vector.sum()
+    tables = {}
+    
+    if not scores_df.empty:
+        display_df = scores_df.sort_values('PerformanceScore', ascending=False).reset_index()
+        display_df['PerformanceScore'] = display_df['PerformanceScore'].round(1)
+        display_df['EventCount'] = display_df['EventCount'].astype(int)
+        tables['leaderboard'] = display_df
+        
+        components = scores_df[list(SCORE_COMPONENT_COLUMNS.values())].set_axis(list(KPI_LABELS), axis=1)
+        
+        # KPI performance on a 0-10 scale, one row per (leader, KPI)
+        tables['kpi_bars'] = (components * 10).rename(columns=KPI_LABELS).rename_axis('Leader').reset_index().melt(
+            id_vars='Leader', var_name='Metric', value_name='Score'
+        )
+        
+        # Weighted contribution of each KPI to the overall score
+        contributions = components.mul(weight_vector / weight_sum * 100, axis=1)
+        tables['score_composition'] = contributions.rename(columns=KPI_LABELS).rename_axis('Leader').reset_index().melt(
+            id_vars='Leader', var_name='KPI', value_name='Contribution'
+        )
+        
+        if 'EargymMinMet' in scores_df.columns:
+            compliance = scores_df[list(COMPLIANCE_COLUMNS.values())].set_axis(list(KPI_LABELS.values()), axis=1) * 100
+            tables['compliance_heatmap'] = compliance.rename_axis('Leader').T.rename_axis('KPI').sort_index().fillna(0.0)
+    
+    if 'events' in base:
+        # Per-event score on a 0-100 scale
+        trend = base['events'].copy()
+        trend['EventScore'] = base['event_components'].dot(weight_vector) * 100 / weight_sum
+        tables['trend'] = trend
+        
+        # Improvement from the first to the second half of each leader's events
+        if trend['Leader'].nunique() > 1 and not base['halves'].empty:
+            half_scores = (base['halves'].dot(weight_vector) * 100 / weight_sum).unstack()
+            if {'first', 'second'} <= set(half_scores.columns):
+                improvement = (half_scores['second'] - half_scores['first']).dropna()
+                if not improvement.empty:
+                    tables['most_improved'] = (improvement.idxmax(), improvement.max())
+    
+    if 'site_performance' in base:
+        site_performance = base['site_performance'].copy()
+        
+        # Create weighted score - Make sure weights are valid
+        if weight_sum > 0:  # Avoid division by zero
+            site_components = site_performance[list(SCORE_COMPONENT_COLUMNS.values())].set_axis(list(KPI_LABELS), axis=1)
+            site_performance['SiteScore'] = site_components.dot(weight_vector) * 100 / weight_sum
+        else:
+            # Fallback if weights sum to zero
+            site_performance['SiteScore'] = 50  # Set a default mid-range score if weights are invalid
+        
+        # Leader × site heatmap (0 for sites a leader hasn't worked at)
+        pivot_df = site_performance.pivot_table(
+            index='Leader',
+            columns='Site',
+            values='SiteScore',
+            aggfunc='mean'
+        ).fillna(0)
+        
+        tables['site_performance'] = site_performance
+        tables['site_pivot'] = pivot_df
+        
+        # Best leader for each site
+        tables['site_best_leaders'] = site_performance.sort_values('SiteScore', ascending=False).groupby('Site').first().reset_index()
+        
+        if len(pivot_df) > 0 and len(pivot_df.columns) > 0:
+            tables['best_site_overall'] = pivot_df.mean().idxmax()
+            tables['best_leader_overall'] = pivot_df.mean(axis=1).idxmax()
+            
+            # Top 3 leader-site pairs with non-zero scores
+            pairs = pivot_df.stack()
+            pairs = pairs[pairs > 0].sort_values(ascending=False, kind='stable').head(3)
+            tables['top_pairs'] = [(leader, site, score) for (leader, site), score in pairs.items()]
+        
+        # Leader-site combinations well below both the leader's and the site's average
+        if len(pivot_df) > 1 and len(pivot_df.columns) > 1:
+            leader_avg = pivot_df.mean(axis=1)
+            site_avg = pivot_df.mean()
+            below = pivot_df.lt(np.minimum.outer(leader_avg.to_numpy() * 0.8, site_avg.to_numpy() * 0.8)) & pivot_df.gt(0)
+            
+            opportunities = pivot_df.where(below).stack().rename('Score').reset_index()
+            opportunities['Leader Avg'] = opportunities['Leader'].map(leader_avg)
+            opportunities['Site Avg'] = opportunities['Site'].map(site_avg)
+            opportunities['Gap'] = np.minimum(
+                opportunities['Leader Avg'] - opportunities['Score'],
+                opportunities['Site Avg'] - opportunities['Score']
+            )
+            tables['improvement_opportunities'] = opportunities.sort_values('Gap', ascending=False, kind='stable')
+    
+    return tables
+
 def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
     """
     Create the leader performance dashboard
@@ -59,6 +254,9 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
     - **Documentation:** All Patient History Forms and Dental Notes must be completed
     """)
     
+    # Derived tables, computed once per (KPI data, weights)
+    tables = build_leader_dashboard_tables(kpi_df, scores_df, weights)
+    
     # Display the leaderboard
     st.subheader("Onsite Leader Performance Leaderboard")
     
@@ -101,13 +299,8 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
         # Enhanced leaderboard display
         st.markdown("#### Current Performance Ranking")
         
-        # Format scores DataFrame for display
-        display_df = scores_df.copy()
-        display_df = display_df.sort_values('PerformanceScore', ascending=False).reset_index()
-        
-        # Format columns
-        display_df['PerformanceScore'] = display_df['PerformanceScore'].round(1)
-        display_df['EventCount'] = display_df['EventCount'].astype(int)
+        # Scores sorted and formatted for display
+        display_df = tables['leaderboard']
         
         # Create a styled table with colored performance scores
         fig = go.Figure(data=[go.Table(
@@ -155,7 +348,7 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             st.markdown("#### 🏆 Top Performers")
             
             cols = st.columns(min(3, len(top_performers)))
-            for i, (_, leader) in enumerate(top_performers.iterrows()):
+            for i, leader in enumerate(top_performers.to_dict('records')):
                 with cols[i]:
                     medal = "🥇" if i == 0 else ("🥈" if i == 1 else "🥉")
                     st.markdown(f"""
@@ -179,28 +372,8 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             st.markdown("#### Leader Performance Comparison")
             st.markdown("This chart shows how each leader performs across different KPIs:")
             
-            # Prepare data for horizontal bar chart
-            radar_data = scores_df.copy()
-            
-            # Calculate normalized metrics (0-10 scale for better visualization)
-            metric_cols = ['NormalizedEargymPromotion', 'NormalizedCrossbooking', 'BOTDandEODFilled', 
-                         'NormalizedPhotosVideosTestimonials', 'XraysAndDentalNotesUploaded']
-            
-            # Transform data for bar chart
-            bar_data = []
-            for leader in radar_data.index:
-                for i, col in enumerate(metric_cols):
-                    metric_name = ['Eargym Promotion', 'Crossbooking', 'BOTD/EOD Forms', 
-                                 'Photos/Videos', 'Documentation'][i]
-                    # Scale to 0-10 for better visualization
-                    val = float(radar_data.loc[leader, col]) * 10
-                    bar_data.append({
-                        'Leader': leader,
-                        'Metric': metric_name,
-                        'Score': val
-                    })
-            
-            bar_df = pd.DataFrame(bar_data)
+            # KPI scores on a 0-10 scale, one row per (leader, KPI)
+            bar_df = tables['kpi_bars']
             
             # Create horizontal bar chart using Plotly Express
             fig = px.bar(
@@ -231,46 +404,8 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             st.markdown("#### Score Composition by KPI")
             st.markdown("This chart shows how each KPI contributes to the overall performance score:")
             
-            # Prepare data for stacked bar chart
-            stack_data = []
-            
-            for leader in scores_df.index:
-                # Calculate the weighted contribution of each KPI
-                weights_sum = sum(weights.values())
-                eargym_contrib = scores_df.loc[leader, 'NormalizedEargymPromotion'] * weights['EargymPromotion'] / weights_sum * 100
-                crossbook_contrib = scores_df.loc[leader, 'NormalizedCrossbooking'] * weights['Crossbooking'] / weights_sum * 100
-                forms_contrib = scores_df.loc[leader, 'BOTDandEODFilled'] * weights['BOTDandEODFilled'] / weights_sum * 100
-                photos_contrib = scores_df.loc[leader, 'NormalizedPhotosVideosTestimonials'] * weights['PhotosVideosTestimonials'] / weights_sum * 100
-                docs_contrib = scores_df.loc[leader, 'XraysAndDentalNotesUploaded'] * weights['XraysAndDentalNotesUploaded'] / weights_sum * 100
-                
-                # Add to stacked data
-                stack_data.append({
-                    'Leader': leader,
-                    'KPI': 'Eargym Promotion',
-                    'Contribution': eargym_contrib
-                })
-                stack_data.append({
-                    'Leader': leader,
-                    'KPI': 'Crossbooking',
-                    'Contribution': crossbook_contrib
-                })
-                stack_data.append({
-                    'Leader': leader,
-                    'KPI': 'BOTD/EOD Forms',
-                    'Contribution': forms_contrib
-                })
-                stack_data.append({
-                    'Leader': leader,
-                    'KPI': 'Photos/Videos',
-                    'Contribution': photos_contrib
-                })
-                stack_data.append({
-                    'Leader': leader,
-                    'KPI': 'Documentation',
-                    'Contribution': docs_contrib
-                })
-            
-            stack_df = pd.DataFrame(stack_data)
+            # Weighted contribution of each KPI, one row per (leader, KPI)
+            stack_df = tables['score_composition']
             
             # Create stacked bar chart
             fig = px.bar(
@@ -298,42 +433,8 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
                 st.markdown("#### KPI-Specific Compliance")
                 st.markdown("This shows how well each leader meets the minimum requirements for each KPI category:")
                 
-                compliance_data = []
-                for leader in scores_df.index:
-                    # For each KPI, get the average compliance percentage (0-100)
-                    compliance_data.append({
-                        'Leader': leader,
-                        'KPI': 'Eargym Promotion',
-                        'Compliance': scores_df.loc[leader, 'EargymMinMet'] * 100
-                    })
-                    compliance_data.append({
-                        'Leader': leader,
-                        'KPI': 'Crossbooking',
-                        'Compliance': scores_df.loc[leader, 'CrossbookingMinMet'] * 100
-                    })
-                    compliance_data.append({
-                        'Leader': leader,
-                        'KPI': 'BOTD/EOD Forms',
-                        'Compliance': scores_df.loc[leader, 'BOTDandEODFilled'] * 100
-                    })
-                    compliance_data.append({
-                        'Leader': leader,
-                        'KPI': 'Photos/Videos',
-                        'Compliance': scores_df.loc[leader, 'PhotosMinMet'] * 100
-                    })
-                    compliance_data.append({
-                        'Leader': leader,
-                        'KPI': 'Documentation',
-                        'Compliance': scores_df.loc[leader, 'XraysAndDentalNotesUploaded'] * 100
-                    })
-                
-                compliance_df = pd.DataFrame(compliance_data)
-                
-                # Create heatmap of compliance
-                heatmap_df = compliance_df.pivot(index='KPI', columns='Leader', values='Compliance')
-                
-                # Fill NaN with 0 for leaders who might be missing some KPI data entirely
-                heatmap_df = heatmap_df.fillna(0.0)
+                # Compliance percentage (0-100) per KPI × leader, 0 where a leader has no data
+                heatmap_df = tables['compliance_heatmap']
                 
                 fig = px.imshow(
                     heatmap_df,
@@ -383,22 +484,8 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
         st.markdown("Track how leader performance has changed over time:")
         
         if 'Date' in kpi_df.columns and not kpi_df.empty:
-            # Group by leader and date to get scores over time
-            kpi_df_sorted = kpi_df.sort_values('Date')
-            
-            # Calculate a simple running score for each event
-            # Using a 0-10 scale for each metric
-            kpi_df_sorted['EventScore'] = (
-                (kpi_df_sorted['EargymPromotion'] / kpi_df_sorted['EargymPromotion'].max() if kpi_df_sorted['EargymPromotion'].max() > 0 else 0) * weights['EargymPromotion'] +
-                (kpi_df_sorted['Crossbooking'] / kpi_df_sorted['Crossbooking'].max() if kpi_df_sorted['Crossbooking'].max() > 0 else 0) * weights['Crossbooking'] +
-                kpi_df_sorted['BOTDandEODFilled'] * weights['BOTDandEODFilled'] +
-                (kpi_df_sorted['PhotosVideosTestimonials'] / kpi_df_sorted['PhotosVideosTestimonials'].max() if kpi_df_sorted['PhotosVideosTestimonials'].max() > 0 else 0) * weights['PhotosVideosTestimonials'] +
-                kpi_df_sorted['XraysAndDentalNotesUploaded'] * weights['XraysAndDentalNotesUploaded']
-            )
-            
-            # Normalize to 0-100 scale
-            weight_sum = sum(weights.values())
-            kpi_df_sorted['EventScore'] = kpi_df_sorted['EventScore'] * 100 / weight_sum
+            # Events sorted by date with their weighted score (0-100 scale)
+            kpi_df_sorted = tables['trend']
             
             # Create time series plot
             fig = px.line(
@@ -422,31 +509,18 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             st.plotly_chart(fig, use_container_width=True)
             
             # Show the most improved leader
-            if len(kpi_df_sorted['Leader'].unique()) > 1:
-                # Calculate the average score for the first half and second half of events for each leader
-                leaders = kpi_df_sorted['Leader'].unique()
-                improvements = []
-                
-                for leader in leaders:
-                    leader_data = kpi_df_sorted[kpi_df_sorted['Leader'] == leader]
-                    if len(leader_data) >= 2:  # Need at least 2 events to measure improvement
-                        midpoint = len(leader_data) // 2
-                        first_half_avg = leader_data.iloc[:midpoint]['EventScore'].mean()
-                        second_half_avg = leader_data.iloc[midpoint:]['EventScore'].mean()
-                        improvement = second_half_avg - first_half_avg
-                        improvements.append((leader, improvement))
-                
-                if improvements:
-                    most_improved = max(improvements, key=lambda x: x[1])
-                    if most_improved[1] > 0:
-                        st.markdown(f"""
-                        <div style="background-color: var(--color-info-bg); padding: 15px; border-radius: var(--border-radius); margin-top: 15px;">
-                            <h4 style="margin-top: 0; color: var(--color-text);">🚀 Most Improved: {most_improved[0]}</h4>
-                            <p style="color: var(--color-text-secondary);">
-                                {most_improved[0]} has shown the greatest improvement over time, with a score increase of {most_improved[1]:.1f} points!
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
+            # (average score of the second half of each leader's events minus the first half)
+            if 'most_improved' in tables:
+                most_improved = tables['most_improved']
+                if most_improved[1] > 0:
+                    st.markdown(f"""
+                    <div style="background-color: var(--color-info-bg); padding: 15px; border-radius: var(--border-radius); margin-top: 15px;">
+                        <h4 style="margin-top: 0; color: var(--color-text);">🚀 Most Improved: {most_improved[0]}</h4>
+                        <p style="color: var(--color-text-secondary);">
+                            {most_improved[0]} has shown the greatest improvement over time, with a score increase of {most_improved[1]:.1f} points!
+                        </p>
+                    </div>
+                    """, unsafe_allow_html=True)
     
     with tab3:
         # Site performance analysis
@@ -463,47 +537,9 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
         """, unsafe_allow_html=True)
         
         if 'Site' in kpi_df.columns and not kpi_df.empty:
-            # Calculate average performance by site and leader
-            site_performance = kpi_df.groupby(['Site', 'Leader']).agg({
-                'EargymPromotion': 'mean',
-                'Crossbooking': 'mean',
-                'BOTDandEODFilled': 'mean',
-                'PhotosVideosTestimonials': 'mean',
-                'XraysAndDentalNotesUploaded': 'mean',
-                'id': 'count'
-            }).reset_index().rename(columns={'id': 'EventCount'})
-            
-            # Calculate a performance score for each site/leader combination
-            # Using the same formula as the main performance score
-            max_eargym = max(1.0, kpi_df['EargymPromotion'].max())  # Ensure non-zero divisor
-            max_crossbooking = max(1.0, kpi_df['Crossbooking'].max())  # Ensure non-zero divisor
-            max_photos = max(1.0, kpi_df['PhotosVideosTestimonials'].max())  # Ensure non-zero divisor
-            
-            site_performance['NormalizedEargymPromotion'] = site_performance['EargymPromotion'] / max_eargym
-            site_performance['NormalizedCrossbooking'] = site_performance['Crossbooking'] / max_crossbooking
-            site_performance['NormalizedPhotosVideosTestimonials'] = site_performance['PhotosVideosTestimonials'] / max_photos
-            
-            # Create weighted score - Make sure weights are valid
-            weight_sum = sum(weights.values())
-            if weight_sum > 0:  # Avoid division by zero
-                site_performance['SiteScore'] = (
-                    site_performance['NormalizedEargymPromotion'] * weights['EargymPromotion'] +
-                    site_performance['NormalizedCrossbooking'] * weights['Crossbooking'] +
-                    site_performance['BOTDandEODFilled'] * weights['BOTDandEODFilled'] +
-                    site_performance['NormalizedPhotosVideosTestimonials'] * weights['PhotosVideosTestimonials'] +
-                    site_performance['XraysAndDentalNotesUploaded'] * weights['XraysAndDentalNotesUploaded']
-                ) * 100 / weight_sum
-            else:
-                # Fallback if weights sum to zero
-                site_performance['SiteScore'] = 50  # Set a default mid-range score if weights are invalid
-            
-            # Create a heatmap of leader performance by site
-            pivot_df = site_performance.pivot_table(
-                index='Leader',
-                columns='Site',
-                values='SiteScore',
-                aggfunc='mean'
-            ).fillna(0) # Fill NaN with 0, for sites a leader hasn't worked at
+            # Weighted score per site/leader (same formula as the main performance score)
+            # and the Leader × Site heatmap, 0 for sites a leader hasn't worked at
+            pivot_df = tables['site_pivot']
             
             # Create heatmap with improved styling
             fig = px.imshow(
@@ -543,22 +579,11 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             
             # Add interpretation tips
             if len(pivot_df) > 0 and len(pivot_df.columns) > 0:
-                best_site_overall = pivot_df.mean().idxmax()
-                best_leader_overall = pivot_df.mean(axis=1).idxmax()
-                
-                # Calculate site-leader pairs with highest scores
-                flat_scores = []
-                for leader in pivot_df.index:
-                    for site in pivot_df.columns:
-                        score = pivot_df.loc[leader, site]
-                        if score > 0:  # Only include non-zero scores
-                            flat_scores.append((leader, site, score))
-                
-                # Sort by score descending
-                flat_scores.sort(key=lambda x: x[2], reverse=True)
+                best_site_overall = tables['best_site_overall']
+                best_leader_overall = tables['best_leader_overall']
                 
-                # Get top 3 pairs
-                top_pairs = flat_scores[:3] if len(flat_scores) >= 3 else flat_scores
+                # Top 3 site-leader pairs with non-zero scores
+                top_pairs = tables['top_pairs']
                 
                 st.markdown("#### Key Insights")
                 st.markdown(f"""
@@ -592,7 +617,7 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
                 """, unsafe_allow_html=True)
             
             # Show best leader for each site
-            site_best_leaders = site_performance.sort_values('SiteScore', ascending=False).groupby('Site').first().reset_index()
+            site_best_leaders = tables['site_best_leaders']
             
             st.markdown("#### Best Leader by Site")
             st.markdown("These leaders have the highest performance scores at each site:")
@@ -601,7 +626,7 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             col1, col2 = st.columns(2)
             with col1:
                 if len(site_best_leaders) > 0:
-                    for i, row in site_best_leaders.iloc[:len(site_best_leaders)//2 + len(site_best_leaders)%2].iterrows():
+                    for row in site_best_leaders.iloc[:len(site_best_leaders)//2 + len(site_best_leaders)%2].to_dict('records'):
                         st.markdown(f"""
                         <div style="background-color: var(--color-card); padding: 12px; border-radius: var(--border-radius); margin-bottom: 10px; box-shadow: var(--box-shadow);">
                             <div style="color: var(--color-text-secondary); font-size: 0.9rem;"><strong>Site:</strong> {row['Site']}</div>
@@ -615,7 +640,7 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             
             with col2:
                 if len(site_best_leaders) > 0:
-                    for i, row in site_best_leaders.iloc[len(site_best_leaders)//2 + len(site_best_leaders)%2:].iterrows():
+                    for row in site_best_leaders.iloc[len(site_best_leaders)//2 + len(site_best_leaders)%2:].to_dict('records'):
                         st.markdown(f"""
                         <div style="background-color: var(--color-card); padding: 12px; border-radius: var(--border-radius); margin-bottom: 10px; box-shadow: var(--box-shadow);">
                             <div style="color: var(--color-text-secondary); font-size: 0.9rem;"><strong>Site:</strong> {row['Site']}</div>
@@ -632,35 +657,11 @@ def create_leader_performance_dashboard(kpi_df, scores_df, weights=None):
             
             # Create a dataframe to identify underperforming leader-site combinations
             if len(pivot_df) > 1 and len(pivot_df.columns) > 1:  # Only show if we have multiple leaders and sites
-                improvement_opportunities = []
+                # Leader-site combinations below both averages, largest gap first
+                improvement_opportunities = tables['improvement_opportunities']
                 
-                for leader in pivot_df.index:
-                    # Get this leader's average score
-                    leader_avg = pivot_df.loc[leader].mean()
-                    
-                    for site in pivot_df.columns:
-                        # Get this site's average score across all leaders
-                        site_avg = pivot_df[site].mean()
-                        
-                        # Get this specific leader-site score
-                        leader_site_score = pivot_df.loc[leader, site]
-                        
-                        # If this leader-site combo is significantly below both the leader's average and the site's average
-                        if leader_site_score < min(leader_avg * 0.8, site_avg * 0.8) and leader_site_score > 0:
-                            improvement_opportunities.append({
-                                'Leader': leader,
-                                'Site': site,
-                                'Score': leader_site_score,
-                                'Leader Avg': leader_avg,
-                                'Site Avg': site_avg,
-                                'Gap': min(leader_avg - leader_site_score, site_avg - leader_site_score)
-                            })
-                
-                if improvement_opportunities:
-                    # Sort by gap (largest first)
-                    improvement_opportunities = sorted(improvement_opportunities, key=lambda x: x['Gap'], reverse=True)
-                    
-                    for i, opp in enumerate(improvement_opportunities[:3]):  # Show top 3 opportunities
+                if not improvement_opportunities.empty:
+                    for opp in improvement_opportunities.head(3).to_dict('records'):  # Show top 3 opportunities
                         st.markdown(f"""
                         <div style="background-color: #fff3cd; padding: 12px; border-radius: var(--border-radius); margin-bottom: 10px;">
                             <div style="font-weight: 500;">Leader <strong>{opp['Leader']}</strong> at <strong>{opp['Site']}</strong></div>
@@ -2,13 +2,16 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from modules.utils.pnl_aggregates import get_pnl_aggregates
 
-def create_pnl_dashboard(df):
+def create_pnl_dashboard(df, aggregates=None):
     """
     Create visualizations for PnL data
     
     Args:
         df: DataFrame containing PnL data
+        aggregates: Optional PnLAggregates for df (e.g. sliced from the loaded
+            data by the common filters); built from df when not given
         
     Returns:
         None (displays visualizations in Streamlit)
@@ -17,6 +20,11 @@ def create_pnl_dashboard(df):
         st.warning("No PnL data available to display")
         return
     
+    # Client, month and location aggregates, computed once per data version
+    if aggregates is None:
+        aggregates = get_pnl_aggregates(df)
+    totals = aggregates.totals()
+    
     st.subheader("Financial Performance Overview")
     
     # Add descriptive text
@@ -39,20 +47,20 @@ def create_pnl_dashboard(df):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_revenue = df['Revenue_Total'].sum() if 'Revenue_Total' in df.columns else 0
+        total_revenue = totals['Revenue_Total'] if 'Revenue_Total' in df.columns else 0
         st.metric("Total Revenue", f"${total_revenue:,.2f}")
     
     with col2:
-        total_expenses = df['Expense_COGS_Total'].sum() if 'Expense_COGS_Total' in df.columns else 0
+        total_expenses = totals['Expense_COGS_Total'] if 'Expense_COGS_Total' in df.columns else 0
         st.metric("Total Expenses", f"${total_expenses:,.2f}")
     
     with col3:
-        net_profit = df['Net_Profit'].sum() if 'Net_Profit' in df.columns else 0
+        net_profit = totals['Net_Profit'] if 'Net_Profit' in df.columns else 0
         st.metric("Net Profit", f"${net_profit:,.2f}")
     
     with col4:
         if 'Net_Profit' in df.columns and 'Revenue_Total' in df.columns:
-            overall_profit_margin = (df['Net_Profit'].sum() / df['Revenue_Total'].sum()) if df['Revenue_Total'].sum() > 0 else 0
+            overall_profit_margin = (totals['Net_Profit'] / totals['Revenue_Total']) if totals['Revenue_Total'] > 0 else 0
             st.metric("Overall Profit Margin", f"{overall_profit_margin:.1%}")
         else:
             st.metric("Overall Profit Margin", "N/A")
@@ -72,10 +80,10 @@ def create_pnl_dashboard(df):
         revenue_data = pd.DataFrame({
             'Source': ['Wellness Fund', 'Dental Claims', 'Medical Claims', 'Missed Appointments'],
             'Amount': [
-                df['Revenue_WellnessFund'].sum(),
-                df['Revenue_DentalClaim'].sum(),
-                df['Revenue_MedicalClaim_InclCancelled'].sum(),
-                df['Revenue_MissedAppointments'].sum()
+                totals['Revenue_WellnessFund'],
+                totals['Revenue_DentalClaim'],
+                totals['Revenue_MedicalClaim_InclCancelled'],
+                totals['Revenue_MissedAppointments']
             ]
         })
         
@@ -118,12 +126,7 @@ def create_pnl_dashboard(df):
         </div>
         """, unsafe_allow_html=True)
         
-        client_profit = df.groupby('Client').agg({
-            'Revenue_Total': 'sum',
-            'Expense_COGS_Total': 'sum',
-            'Net_Profit': 'sum',
-            'Service_Days': 'sum'
-        }).reset_index()
+        client_profit = aggregates.by_client()[['Client', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit', 'Service_Days']].copy()
         
         client_profit['Profit_Margin'] = client_profit['Net_Profit'] / client_profit['Revenue_Total']
         client_profit['Profit_Per_Day'] = client_profit['Net_Profit'] / client_profit['Service_Days']
@@ -181,20 +184,8 @@ def create_pnl_dashboard(df):
         </div>
         """, unsafe_allow_html=True)
         
-        # Convert to datetime if not already
-        if not pd.api.types.is_datetime64_any_dtype(df['Service_Month']):
-            try:
-                df['Service_Month'] = pd.to_datetime(df['Service_Month'])
-            except:
-                st.warning("Could not convert Service_Month to datetime for time series analysis")
-                return
-        
-        # Group by month
-        monthly_performance = df.groupby(pd.Grouper(key='Service_Month', freq='M')).agg({
-            'Revenue_Total': 'sum',
-            'Expense_COGS_Total': 'sum',
-            'Net_Profit': 'sum'
-        }).reset_index()
+        # Monthly totals (Service_Month is converted to datetime by the aggregates)
+        monthly_performance = aggregates.monthly()[['Service_Month', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit']].copy()
         
         monthly_performance['Month'] = monthly_performance['Service_Month'].dt.strftime('%b %Y')
         monthly_performance['Profit_Margin'] = monthly_performance['Net_Profit'] / monthly_performance['Revenue_Total']
@@ -277,24 +268,9 @@ def create_pnl_dashboard(df):
         </div>
         """, unsafe_allow_html=True)
         
-        # Debug information for Site_Location
-        with st.expander("Debug Site_Location", expanded=False):
-            st.write("Site_Location values types:", [type(x) for x in df['Site_Location'].head(10)])
-            st.write("First few Site_Location values:", df['Site_Location'].head(10).tolist())
-        
-        # Ensure Site_Location is properly formatted for explode
-        # If it's not already a list type, convert single values to lists
-        df['Site_Location_List'] = df['Site_Location'].apply(
-            lambda x: x if isinstance(x, list) else [str(x) if x is not None else "Unknown"]
-        )
-        
-        # Now safely explode the list column
+        # Totals per location (records count toward each location in their Site_Location list)
         try:
-            location_profit = df.explode('Site_Location_List').groupby('Site_Location_List').agg({
-                'Revenue_Total': 'sum',
-                'Expense_COGS_Total': 'sum',
-                'Net_Profit': 'sum'
-            }).reset_index()
+            location_profit = aggregates.by_location()[['Site_Location_List', 'Revenue_Total', 'Expense_COGS_Total', 'Net_Profit']].copy()
             
             location_profit['Profit_Margin'] = location_profit['Net_Profit'] / location_profit['Revenue_Total']
             
@@ -6,6 +6,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import datetime
 import calendar
+from modules.utils.rollups import ROLLUP_FREQUENCIES, get_utilization_rollup, period_labels
 
 def format_metric(value, is_percentage=True):
     """Format metric values without decimals"""
@@ -13,7 +14,7 @@ def format_metric(value, is_percentage=True):
         return f"{int(round(value * 100))}%"
     return f"{int(round(value))}"
 
-def create_utilization_dashboard(df, interactive=True, dark_mode=False):
+def create_utilization_dashboard(df, interactive=True, dark_mode=False, rollup=None):
     """
     Create interactive visualizations for utilization data with enhanced analytics
     
@@ -21,6 +22,8 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
         df: DataFrame containing utilization data
         interactive: Whether to include interactive elements (toggles, filters)
         dark_mode: Whether to use dark mode for visualizations
+        rollup: Optional UtilizationRollup for df (e.g. sliced from the loaded
+            data by the common filters); built from df when not given
         
     Returns:
         None (displays visualizations in Streamlit)
@@ -80,8 +83,8 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
                 
                 time_grouping = st.selectbox(
                     "Time Series Grouping",
-                    options=["Monthly", "Quarterly", "Yearly"],
-                    index=0
+                    options=list(ROLLUP_FREQUENCIES),
+                    index=list(ROLLUP_FREQUENCIES).index("Monthly")
                 )
             
             with view_options_col2:
@@ -101,15 +104,25 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
         show_trends = True
     
     # Prepare data for metrics
-    # Calculate key metrics even if they don't exist in the DataFrame
+    # Calculate key metrics even if they don't exist in the DataFrame (on a copy: the
+    # caller's frame may be indexed, see modules.utils.filter_engine)
+    derived_rates = {}
     if 'Booking Rate' not in df.columns and 'Total Booking Appts' in df.columns and 'Headcount' in df.columns:
-        df['Booking Rate'] = df['Total Booking Appts'] / df['Headcount']
+        derived_rates['Booking Rate'] = df['Total Booking Appts'] / df['Headcount']
         
     if 'Show Rate' not in df.columns and 'Total Completed Appts' in df.columns and 'Total Booking Appts' in df.columns:
-        df['Show Rate'] = df['Total Completed Appts'] / df['Total Booking Appts']
+        derived_rates['Show Rate'] = df['Total Completed Appts'] / df['Total Booking Appts']
         
     if 'Utilization Rate' not in df.columns and 'Total Completed Appts' in df.columns and 'Headcount' in df.columns:
-        df['Utilization Rate'] = df['Total Completed Appts'] / df['Headcount']
+        derived_rates['Utilization Rate'] = df['Total Completed Appts'] / df['Headcount']
+    
+    if derived_rates:
+        df = df.assign(**derived_rates)
+    
+    # Pre-aggregated day/week/month/quarter/year rollup by client and site, read by all charts below
+    if rollup is None:
+        rollup = get_utilization_rollup(df)
+    freq = ROLLUP_FREQUENCIES.get(time_grouping, 'M')
     
     # Enhanced metric cards with visual indicators
     st.markdown("### 📌 Key Performance Indicators")
@@ -282,7 +295,7 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
     with metrics_col1:
         # Calculate min, max, and variability for rates
         if 'Utilization Rate' in df.columns:
-            client_util_rates = df.groupby('Client')['Utilization Rate'].mean().sort_values(ascending=False)
+            client_util_rates = rollup.totals('Client').set_index('Client')['Utilization Rate'].sort_values(ascending=False)
             max_util_client = client_util_rates.index[0] if not client_util_rates.empty else "N/A"
             max_util_rate = client_util_rates.iloc[0] * 100 if not client_util_rates.empty else 0
             
@@ -354,14 +367,11 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
             max_service_name = "N/A"
             
             if service_cols:
-                service_util = {}
-                for service in service_cols:
-                    service_data = df[df[service] > 0]
-                    if not service_data.empty and 'Utilization Rate' in service_data.columns:
-                        service_util[service] = service_data['Utilization Rate'].mean()
+                # Mean utilization of the rows that include each service
+                service_util = rollup.service_utilization()
                 
-                if service_util:
-                    max_service_name = max(service_util, key=service_util.get)
+                if not service_util.empty:
+                    max_service_name = service_util.idxmax()
                     max_service_util = service_util[max_service_name]
             
             # Calculate potential increases
@@ -425,8 +435,7 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
         </div>
         """, unsafe_allow_html=True)
         
-        service_totals = df[service_cols].sum().reset_index()
-        service_totals.columns = ['Service', 'Count']
+        service_totals = rollup.service_totals().reset_index(name='Count')
         service_totals = service_totals[service_totals['Count'] > 0]
         
         if not service_totals.empty:
@@ -533,29 +542,13 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
                     st.subheader("Service Utilization by Client")
                     
                     # Get top 5 clients by total appointments
-                    top_clients = df.groupby('Client')['Total Completed Appts'].sum().nlargest(5).index.tolist()
-                    
-                    # Filter for top clients and prepare data
-                    top_client_data = df[df['Client'].isin(top_clients)]
-                    
-                    # Aggregate service data by client
-                    client_service_data = []
+                    top_clients = rollup.totals('Client').set_index('Client')['Total Completed Appts'].nlargest(5).index.tolist()
                     
-                    for client in top_clients:
-                        client_df = top_client_data[top_client_data['Client'] == client]
-                        for service in service_cols:
-                            if service in client_df.columns:
-                                service_count = client_df[service].sum()
-                                if service_count > 0:
-                                    client_service_data.append({
-                                        'Client': client,
-                                        'Service': service,
-                                        'Count': service_count
-                                    })
+                    # Service counts of the top clients, one row per (client, service) with appointments
+                    client_service_df = rollup.service_totals(by='Client').loc[top_clients].stack().rename_axis(['Client', 'Service']).reset_index(name='Count')
+                    client_service_df = client_service_df[client_service_df['Count'] > 0]
                     
-                    # Convert to DataFrame
-                    if client_service_data:
-                        client_service_df = pd.DataFrame(client_service_data)
+                    if not client_service_df.empty:
                         
                         # Create grouped bar chart
                         fig = px.bar(
@@ -583,40 +576,10 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
                 if 'Date of Service' in df.columns:
                     st.subheader("Service Trends Over Time")
                     
-                    # Choose time grouping
-                    time_groups = {
-                        'Monthly': 'M',
-                        'Quarterly': 'Q',
-                        'Yearly': 'Y'
-                    }
+                    # Service counts per period, read from the rollup
+                    all_services_time = rollup.service_series(freq)
                     
-                    freq = time_groups.get(time_grouping, 'M')
-                    
-                    # Prepare data
-                    time_series_data = []
-                    
-                    for service in service_cols:
-                        if service in df.columns:
-                            # Group by time period
-                            service_time = df.groupby(pd.Grouper(key='Date of Service', freq=freq))[service].sum().reset_index()
-                            service_time['Service'] = service
-                            service_time = service_time.rename(columns={service: 'Count'})
-                            time_series_data.append(service_time)
-                    
-                    if time_series_data:
-                        # Combine all services
-                        all_services_time = pd.concat(time_series_data)
-                        
-                        # Format date for display
-                        if freq == 'M':
-                            all_services_time['Period'] = all_services_time['Date of Service'].dt.strftime('%b %Y')
-                        elif freq == 'Q':
-                            all_services_time['Period'] = all_services_time['Date of Service'].apply(
-                                lambda x: f"Q{pd.Timestamp(x).quarter} {pd.Timestamp(x).year}"
-                            )
-                        else:
-                            all_services_time['Period'] = all_services_time['Date of Service'].dt.strftime('%Y')
-                        
+                    if not all_services_time.empty:
                         # Create area chart for trends
                         fig = px.area(
                             all_services_time,
@@ -645,28 +608,18 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
                         # Add service growth analysis
                         st.markdown("#### 📈 Service Growth Analysis")
                         
-                        # Calculate growth rates
-                        growth_data = []
+                        # Calculate growth rates from the first to the last period of each service
+                        growth_df = all_services_time.groupby('Service', sort=False)['Count'].agg(['first', 'last', 'size'])
+                        growth_df = growth_df[(growth_df['size'] > 1) & (growth_df['first'] > 0)]
+                        growth_df = pd.DataFrame({
+                            'Service': growth_df.index,
+                            'First Period': growth_df['first'].to_numpy(),
+                            'Last Period': growth_df['last'].to_numpy(),
+                            'Change': (growth_df['last'] - growth_df['first']).to_numpy(),
+                            'Growth %': ((growth_df['last'] - growth_df['first']) / growth_df['first'] * 100).to_numpy()
+                        })
                         
-                        for service in service_cols:
-                            service_df = all_services_time[all_services_time['Service'] == service]
-                            if len(service_df) > 1:
-                                first_period = service_df.iloc[0]['Count']
-                                last_period = service_df.iloc[-1]['Count'] 
-                                
-                                if first_period > 0:
-                                    growth_pct = (last_period - first_period) / first_period * 100
-                                    growth_data.append({
-                                        'Service': service,
-                                        'First Period': first_period,
-                                        'Last Period': last_period,
-                                        'Change': last_period - first_period,
-                                        'Growth %': growth_pct
-                                    })
-                        
-                        if growth_data:
-                            growth_df = pd.DataFrame(growth_data)
-                            
+                        if not growth_df.empty:
                             # Sort by growth percentage
                             growth_df = growth_df.sort_values('Growth %', ascending=False)
                             
@@ -733,18 +686,7 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
         """, unsafe_allow_html=True)
         
         # Calculate client metrics
-        client_performance = df.groupby('Client').agg({
-            'Headcount': 'sum',
-            'Total Booking Appts': 'sum',
-            'Total Completed Appts': 'sum',
-            'Booking Rate': 'mean',
-            'Show Rate': 'mean',
-            'Utilization Rate': 'mean',
-            'Site': 'nunique'
-        }).reset_index()
-        
-        # Add a site count column
-        client_performance.rename(columns={'Site': 'Site Count'}, inplace=True)
+        client_performance = rollup.totals('Client')
         
         # Calculate additional metrics
         client_performance['Booking Rate %'] = client_performance['Booking Rate'] * 100
@@ -977,27 +919,11 @@ def create_utilization_dashboard(df, interactive=True, dark_mode=False):
         </div>
         """, unsafe_allow_html=True)
         
-        # Determine time grouping frequency
-        time_groups = {
-            "Monthly": "M",
-            "Quarterly": "Q",
-            "Yearly": "Y"
-        }
-        
-        freq = time_groups.get(time_grouping, "M")
-        
-        # Prepare time series data
-        time_series = df.groupby(pd.Grouper(key='Date of Service', freq=freq)).agg({
-            'Headcount': 'sum',
-            'Total Booking Appts': 'sum',
-            'Total Completed Appts': 'sum',
-            'Booking Rate': 'mean',
-            'Show Rate': 'mean',
-            'Utilization Rate': 'mean'
-        }).reset_index()
+        # Prepare time series data at the selected resolution
+        time_series = rollup.series(freq)
         
-        # Format date for display
-        time_series['Month'] = time_series['Date of Service'].dt.strftime('%b %Y')
+        # Format date for display (period labels at the selected resolution)
+        time_series['Month'] = period_labels(time_series['Date of Service'], freq).to_numpy()
         
         # Convert rates to percentages
         time_series['Booking Rate %'] = time_series['Booking Rate'] * 100
@@ -1,123 +1,202 @@
 import streamlit as st
 import pandas as pd
+import contextlib
+import os
 import re
+import sqlite3
+import threading
+import time
 import base64
 import io
+import numpy as np
 import plotly.express as px
 from thefuzz import fuzz  # For fuzzy name matching
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process  # Batch scoring (installed with thefuzz)
+from phone_formatter import format_phone, format_phones
+from config import CONTACT_INDEX_PATH
 
 def format_phone_number(phone_number):
     """
     Format phone number for specific countries (US, UK, Ireland, Denmark, Philippines)
     Returns a tuple of (formatted_number, status)
+    
+    Formatted through the shared phone format cache (see phone_formatter.format_phone).
     """
-    if not phone_number or not isinstance(phone_number, str):
-        return ("", "Missing")
-    
-    # Remove all non-digit characters (including brackets)
-    digits = re.sub(r"[^\d+]", "", phone_number)
-    
-    # If there's already a + in the number, remove all characters before and including it
-    if "+" in digits:
-        digits = re.sub(r"^.*?\+", "", digits)
-    
-    # Basic validation - count the digits
-    if len(digits) < 8:
-        return ("", "Too Short")
-    if len(digits) > 15:
-        return ("", "Too Long")
-    
-    # Define patterns for the countries we care about
-    country_patterns = [
-        # Format: (regex_pattern, country_code, country_name, leading_digits_to_remove)
-        # US: +1
-        (r"^1\d{10}$", "1", "US", 1),  # US with country code
-        (r"^\d{10}$", "1", "US", 0),   # US without country code
-        
-        # UK: +44
-        (r"^44\d{10}$", "44", "UK", 2),         # UK with country code
-        (r"^0\d{10}$", "44", "UK", 1),          # UK with leading 0
-        (r"^7\d{9}$", "44", "UK", 0),           # UK mobile without leading 0
-        
-        # Ireland: +353
-        (r"^353\d{9}$", "353", "Ireland", 3),   # Ireland with country code
-        (r"^0\d{9}$", "353", "Ireland", 1),     # Ireland with leading 0
-        
-        # Denmark: +45
-        (r"^45\d{8}$", "45", "Denmark", 2),     # Denmark with country code
-        (r"^\d{8}$", "45", "Denmark", 0),       # Denmark without country code
-        
-        # Philippines: +63
-        (r"^63\d{10}$", "63", "Philippines", 2), # Philippines with country code
-        (r"^0\d{10}$", "63", "Philippines", 1),  # Philippines with leading 0
-        (r"^9\d{9}$", "63", "Philippines", 0),   # Philippines mobile without leading 0
+    return format_phone(phone_number, style="outlook")
+
+# Soundex digit of each consonant (vowels, H, W and Y have none)
+SOUNDEX_CODES = {
+    **dict.fromkeys("BFPV", "1"), **dict.fromkeys("CGJKQSXZ", "2"), **dict.fromkeys("DT", "3"),
+    "L": "4", **dict.fromkeys("MN", "5"), "R": "6"
+}
+
+# Names scored against a whole block at a time (bounds the score matrix of large blocks)
+FUZZY_SCORE_BATCH = 2000
+
+# Lists up to this many names are scored all against all; larger lists are blocked first
+FUZZY_EXHAUSTIVE_MAX_NAMES = 20000
+
+def _soundex(word):
+    """American Soundex code of a word (e.g. 'smith' -> 'S530'), '' when it has no letters"""
+    letters = [char for char in word.upper() if "A" <= char <= "Z"]
+    if not letters:
+        return ""
+    
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+        if char not in "HW":
+            previous = digit
+    
+    return (code + "000")[:4]
+
+def _blocking_keys(name):
+    """
+    Blocking keys of a full name ('first ... last')
+    
+    Similar names almost always share at least one: the last name's Soundex
+    code, the initials, or the first or last three letters of the first or
+    last name (so a typo at either end of a name still leaves a shared key).
+    """
+    tokens = name.split()
+    first, last = tokens[0], tokens[-1]
+    return [
+        ("soundex", _soundex(last)),
+        ("initials", first[:1] + last[:1]),
+        ("last", last[:3]),
+        ("last_end", last[-3:]),
+        ("first", first[:3]),
+        ("first_end", first[-3:])
     ]
+
+def _candidate_pairs(queries, choices, fuzzy_threshold):
+    """
+    Positions of (query, choice) names that may reach the threshold
     
-    # Try to match the digit pattern to identify the country
-    matched_country = None
-    for pattern, country_code, country_name, digits_to_remove in country_patterns:
-        if re.match(pattern, digits):
-            matched_country = (country_code, country_name, digits_to_remove)
-            break
+    Queries are scored against all choices as batches with rapidfuzz. Batch
+    scores are a prefilter: anything within a point of the threshold is
+    returned, and callers rescore candidates with fuzz.ratio.
+    """
+    for start in range(0, len(queries), FUZZY_SCORE_BATCH):
+        scores = rf_process.cdist(queries[start:start + FUZZY_SCORE_BATCH], choices, scorer=rf_fuzz.ratio,
+                                  score_cutoff=max(fuzzy_threshold - 1, 0), dtype=np.uint8, workers=-1)
+        rows, columns = np.nonzero(scores >= fuzzy_threshold - 1)
+        yield from zip((rows + start).tolist(), columns.tolist())
+
+def _fuzzy_name_pairs(names, fuzzy_threshold):
+    """
+    Pairs of similar names
     
-    # Format the phone number based on the detected country
-    if matched_country:
-        country_code, country_name, digits_to_remove = matched_country
-        
-        # Remove leading digits that are already part of the country code or leading zeros
-        if digits_to_remove > 0:
-            formatted_number = digits[digits_to_remove:]
-        else:
-            formatted_number = digits
-        
-        # Format with country code
-        formatted = f"+{country_code} {formatted_number}"
+    Lists of up to FUZZY_EXHAUSTIVE_MAX_NAMES names are scored all against
+    all, so every pair the pairwise comparison would find is found. Larger
+    lists are scored only within their blocks (see _blocking_keys), which can
+    miss names differing in several places at both ends at low thresholds.
+    Either way names are scored as batches (see _candidate_pairs), and
+    candidates are rescored with fuzz.ratio so scores match the pairwise
+    comparison exactly.
+    
+    Args:
+        names: List of non-empty full names
+        fuzzy_threshold: Minimum fuzz.ratio score (0-100)
+    
+    Returns:
+        Dictionary mapping (i, j) name positions (i < j) to their score
+    """
+    if len(names) <= FUZZY_EXHAUSTIVE_MAX_NAMES:
+        blocks = {None: list(range(len(names)))}
+    else:
+        blocks = {}
+        for position, name in enumerate(names):
+            for key in _blocking_keys(name):
+                blocks.setdefault(key, []).append(position)
+    
+    pairs = {}
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
         
-        # Apply country-specific formatting if needed
-        if country_code == "1":  # US: +1 (XXX) XXX-XXXX
-            if len(formatted_number) == 10:
-                area_code = formatted_number[:3]
-                prefix = formatted_number[3:6]
-                line = formatted_number[6:]
-                formatted = f"+1 ({area_code}) {prefix}-{line}"
-        elif country_code == "44":  # UK: +44 XXXX XXXXXX
-            if len(formatted_number) == 10:
-                first_part = formatted_number[:4]
-                second_part = formatted_number[4:]
-                formatted = f"+44 {first_part} {second_part}"
-        elif country_code == "353":  # Ireland: +353 XX XXXXXXX
-            if len(formatted_number) == 9:
-                first_part = formatted_number[:2]
-                second_part = formatted_number[2:]
-                formatted = f"+353 {first_part} {second_part}"
-        elif country_code == "45":  # Denmark: +45 XXXX XXXX
-            if len(formatted_number) == 8:
-                first_part = formatted_number[:4]
-                second_part = formatted_number[4:]
-                formatted = f"+45 {first_part} {second_part}"
-        elif country_code == "63":  # Philippines: +63 XXX XXX XXXX
-            if len(formatted_number) == 10:
-                first_part = formatted_number[:3]
-                second_part = formatted_number[3:6]
-                third_part = formatted_number[6:]
-                formatted = f"+63 {first_part} {second_part} {third_part}"
+        block_names = [names[position] for position in members]
+        for row, column in _candidate_pairs(block_names, block_names, fuzzy_threshold):
+            if row >= column:
+                continue
+            
+            pair = (members[row], members[column])
+            if pair not in pairs:
+                pairs[pair] = fuzz.ratio(names[pair[0]], names[pair[1]])
+    
+    return {pair: score for pair, score in pairs.items() if score >= fuzzy_threshold}
+
+def _duplicate_codes(values):
+    """
+    Group code of each row's value, for values shared by two or more rows
+    
+    Args:
+        values: Series of key values (missing and empty values never match)
+    
+    Returns:
+        Integer array of group codes (-1 for rows whose value isn't duplicated)
+    """
+    present = values.notna() & (values != "")
+    codes = values.where(present).groupby(values.where(present), sort=False).ngroup()
+    codes = codes.fillna(-1).astype(int).to_numpy()
+    
+    sizes = np.bincount(codes[codes >= 0]) if (codes >= 0).any() else np.array([], dtype=int)
+    duplicated = codes >= 0
+    duplicated[duplicated] = sizes[codes[duplicated]] > 1
+    return np.where(duplicated, codes, -1)
+
+def _cluster_duplicates(size, key_codes):
+    """
+    Union-find over rows that share a duplicate group on any key
+    
+    Array-based: each round hooks the root of every row onto the smallest root
+    in each of its groups, then compresses paths by pointer jumping, until no
+    root changes (a few rounds, even for long chains of shared keys).
+    
+    Args:
+        size: Number of rows
+        key_codes: List of group code arrays (see _duplicate_codes)
+    
+    Returns:
+        Integer array of cluster IDs (1, 2, ... numbered by first row; 0 when the
+        row isn't a duplicate)
+    """
+    parent = np.arange(size)
+    in_cluster = np.zeros(size, dtype=bool)
+    groups = []
+    for codes in key_codes:
+        rows = np.flatnonzero(codes >= 0)
+        in_cluster[rows] = True
+        groups.append((rows, codes[rows], codes.max() + 1))
+    
+    changed = True
+    while changed:
+        changed = False
+        for rows, codes, group_count in groups:
+            roots = parent[rows]
+            smallest = np.full(group_count, size)
+            np.minimum.at(smallest, codes, roots)
+            
+            # Hook each root onto the smallest root of its group
+            hooks = smallest[codes] < roots
+            if hooks.any():
+                np.minimum.at(parent, roots[hooks], smallest[codes][hooks])
+                changed = True
         
-        return (formatted, f"Valid {country_name}")
-    
-    # Fallback for numbers we couldn't identify
-    # Check common country code prefixes
-    if digits.startswith('1') and len(digits) == 11:
-        return (f"+1 {digits[1:]}", "Valid US")
-    elif digits.startswith('44'):
-        return (f"+44 {digits[2:]}", "Valid UK")
-    elif digits.startswith('353'):
-        return (f"+353 {digits[3:]}", "Valid Ireland")
-    elif digits.startswith('45') and len(digits) == 10:
-        return (f"+45 {digits[2:]}", "Valid Denmark")
-    elif digits.startswith('63'):
-        return (f"+63 {digits[2:]}", "Valid Philippines")
-    else:
-        return (f"{digits}", "Unknown Format")
+        # Path compression
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    
+    clusters = np.zeros(size, dtype=int)
+    rows = np.flatnonzero(in_cluster)
+    clusters[rows] = pd.factorize(parent[rows])[0] + 1
+    return clusters
 
 def detect_duplicates(df, columns=None, fuzzy_name_match=False, fuzzy_threshold=85):
     """
@@ -163,125 +242,94 @@ def detect_duplicates(df, columns=None, fuzzy_name_match=False, fuzzy_threshold=
             columns['first_name'] = 'First Name'
             columns['last_name'] = 'Last Name'
     
-    # Check for phone duplicates
+    # Exact duplicates: one group code per row for each key (-1 when the value isn't shared)
+    exact_keys = []
     if 'phone' in columns and columns['phone'] in df.columns:
-        phone_column = columns['phone']
-        # Only consider non-empty phone values
-        phone_dupes = df[df[phone_column].notna() & (df[phone_column] != "")]
-        phone_dupes = phone_dupes[phone_dupes[phone_column].duplicated(keep=False)]
-        
-        for phone_value in phone_dupes[phone_column].unique():
-            matching_indices = df[df[phone_column] == phone_value].index
-            df.loc[matching_indices, 'Is Duplicate'] = True
-            df.loc[matching_indices, 'Duplicate Type'] = 'Phone'
-            df.loc[matching_indices, 'Duplicate Group'] = f"Phone-{group_id}"
-            duplicate_groups[f"Phone-{group_id}"] = matching_indices.tolist()
-            group_id += 1
-            duplicate_counts['phone'] += len(matching_indices)
-    
-    # Check for email duplicates
+        exact_keys.append(('phone', 'Phone', df[columns['phone']]))
     if 'email' in columns and columns['email'] in df.columns:
-        email_column = columns['email']
-        # Only consider non-empty email values
-        email_dupes = df[df[email_column].notna() & (df[email_column] != "")]
-        email_dupes = email_dupes[email_dupes[email_column].duplicated(keep=False)]
-        
-        for email_value in email_dupes[email_column].unique():
-            matching_indices = df[df[email_column] == email_value].index
-            # Only mark as duplicate if not already marked
-            new_dupes = matching_indices[~df.loc[matching_indices, 'Is Duplicate']]
-            if len(new_dupes) > 0:
-                df.loc[matching_indices, 'Is Duplicate'] = True
-                df.loc[matching_indices, 'Duplicate Type'] = df.loc[matching_indices, 'Duplicate Type'].replace('', 'Email')
-                df.loc[matching_indices, 'Duplicate Group'] = f"Email-{group_id}"
-                duplicate_groups[f"Email-{group_id}"] = matching_indices.tolist()
-                group_id += 1
-                duplicate_counts['email'] += len(matching_indices)
-    
-    # Check for exact name duplicates
-    if all(key in columns for key in ['first_name', 'last_name']):
-        first_name_col = columns['first_name']
-        last_name_col = columns['last_name']
-        
+        exact_keys.append(('email', 'Email', df[columns['email']]))
+    
+    has_names = all(key in columns for key in ['first_name', 'last_name'])
+    if has_names:
         # Create a combined full name column
-        df['_FullName'] = df[first_name_col].fillna('') + ' ' + df[last_name_col].fillna('')
+        df['_FullName'] = df[columns['first_name']].fillna('') + ' ' + df[columns['last_name']].fillna('')
         df['_FullName'] = df['_FullName'].str.strip().str.lower()
+        exact_keys.append(('exact_name', 'Exact Name', df['_FullName']))
+    
+    key_codes = []
+    duplicate_types = np.full(len(df), "", dtype=object)
+    for count_key, duplicate_type, values in exact_keys:
+        codes = _duplicate_codes(values)
+        key_codes.append(codes)
+        duplicate_counts[count_key] = int((codes >= 0).sum())
         
-        # Find exact name duplicates
-        name_dupes = df[df['_FullName'] != '']
-        name_dupes = name_dupes[name_dupes['_FullName'].duplicated(keep=False)]
-        
-        for name_value in name_dupes['_FullName'].unique():
-            matching_indices = df[df['_FullName'] == name_value].index
-            # Only mark as duplicate if not already marked
-            new_dupes = matching_indices[~df.loc[matching_indices, 'Is Duplicate']]
-            if len(new_dupes) > 0:
-                df.loc[matching_indices, 'Is Duplicate'] = True
-                df.loc[matching_indices, 'Duplicate Type'] = df.loc[matching_indices, 'Duplicate Type'].replace('', 'Exact Name')
-                df.loc[matching_indices, 'Duplicate Group'] = f"Name-{group_id}"
-                duplicate_groups[f"Name-{group_id}"] = matching_indices.tolist()
-                group_id += 1
-                duplicate_counts['exact_name'] += len(matching_indices)
+        # A contact's type is the first key it's duplicated on
+        duplicate_types[(codes >= 0) & (duplicate_types == "")] = duplicate_type
+    
+    # Contacts sharing any key (directly or through other contacts) form one cluster
+    clusters = _cluster_duplicates(len(df), key_codes)
+    is_exact_duplicate = clusters > 0
+    
+    if is_exact_duplicate.any():
+        group_names = np.array([f"Cluster-{cluster}" for cluster in range(1, clusters.max() + 1)], dtype=object)
+        df['Is Duplicate'] = is_exact_duplicate
+        df['Duplicate Type'] = duplicate_types
+        df.loc[is_exact_duplicate, 'Duplicate Group'] = group_names[clusters[is_exact_duplicate] - 1]
         
+        members = pd.Series(df.index[is_exact_duplicate]).groupby(clusters[is_exact_duplicate], sort=True)
+        duplicate_groups = {group_names[cluster - 1]: labels.tolist() for cluster, labels in members}
+        group_id = clusters.max() + 1
+    
+    if has_names:
         # Fuzzy name matching if requested
         if fuzzy_name_match and fuzz is not None:
             # Get contacts not already identified as duplicates
-            non_dupes = df[~df['Is Duplicate']].copy()
+            non_dupes = df[~df['Is Duplicate'] & (df['_FullName'] != '')]
+            names = non_dupes['_FullName'].tolist()
+            labels = non_dupes.index
             
-            # Compare each name against all other names using fuzzy matching
-            processed_pairs = set()
+            # Each pair is (lower label, higher label), applied in row order so a contact
+            # matching several names keeps its last match
+            matches = []
+            for (first, second), similarity in _fuzzy_name_pairs(names, fuzzy_threshold).items():
+                if labels[first] == labels[second]:
+                    continue
+                if labels[second] < labels[first]:
+                    first, second = second, first
+                matches.append((first, second, similarity))
+            matches.sort()
             
-            # Process in chunks to avoid memory issues with large datasets
-            chunk_size = 500
-            for i in range(0, len(non_dupes), chunk_size):
-                chunk = non_dupes.iloc[i:i+chunk_size]
-                
-                for idx1, row1 in chunk.iterrows():
-                    name1 = row1['_FullName']
-                    if not name1 or name1.strip() == '':
-                        continue
+            if matches:
+                groups, scores, matching_names, matched_with = {}, {}, {}, {}
+                for first, second, similarity in matches:
+                    idx1, idx2 = labels[first], labels[second]
+                    group = f"Fuzzy-{group_id}"
+                    for idx in (idx1, idx2):
+                        groups[idx] = group
+                        scores[idx] = similarity
+                        matching_names[idx] = names[second]
                     
-                    # Compare with all other names not yet processed
-                    for idx2, row2 in non_dupes.iterrows():
-                        if idx1 >= idx2:  # Skip self-comparison and already compared pairs
-                            continue
-                            
-                        # Skip if this pair has been processed
-                        pair_key = tuple(sorted([idx1, idx2]))
-                        if pair_key in processed_pairs:
-                            continue
-                            
-                        processed_pairs.add(pair_key)
-                        
-                        name2 = row2['_FullName']
-                        if not name2 or name2.strip() == '':
-                            continue
-                        
-                        # Calculate fuzzy match score
-                        similarity = fuzz.ratio(name1, name2)
-                        
-                        # If above threshold, mark as fuzzy duplicates
-                        if similarity >= fuzzy_threshold:
-                            # Create a new duplicate group
-                            df.loc[[idx1, idx2], 'Is Duplicate'] = True
-                            df.loc[[idx1, idx2], 'Duplicate Type'] = df.loc[[idx1, idx2], 'Duplicate Type'].replace('', 'Fuzzy Name')
-                            df.loc[[idx1, idx2], 'Duplicate Group'] = f"Fuzzy-{group_id}"
-                            df.loc[[idx1, idx2], 'Matching Name'] = f"{row2['_FullName']}" if idx1 == idx1 else f"{row1['_FullName']}"
-                            duplicate_groups[f"Fuzzy-{group_id}"] = [idx1, idx2]
-                            
-                            # Record the similarity as well
-                            if 'Fuzzy Match Score' not in df.columns:
-                                df['Fuzzy Match Score'] = None
-                            df.loc[[idx1, idx2], 'Fuzzy Match Score'] = similarity
-                            
-                            # Store the matched name for reference
-                            if 'Matched With' not in df.columns:
-                                df['Matched With'] = ""
-                            df.loc[idx1, 'Matched With'] = row2['_FullName']
-                            df.loc[idx2, 'Matched With'] = row1['_FullName']
-                            
-                            group_id += 1
-                            duplicate_counts['fuzzy_name'] += 2
+                    # Store the matched name for reference
+                    matched_with[idx1] = names[second]
+                    matched_with[idx2] = names[first]
+                    
+                    duplicate_groups[group] = [idx1, idx2]
+                    group_id += 1
+                    duplicate_counts['fuzzy_name'] += 2
+                
+                matched = pd.Index(list(groups))
+                df.loc[matched, 'Is Duplicate'] = True
+                df.loc[matched, 'Duplicate Type'] = df.loc[matched, 'Duplicate Type'].replace('', 'Fuzzy Name')
+                df.loc[matched, 'Duplicate Group'] = pd.Series(groups)
+                df['Matching Name'] = pd.Series(matching_names, dtype=object).reindex(df.index)
+                
+                # Record the similarity as well
+                positions = df.index.get_indexer(list(scores))
+                fuzzy_scores = np.full(len(df), None, dtype=object)
+                fuzzy_scores[positions] = list(scores.values())
+                df['Fuzzy Match Score'] = fuzzy_scores
+                
+                df['Matched With'] = pd.Series(matched_with, dtype=object).reindex(df.index).fillna("")
         
         # Clean up the temporary column
         df = df.drop('_FullName', axis=1)
@@ -294,9 +342,272 @@ def detect_duplicates(df, columns=None, fuzzy_name_match=False, fuzzy_threshold=
     
     return df, duplicates_df, duplicate_counts, duplicate_groups
 
-def process_contacts_file(file, phone_column_names=None, fuzzy_match=True, fuzzy_threshold=85):
+# Kinds of exact keys checked against the contact index, in match priority order
+CONTACT_INDEX_MATCHES = [('phone', 'Phone'), ('email', 'Email'), ('name', 'Exact Name')]
+
+# Blocking keys kept in the contact index (first-name blocks would grow with the whole history)
+CONTACT_INDEX_BLOCKS = ("soundex", "initials", "last", "last_end")
+
+# SQLite page cache per connection (large imports update the key index in one transaction)
+CONTACT_INDEX_CACHE_KB = 65536
+
+# Phone keys need at least this many digits (shorter values are too ambiguous to match on)
+CONTACT_INDEX_MIN_PHONE_DIGITS = 7
+
+def _contact_keys(df, columns):
+    """
+    Normalized keys of each contact, as stored in the contact index
+    
+    Args:
+        df: DataFrame of contacts
+        columns: Dictionary mapping column types to column names (see detect_duplicates)
+    
+    Returns:
+        DataFrame with 'phone' (digits only), 'email' (lowercase), 'name'
+        (lowercase full name) and 'display' (full name as given) columns,
+        holding empty strings where a value is missing
+    """
+    blank = pd.Series("", index=df.index)
+    keys = pd.DataFrame(index=df.index)
+    
+    if 'phone' in columns and columns['phone'] in df.columns:
+        digits = df[columns['phone']].fillna('').astype(str).str.replace(r'\D', '', regex=True)
+        keys['phone'] = digits.where(digits.str.len() >= CONTACT_INDEX_MIN_PHONE_DIGITS, "")
+    else:
+        keys['phone'] = blank
+    
+    if 'email' in columns and columns['email'] in df.columns:
+        keys['email'] = df[columns['email']].fillna('').astype(str).str.strip().str.lower()
+    else:
+        keys['email'] = blank
+    
+    if all(key in columns and columns[key] in df.columns for key in ['first_name', 'last_name']):
+        display = df[columns['first_name']].fillna('').astype(str) + ' ' + df[columns['last_name']].fillna('').astype(str)
+        keys['display'] = display.str.strip()
+        keys['name'] = keys['display'].str.lower()
+    else:
+        keys['display'] = blank
+        keys['name'] = blank
+    
+    return keys
+
+class ContactIndex:
+    """
+    SQLite-backed index of contacts already exported for Outlook
+    
+    Each contact is stored once with its normalized phone, email and full
+    name, and every key (including the last-name blocking keys used for fuzzy
+    matching) is kept in an indexed key table. New uploads are checked with
+    B-tree lookups on their own keys, so a check reads only the matching
+    contacts and blocks, never the whole import history.
+    """
+    
+    def __init__(self, path=CONTACT_INDEX_PATH):
+        self.path = path
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS contacts (
+                    id INTEGER PRIMARY KEY,
+                    phone TEXT,
+                    email TEXT,
+                    name_key TEXT,
+                    display_name TEXT,
+                    added REAL,
+                    UNIQUE (phone, email, name_key)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS contact_keys (
+                    kind TEXT,
+                    value TEXT,
+                    contact_id INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_contact_keys ON contact_keys (kind, value)")
+    
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connection that commits on success (rolls back on error) and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; avoids an fsync per commit
+            conn.execute(f"PRAGMA cache_size=-{CONTACT_INDEX_CACHE_KB}")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def add_contacts(self, df, columns):
+        """
+        Add exported contacts to the index (contacts already indexed are skipped)
+        
+        Args:
+            df: DataFrame of contacts
+            columns: Dictionary mapping column types to column names (see detect_duplicates)
+        
+        Returns:
+            Number of contacts added
+        """
+        keys = _contact_keys(df, columns)
+        keys = keys[(keys[['phone', 'email', 'name']] != "").any(axis=1)].drop_duplicates(['phone', 'email', 'name'])
+        if keys.empty:
+            return 0
+        
+        now = time.time()
+        with self._connect() as conn:
+            # Hold the write lock so the new contacts are exactly the IDs above the current maximum
+            conn.execute("BEGIN IMMEDIATE")
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM contacts").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO contacts (phone, email, name_key, display_name, added) VALUES (?, ?, ?, ?, ?)",
+                ((phone, email, name, display, now) for phone, email, name, display
+                 in zip(keys['phone'], keys['email'], keys['name'], keys['display']))
+            )
+            added = conn.execute("SELECT id, phone, email, name_key FROM contacts WHERE id > ?", (last_id,)).fetchall()
+            
+            key_rows = []
+            for contact_id, phone, email, name_key in added:
+                if phone:
+                    key_rows.append(('phone', phone, contact_id))
+                if email:
+                    key_rows.append(('email', email, contact_id))
+                if name_key:
+                    key_rows.append(('name', name_key, contact_id))
+                    key_rows.extend((kind, value, contact_id) for kind, value in _blocking_keys(name_key) if kind in CONTACT_INDEX_BLOCKS)
+            conn.executemany("INSERT INTO contact_keys (kind, value, contact_id) VALUES (?, ?, ?)", key_rows)
+        
+        return len(added)
+    
+    def match(self, df, columns, fuzzy_name_match=False, fuzzy_threshold=85):
+        """
+        Check contacts against the index
+        
+        Args:
+            df: DataFrame of contacts
+            columns: Dictionary mapping column types to column names (see detect_duplicates)
+            fuzzy_name_match: Whether contacts without an exact match are matched on similar names
+            fuzzy_threshold: Threshold for fuzzy matching (0-100), higher = more strict
+        
+        Returns:
+            DataFrame aligned with df with 'In Outlook' (bool), 'Existing Match'
+            (Phone, Email, Exact Name or Fuzzy Name; the first key that matches)
+            and 'Existing Contact' (name of the indexed contact) columns
+        """
+        keys = _contact_keys(df, columns)
+        result = pd.DataFrame({'In Outlook': False, 'Existing Match': "", 'Existing Contact': ""}, index=df.index)
+        if df.empty:
+            return result
+        
+        match_types = np.full(len(df), "", dtype=object)
+        match_names = np.full(len(df), "", dtype=object)
+        
+        with self._connect() as conn:
+            # Exact keys: one indexed lookup per key of the upload
+            conn.execute("CREATE TEMP TABLE lookup (position INTEGER, priority INTEGER, kind TEXT, value TEXT)")
+            for priority, (kind, _) in enumerate(CONTACT_INDEX_MATCHES):
+                positions = np.flatnonzero((keys[kind] != "").to_numpy())
+                conn.executemany(
+                    "INSERT INTO lookup VALUES (?, ?, ?, ?)",
+                    zip(positions.tolist(), [priority] * len(positions), [kind] * len(positions), keys[kind].iloc[positions])
+                )
+            
+            # CROSS JOIN fixes the loop order: probe the key index per lookup row, never scan it
+            hits = pd.DataFrame(conn.execute("""
+                SELECT lookup.position, lookup.priority, contacts.display_name
+                FROM lookup
+                CROSS JOIN contact_keys ON contact_keys.kind = lookup.kind AND contact_keys.value = lookup.value
+                JOIN contacts ON contacts.id = contact_keys.contact_id
+            """).fetchall(), columns=['position', 'priority', 'display_name'])
+            
+            if not hits.empty:
+                hits = hits.sort_values(['position', 'priority'], kind='stable').drop_duplicates('position')
+                labels = np.array([label for _, label in CONTACT_INDEX_MATCHES], dtype=object)
+                match_types[hits['position'].to_numpy()] = labels[hits['priority'].to_numpy()]
+                match_names[hits['position'].to_numpy()] = hits['display_name'].to_numpy()
+            
+            if fuzzy_name_match:
+                # Similar names: score each unmatched name against the indexed names of its blocks
+                names = keys['name'].to_numpy()
+                unmatched = np.flatnonzero((match_types == "") & (names != ""))
+                
+                blocks = {}
+                for position in unmatched.tolist():
+                    for key in _blocking_keys(names[position]):
+                        if key[0] in CONTACT_INDEX_BLOCKS:
+                            blocks.setdefault(key, []).append(position)
+                
+                conn.execute("CREATE TEMP TABLE block_lookup (kind TEXT, value TEXT)")
+                conn.executemany("INSERT INTO block_lookup VALUES (?, ?)", list(blocks))
+                
+                candidates = {}
+                for kind, value, name_key, display_name in conn.execute("""
+                    SELECT block_lookup.kind, block_lookup.value, contacts.name_key, contacts.display_name
+                    FROM block_lookup
+                    CROSS JOIN contact_keys ON contact_keys.kind = block_lookup.kind AND contact_keys.value = block_lookup.value
+                    JOIN contacts ON contacts.id = contact_keys.contact_id
+                """):
+                    candidates.setdefault((kind, value), {}).setdefault(name_key, display_name)
+                
+                best = {}
+                for key, indexed in candidates.items():
+                    members = blocks[key]
+                    indexed_names = list(indexed)
+                    for row, column in _candidate_pairs([names[position] for position in members], indexed_names, fuzzy_threshold):
+                        position, name_key = members[row], indexed_names[column]
+                        similarity = fuzz.ratio(names[position], name_key)
+                        if similarity >= fuzzy_threshold and similarity > best.get(position, (0, ""))[0]:
+                            best[position] = (similarity, indexed[name_key])
+                
+                for position, (_, name) in best.items():
+                    match_types[position] = "Fuzzy Name"
+                    match_names[position] = name
+        
+        result['In Outlook'] = match_types != ""
+        result['Existing Match'] = match_types
+        result['Existing Contact'] = match_names
+        return result
+    
+    def clear(self):
+        """Delete every indexed contact"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM contact_keys")
+            conn.execute("DELETE FROM contacts")
+    
+    def stats(self):
+        """Number of indexed contacts, time of the last addition and file size"""
+        with self._connect() as conn:
+            contacts, last_added = conn.execute("SELECT COUNT(*), MAX(added) FROM contacts").fetchone()
+        
+        return {
+            'contacts': contacts,
+            'last_added': last_added,
+            'file_bytes': sum(os.path.getsize(path) for path in (self.path, self.path + '-wal') if os.path.exists(path))
+        }
+
+# One index per process; the SQLite file is shared by every worker
+_contact_index = None
+_contact_index_lock = threading.Lock()
+
+def get_contact_index():
+    """Get the shared contact index"""
+    global _contact_index
+    with _contact_index_lock:
+        if _contact_index is None:
+            _contact_index = ContactIndex()
+        return _contact_index
+
+def process_contacts_file(file, phone_column_names=None, fuzzy_match=True, fuzzy_threshold=85, contact_index=None):
     """
     Process uploaded contacts file (CSV or Excel)
+    
+    When a ContactIndex is given, contacts are also checked against previously
+    exported contacts ('In Outlook', 'Existing Match' and 'Existing Contact').
     """
     if file is None:
         return None, "No file uploaded"
@@ -348,16 +659,7 @@ def process_contacts_file(file, phone_column_names=None, fuzzy_match=True, fuzzy
                 break
         
         # Format phone numbers
-        formatted_phones = []
-        phone_statuses = []
-        
-        for phone in processed_df['Original Phone']:
-            formatted, status = format_phone_number(phone)
-            formatted_phones.append(formatted)
-            phone_statuses.append(status)
-        
-        processed_df['Formatted Phone'] = formatted_phones
-        processed_df['Phone Status'] = phone_statuses
+        processed_df['Formatted Phone'], processed_df['Phone Status'] = format_phones(processed_df['Original Phone'], style="outlook")
         
         # Create column mapping for duplicate detection
         columns_map = {'phone': 'Formatted Phone'}
@@ -375,6 +677,12 @@ def process_contacts_file(file, phone_column_names=None, fuzzy_match=True, fuzzy
             fuzzy_threshold=fuzzy_threshold
         )
         
+        # Check against contacts exported by earlier runs
+        if contact_index is not None:
+            existing = contact_index.match(processed_df, columns_map, fuzzy_name_match=fuzzy_match, fuzzy_threshold=fuzzy_threshold)
+            processed_df = processed_df.join(existing)
+            duplicates_df = processed_df[processed_df['Is Duplicate']].copy()
+        
         # Separate valid and invalid phone numbers
         valid_df = processed_df[processed_df['Phone Status'].str.startswith('Valid')]
         invalid_df = processed_df[~processed_df['Phone Status'].str.startswith('Valid')]
@@ -386,15 +694,18 @@ def process_contacts_file(file, phone_column_names=None, fuzzy_match=True, fuzzy
             'duplicates': duplicates_df,
             'duplicate_counts': duplicate_counts,
             'duplicate_groups': duplicate_groups,
+            'existing': processed_df[processed_df['In Outlook']] if contact_index is not None else processed_df.iloc[0:0],
+            'columns': columns_map,
             'stats': {
                 'total': len(processed_df),
                 'valid': len(valid_df),
                 'invalid': len(invalid_df),
                 'duplicates': duplicate_counts['total'],
-                'unique_valid': len(valid_df[~valid_df['Is Duplicate']])
+                'unique_valid': len(valid_df[~valid_df['Is Duplicate']]),
+                'existing': int(processed_df['In Outlook'].sum()) if contact_index is not None else 0
             }
         }, None
-        
+    
     except Exception as e:
         import traceback
         return None, f"Error processing file: {str(e)}\n{traceback.format_exc()}"
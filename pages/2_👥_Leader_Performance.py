@@ -8,7 +8,7 @@ import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import required modules
-from modules.airtable import get_kpi_data, calculate_performance_score
+from modules.airtable import get_kpi_data, calculate_performance_score, clear_airtable_cache
 from modules.visualization.leader_performance import create_leader_performance_dashboard
 
 # Page configuration
@@ -39,6 +39,7 @@ def render_leader_performance_dashboard():
         if st.button("🔄 Refresh Data", use_container_width=True, type="primary"):
             # Clear cache to force data refresh
             get_kpi_data.clear()
+            clear_airtable_cache('KPI')
             st.success("✅ Data refreshed from Daily KPI table!")
             # Force page to reload to show the updated data
             st.rerun()
@@ -1,6 +1,175 @@
+import atexit
+import multiprocessing
+import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import pandas as pd
+import phonenumbers
 import plotly.express as px
+from config import MAX_WORKERS
+
+# Country detection rules, tried in order (first match wins)
+# Format: (leading digits, total digits, country_code, country_name, leading_digits_to_remove)
+# Rules shadowed by an earlier one are kept so each country's formats stay documented
+COUNTRY_RULES = [
+    # North America: +1
+    (("1",), (11, 11), "1", "US/CA", 1),      # US/Canada with country code
+    (("",), (10, 10), "1", "US/CA", 0),       # US/Canada without country code
+    
+    # UK: +44
+    (("44",), (12, 12), "44", "UK", 2),       # UK with country code
+    (("0",), (11, 11), "44", "UK", 1),        # UK with leading 0
+    (("7",), (10, 10), "44", "UK", 0),        # UK mobile without leading 0
+    
+    # Ireland: +353
+    (("353",), (12, 12), "353", "IE", 3),     # Ireland with country code
+    (("0",), (10, 10), "353", "IE", 1),       # Ireland with leading 0
+    
+    # UAE: +971
+    (("971",), (12, 12), "971", "UAE", 3),    # UAE with country code
+    (("0",), (10, 10), "971", "UAE", 1),      # UAE with leading 0
+    (("5",), (9, 9), "971", "UAE", 0),        # UAE mobile without leading 0
+    
+    # Philippines: +63
+    (("63",), (12, 12), "63", "PH", 2),       # Philippines with country code
+    (("0",), (11, 11), "63", "PH", 1),        # Philippines with leading 0
+    (("9",), (10, 10), "63", "PH", 0),        # Philippines mobile without leading 0
+    
+    # Denmark: +45
+    (("45",), (10, 10), "45", "DK", 2),       # Denmark with country code
+    (("",), (8, 8), "45", "DK", 0),           # Denmark without country code
+    
+    # India: +91
+    (("91",), (12, 12), "91", "IN", 2),       # India with country code
+    (("0",), (11, 11), "91", "IN", 1),        # India with leading 0
+    (("6", "7", "8", "9"), (10, 10), "91", "IN", 0),  # India mobile without leading 0
+    
+    # Australia: +61
+    (("61",), (11, 11), "61", "AU", 2),       # Australia with country code
+    (("0",), (10, 10), "61", "AU", 1),        # Australia with leading 0
+    (("4",), (9, 9), "61", "AU", 0),          # Australia mobile without leading 0
+    
+    # Mexico: +52
+    (("52",), (12, 12), "52", "MX", 2),       # Mexico with country code
+    (("0",), (11, 11), "52", "MX", 1),        # Mexico with leading 0
+    
+    # Brazil: +55
+    (("55",), (12, 13), "55", "BR", 2),       # Brazil with country code
+    (("0",), (11, 12), "55", "BR", 1),        # Brazil with leading 0
+    
+    # Germany: +49
+    (("49",), (12, 13), "49", "DE", 2),       # Germany with country code
+    (("0",), (11, 12), "49", "DE", 1),        # Germany with leading 0
+    
+    # France: +33
+    (("33",), (11, 11), "33", "FR", 2),       # France with country code
+    (("0",), (10, 10), "33", "FR", 1),        # France with leading 0
+    
+    # Spain: +34
+    (("34",), (11, 11), "34", "ES", 2),       # Spain with country code
+    (("",), (9, 9), "34", "ES", 0),           # Spain without country code
+]
+
+# Country guesses for digits no rule matched, tried in order
+# Format: (leading digits, minimum length, country_code, country_name)
+COUNTRY_FALLBACKS = [
+    ("1", 11, "1", "US/CA"),
+    ("44", 11, "44", "UK"),
+    ("353", 12, "353", "IE"),
+    ("971", 12, "971", "UAE"),
+    ("63", 11, "63", "PH"),
+    ("45", 10, "45", "DK"),
+    ("91", 12, "91", "IN"),
+]
+
+def _compile_rule(leading, lengths):
+    """Anchored regex for a rule, e.g. ^44\\d{10}$"""
+    width = len(leading[0])
+    prefix = "(?:" + "|".join(leading) + ")" if width else ""
+    return re.compile(rf"^{prefix}\d{{{lengths[0] - width},{lengths[1] - width}}}$")
+
+# Precompiled (pattern, country_code, country_name, leading_digits_to_remove) table
+COUNTRY_PATTERNS = [
+    (_compile_rule(leading, lengths), country_code, country_name, digits_to_remove)
+    for leading, lengths, country_code, country_name, digits_to_remove in COUNTRY_RULES
+]
+
+# Outlook contact rules (US, UK, Ireland, Denmark, Philippines), tried in order
+# Format: (leading digits, total digits, country_code, country_name, leading_digits_to_remove)
+OUTLOOK_COUNTRY_RULES = [
+    (("1",), (11, 11), "1", "US", 1),                 # US with country code
+    (("",), (10, 10), "1", "US", 0),                  # US without country code
+    (("44",), (12, 12), "44", "UK", 2),               # UK with country code
+    (("0",), (11, 11), "44", "UK", 1),                # UK with leading 0
+    (("7",), (10, 10), "44", "UK", 0),                # UK mobile without leading 0
+    (("353",), (12, 12), "353", "Ireland", 3),        # Ireland with country code
+    (("0",), (10, 10), "353", "Ireland", 1),          # Ireland with leading 0
+    (("45",), (10, 10), "45", "Denmark", 2),          # Denmark with country code
+    (("",), (8, 8), "45", "Denmark", 0),              # Denmark without country code
+    (("63",), (12, 12), "63", "Philippines", 2),      # Philippines with country code
+    (("0",), (11, 11), "63", "Philippines", 1),       # Philippines with leading 0
+    (("9",), (10, 10), "63", "Philippines", 0),       # Philippines mobile without leading 0
+]
+
+OUTLOOK_COUNTRY_PATTERNS = [
+    (_compile_rule(leading, lengths), country_code, country_name, digits_to_remove)
+    for leading, lengths, country_code, country_name, digits_to_remove in OUTLOOK_COUNTRY_RULES
+]
+
+# Digit groups of national numbers, e.g. +44 XXXX XXXXXX (country_code, digits) -> group sizes
+OUTLOOK_NUMBER_GROUPS = {
+    ("44", 10): (4, 6),
+    ("353", 9): (2, 7),
+    ("45", 8): (4, 4),
+    ("63", 10): (3, 3, 4),
+}
+
+# Country guesses for unmatched digits: (leading digits, exact length or None, country_code, country_name)
+OUTLOOK_FALLBACKS = [
+    ("1", 11, "1", "US"),
+    ("44", None, "44", "UK"),
+    ("353", None, "353", "Ireland"),
+    ("45", 10, "45", "Denmark"),
+    ("63", None, "63", "Philippines"),
+]
+
+# Formatted numbers memoized by the shared phone format cache
+PHONE_CACHE_SIZE = 200_000
+
+# Rows read and validated per chunk when streaming an upload
+PHONE_VALIDATION_CHUNK_ROWS = 100_000
+
+# Validated rows kept in memory for display when streaming an upload
+PHONE_VALIDATION_PREVIEW_ROWS = 1_000
+
+# Validation modes offered by the phone validation tool (display name -> mode)
+PHONE_VALIDATION_MODES = {
+    "Strict format": "strict",
+    "Full validation (libphonenumber)": "libphonenumber"
+}
+
+# Region assumed by libphonenumber for numbers without a country code
+DEFAULT_PHONE_REGION = "US"
+
+# Distinct values sent to a worker process at a time (inputs below two minimum shards aren't
+# worth a pool), and results each worker memoizes
+PARALLEL_MIN_SHARD_ROWS = 2_000
+PARALLEL_SHARD_ROWS = 50_000
+WORKER_MEMO_SIZE = 200_000
+
+NON_DIGITS = re.compile(r"[^\d+]")
+BEFORE_PLUS = re.compile(r"^.*?\+")
+
+def _whatsapp_format(country_code, number):
+    """+[country code] [number], with US/Canada numbers as +1 (XXX) XXX-XXXX"""
+    if country_code == "1" and len(number) == 10:
+        return f"+1 ({number[:3]}) {number[3:6]}-{number[6:]}"
+    return f"+{country_code} {number}"
 
 def format_phone_strict(raw_phone):
     """
@@ -12,7 +181,7 @@ def format_phone_strict(raw_phone):
     if isinstance(raw_phone, pd.DataFrame):
         # Handle DataFrame case
         df = raw_phone.copy()
-        df["Formatted Phone"], df["Phone Status"] = zip(*df["Phone"].map(format_phone_strict))
+        df["Formatted Phone"], df["Phone Status"] = format_phone_series(df["Phone"])
         return df
     
     # Handle individual phone number case
@@ -20,12 +189,12 @@ def format_phone_strict(raw_phone):
         return ("", "Missing")
     
     # Remove all non-digit characters
-    digits = re.sub(r"[^\d+]", "", raw_phone)
+    digits = NON_DIGITS.sub("", raw_phone)
     
     # If there's already a + in the number, remove all characters before and including it
     # This ensures we only keep the digits after the international prefix
     if "+" in digits:
-        digits = re.sub(r"^.*?\+", "", digits)
+        digits = BEFORE_PLUS.sub("", digits)
     
     # Basic validation - count the actual digits
     if len(digits) < 8:
@@ -33,145 +202,515 @@ def format_phone_strict(raw_phone):
     if len(digits) > 15:
         return ("", "Too Long")
     
-    try:
-        # Detect country code from the starting digits
-        
-        # Country code detection patterns (arranged from most to least specific)
-        country_patterns = [
-            # Format: (regex_pattern, country_code, country_name, leading_digits_to_remove)
-            # North America: +1
-            (r"^1\d{10}$", "1", "US/CA", 1),  # US/Canada with country code
-            (r"^\d{10}$", "1", "US/CA", 0),   # US/Canada without country code
-            
-            # UK: +44
-            (r"^44\d{10}$", "44", "UK", 2),         # UK with country code
-            (r"^0\d{10}$", "44", "UK", 1),          # UK with leading 0
-            (r"^7\d{9}$", "44", "UK", 0),           # UK mobile without leading 0
-            
-            # Ireland: +353
-            (r"^353\d{9}$", "353", "IE", 3),        # Ireland with country code
-            (r"^0\d{9}$", "353", "IE", 1),          # Ireland with leading 0
-            
-            # UAE: +971
-            (r"^971\d{9}$", "971", "UAE", 3),       # UAE with country code
-            (r"^0\d{9}$", "971", "UAE", 1),         # UAE with leading 0
-            (r"^5\d{8}$", "971", "UAE", 0),         # UAE mobile without leading 0
-            
-            # Philippines: +63
-            (r"^63\d{10}$", "63", "PH", 2),         # Philippines with country code
-            (r"^0\d{10}$", "63", "PH", 1),          # Philippines with leading 0
-            (r"^9\d{9}$", "63", "PH", 0),           # Philippines mobile without leading 0
-            
-            # Denmark: +45
-            (r"^45\d{8}$", "45", "DK", 2),          # Denmark with country code
-            (r"^\d{8}$", "45", "DK", 0),            # Denmark without country code
-            
-            # India: +91
-            (r"^91\d{10}$", "91", "IN", 2),         # India with country code
-            (r"^0\d{10}$", "91", "IN", 1),          # India with leading 0
-            (r"^[6789]\d{9}$", "91", "IN", 0),      # India mobile without leading 0
-            
-            # Australia: +61
-            (r"^61\d{9}$", "61", "AU", 2),          # Australia with country code
-            (r"^0\d{9}$", "61", "AU", 1),           # Australia with leading 0
-            (r"^4\d{8}$", "61", "AU", 0),           # Australia mobile without leading 0
-            
-            # Mexico: +52
-            (r"^52\d{10}$", "52", "MX", 2),         # Mexico with country code
-            (r"^0\d{10}$", "52", "MX", 1),          # Mexico with leading 0
-            
-            # Brazil: +55
-            (r"^55\d{10,11}$", "55", "BR", 2),      # Brazil with country code
-            (r"^0\d{10,11}$", "55", "BR", 1),       # Brazil with leading 0
-            
-            # Germany: +49
-            (r"^49\d{10,11}$", "49", "DE", 2),      # Germany with country code
-            (r"^0\d{10,11}$", "49", "DE", 1),       # Germany with leading 0
+    # Detect country code from the starting digits
+    for pattern, country_code, country_name, digits_to_remove in COUNTRY_PATTERNS:
+        if pattern.match(digits):
+            return (_whatsapp_format(country_code, digits[digits_to_remove:]), f"Valid {country_name}")
+    
+    # If no specific format matches but length is valid, guess the country from the first digits
+    for leading, min_length, country_code, country_name in COUNTRY_FALLBACKS:
+        if len(digits) >= min_length and digits.startswith(leading):
+            return (f"+{country_code} {digits[len(leading):]}", f"Valid {country_name}")
+    
+    # Can't determine country - most international numbers have 2-3 digit country codes
+    if len(digits) >= 11:
+        return (f"+{digits[:2]} {digits[2:]}", "Unknown Format")
+    return (f"+{digits}", "Unknown Format")
+
+def format_phone_series(phones):
+    """
+    Format a whole column of phone numbers at once
+    
+    Column equivalent of format_phone_strict. Values are factorized first,
+    so each distinct number is matched against the precompiled country rules
+    (COUNTRY_PATTERNS) once and the results are spread back over the rows.
+    
+    Args:
+        phones: Series of raw phone values (non-string values count as missing)
+    
+    Returns:
+        Tuple of (formatted, status) Series aligned with the input
+    """
+    codes, uniques = pd.factorize(phones.to_numpy(dtype=object))
+    results = [format_phone_strict(value) for value in uniques]
+    
+    # Code -1 (missing values) picks the trailing "Missing" result
+    formatted = np.array([result[0] for result in results] + [""], dtype=object)[codes]
+    status = np.array([result[1] for result in results] + ["Missing"], dtype=object)[codes]
+    
+    return pd.Series(formatted, index=phones.index), pd.Series(status, index=phones.index)
+
+def format_phone_outlook(raw_phone):
+    """
+    Format phone numbers for Outlook contacts (US, UK, Ireland, Denmark, Philippines)
+    
+    Numbers are grouped the way each country writes them, e.g. +44 7911 123456
+    or +63 917 123 4567. Returns a tuple of (formatted_number, status).
+    """
+    if not raw_phone or not isinstance(raw_phone, str):
+        return ("", "Missing")
+    
+    # Remove all non-digit characters (including brackets)
+    digits = NON_DIGITS.sub("", raw_phone)
+    
+    # If there's already a + in the number, remove all characters before and including it
+    if "+" in digits:
+        digits = BEFORE_PLUS.sub("", digits)
+    
+    # Basic validation - count the digits
+    if len(digits) < 8:
+        return ("", "Too Short")
+    if len(digits) > 15:
+        return ("", "Too Long")
+    
+    for pattern, country_code, country_name, digits_to_remove in OUTLOOK_COUNTRY_PATTERNS:
+        if pattern.match(digits):
+            number = digits[digits_to_remove:]
+            groups = OUTLOOK_NUMBER_GROUPS.get((country_code, len(number)))
             
-            # France: +33
-            (r"^33\d{9}$", "33", "FR", 2),          # France with country code
-            (r"^0\d{9}$", "33", "FR", 1),           # France with leading 0
+            if country_code == "1" and len(number) == 10:  # US: +1 (XXX) XXX-XXXX
+                formatted = f"+1 ({number[:3]}) {number[3:6]}-{number[6:]}"
+            elif groups:
+                parts, start = [], 0
+                for size in groups:
+                    parts.append(number[start:start + size])
+                    start += size
+                formatted = f"+{country_code} {' '.join(parts)}"
+            else:
+                formatted = f"+{country_code} {number}"
             
-            # Spain: +34
-            (r"^34\d{9}$", "34", "ES", 2),          # Spain with country code
-            (r"^\d{9}$", "34", "ES", 0),            # Spain without country code
-        ]
+            return (formatted, f"Valid {country_name}")
+    
+    # Fallback for numbers we couldn't identify: check common country code prefixes
+    for leading, length, country_code, country_name in OUTLOOK_FALLBACKS:
+        if digits.startswith(leading) and (length is None or len(digits) == length):
+            return (f"+{country_code} {digits[len(leading):]}", f"Valid {country_name}")
+    
+    return (f"{digits}", "Unknown Format")
+
+# Formatting styles behind format_phone / format_phones
+PHONE_FORMAT_STYLES = {
+    "strict": format_phone_strict,
+    "outlook": format_phone_outlook
+}
+
+def _format_batch(values, style):
+    """Format a list of distinct non-empty strings in one style"""
+    formatter = PHONE_FORMAT_STYLES[style]
+    results = [formatter(value) for value in values]
+    return [result[0] for result in results], [result[1] for result in results]
+
+class PhoneFormatCache:
+    """
+    Bounded LRU of formatted phone numbers, keyed by style and raw string
+    
+    Shared by every tool that formats customer phones, so a number already
+    formatted for the appointment tables isn't formatted again for the Outlook
+    export or the contact import. Misses are formatted as one batch.
+    """
+    
+    def __init__(self, maxsize=PHONE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def format_many(self, values, style="strict"):
+        """
+        Format distinct non-empty strings, reusing cached results
+        
+        Args:
+            values: List of distinct raw phone strings
+            style: Formatting style (see PHONE_FORMAT_STYLES)
+        
+        Returns:
+            Tuple of (formatted list, status list) in the order of the values
+        """
+        if style not in PHONE_FORMAT_STYLES:
+            raise ValueError(f"Unknown phone format style '{style}'")
+        
+        with self._lock:
+            results = []
+            for value in values:
+                result = self._entries.get((style, value))
+                if result is not None:
+                    self._entries.move_to_end((style, value))
+                results.append(result)
         
-        # Try to match the digit pattern to identify the country
-        matched_country = None
-        for pattern, country_code, country_name, digits_to_remove in country_patterns:
-            if re.match(pattern, digits):
-                matched_country = (country_code, country_name, digits_to_remove)
-                break
+        misses = [position for position, result in enumerate(results) if result is None]
+        if misses:
+            formatted, status = _format_batch([values[position] for position in misses], style)
+            for position, result in zip(misses, zip(formatted, status)):
+                results[position] = result
         
-        # Format the phone number based on the detected country
-        if matched_country:
-            country_code, country_name, digits_to_remove = matched_country
+        with self._lock:
+            self.hits += len(values) - len(misses)
+            self.misses += len(misses)
+            for position in misses:
+                self._entries[(style, values[position])] = results[position]
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        
+        return [result[0] for result in results], [result[1] for result in results]
+    
+    def stats(self):
+        """Dictionary of hits, misses, hit rate and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize
+            }
+    
+    def clear(self):
+        """Drop every cached result and reset the stats"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+# Shared by every tool in this process
+_phone_cache = PhoneFormatCache()
+
+def phone_cache_stats():
+    """Hit-rate stats of the shared phone format cache"""
+    return _phone_cache.stats()
+
+def format_phone(raw_phone, style="strict"):
+    """
+    Format one phone number through the shared cache
+    
+    Args:
+        raw_phone: Raw phone value
+        style: 'strict' (WhatsApp-compatible, see format_phone_strict) or
+            'outlook' (grouped for Outlook contacts, see format_phone_outlook)
+    
+    Returns:
+        Tuple of (formatted_number, status)
+    """
+    if not raw_phone or not isinstance(raw_phone, str):
+        return ("", "Missing")
+    
+    formatted, status = _phone_cache.format_many([raw_phone], style)
+    return (formatted[0], status[0])
+
+def format_phones(phones, style="strict"):
+    """
+    Format a column of phone numbers through the shared cache
+    
+    Each distinct value is looked up once and the misses are formatted as one
+    batch.
+    
+    Args:
+        phones: Series of raw phone values (non-string values count as missing)
+        style: Formatting style (see format_phone)
+    
+    Returns:
+        Tuple of (formatted, status) Series aligned with the input
+    """
+    values = phones.to_numpy(dtype=object)
+    is_text = np.fromiter((isinstance(value, str) and value != "" for value in values), dtype=bool, count=len(values))
+    codes, uniques = pd.factorize(values[is_text])
+    
+    unique_formatted, unique_status = _phone_cache.format_many(list(uniques), style)
+    
+    formatted = np.full(len(values), "", dtype=object)
+    status = np.full(len(values), "Missing", dtype=object)
+    formatted[is_text] = np.array(unique_formatted, dtype=object)[codes]
+    status[is_text] = np.array(unique_status, dtype=object)[codes]
+    
+    return pd.Series(formatted, index=phones.index), pd.Series(status, index=phones.index)
+
+def validate_phone_libphonenumber(raw_phone, region=DEFAULT_PHONE_REGION):
+    """
+    Validate a phone number with libphonenumber
+    
+    Numbers without an international prefix are read as numbers of the default
+    region. Valid numbers get a status like "Valid GB" (the number's region).
+    
+    Args:
+        raw_phone: Raw phone value
+        region: Region code used for numbers without a country code
+    
+    Returns:
+        Tuple of (internationally formatted number, status)
+    """
+    if not raw_phone or not isinstance(raw_phone, str):
+        return ("", "Missing")
+    
+    try:
+        number = phonenumbers.parse(raw_phone, region)
+    except phonenumbers.NumberParseException:
+        return ("", "Invalid Format")
+    
+    formatted = phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
+    if not phonenumbers.is_valid_number(number):
+        return (formatted, "Invalid Number")
+    
+    return (formatted, f"Valid {phonenumbers.region_code_for_number(number)}")
+
+# Results memoized by each worker process, keyed by (mode, region, raw value)
+_worker_memo = OrderedDict()
+
+def _validate_shard(shard):
+    """
+    Validate one shard of distinct phone values (runs in a worker process)
+    
+    Args:
+        shard: Tuple of (values, mode, region)
+    
+    Returns:
+        Tuple of (formatted list, status list) in the order of the values
+    """
+    values, mode, region = shard
+    results = [_worker_memo.get((mode, region, value)) for value in values]
+    misses = [position for position, result in enumerate(results) if result is None]
+    
+    if misses:
+        missing_values = [values[position] for position in misses]
+        if mode == "libphonenumber":
+            computed = [validate_phone_libphonenumber(value, region) for value in missing_values]
+        else:
+            formatted, status = format_phone_series(pd.Series(missing_values, dtype=object))
+            computed = list(zip(formatted, status))
+        
+        for position, value, result in zip(misses, missing_values, computed):
+            results[position] = result
+            _worker_memo[(mode, region, value)] = result
+        
+        while len(_worker_memo) > WORKER_MEMO_SIZE:
+            _worker_memo.popitem(last=False)
+    
+    return [result[0] for result in results], [result[1] for result in results]
+
+_phone_pool = None
+_phone_pool_lock = threading.Lock()
+
+def _get_phone_pool():
+    """
+    Process pool shared by every validation (workers keep their memo between runs)
+    
+    Workers are spawned rather than forked: forking the multithreaded Streamlit
+    server can copy locks held by other threads and deadlock the workers.
+    """
+    global _phone_pool
+    with _phone_pool_lock:
+        if _phone_pool is None:
+            _phone_pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_phone_pool.shutdown, wait=False, cancel_futures=True)
+        return _phone_pool
+
+def _reset_phone_pool():
+    """Shut down a broken pool so the next validation starts a fresh one"""
+    global _phone_pool
+    with _phone_pool_lock:
+        if _phone_pool is not None:
+            _phone_pool.shutdown(wait=False, cancel_futures=True)
+        _phone_pool = None
+
+def validate_phones_parallel(phones, mode="strict", region=DEFAULT_PHONE_REGION):
+    """
+    Validate a column of phone numbers across a pool of worker processes
+    
+    Repeated values are validated once: the distinct values are split into
+    shards, validated by up to MAX_WORKERS processes
+    (each memoizing the numbers it has seen) and mapped back to the rows, so
+    results are in input order regardless of which worker finished first.
+    Small inputs are validated in this process, where the pool would only add
+    overhead.
+    
+    Args:
+        phones: Series of raw phone values (non-string values count as missing)
+        mode: 'strict' for format_phone_strict rules or 'libphonenumber' for
+            full validation with the phonenumbers library
+        region: Default region for libphonenumber mode
+    
+    Returns:
+        Tuple of (formatted, status) Series aligned with the input
+    
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in PHONE_VALIDATION_MODES.values():
+        raise ValueError(f"Unknown phone validation mode '{mode}'")
+    
+    values = phones.to_numpy(dtype=object)
+    is_text = np.fromiter((isinstance(value, str) and value != "" for value in values), dtype=bool, count=len(values))
+    codes, uniques = pd.factorize(values[is_text])
+    uniques = list(uniques)
+    
+    # About four shards per worker so a slow shard doesn't hold up the others
+    shard_rows = min(PARALLEL_SHARD_ROWS, max(PARALLEL_MIN_SHARD_ROWS, -(-len(uniques) // (MAX_WORKERS * 4))))
+    shards = [(uniques[start:start + shard_rows], mode, region) for start in range(0, len(uniques), shard_rows)]
+    
+    if len(shards) > 1 and MAX_WORKERS > 1:
+        try:
+            results = list(_get_phone_pool().map(_validate_shard, shards))
+        except BrokenProcessPool:
+            _reset_phone_pool()
+            results = [_validate_shard(shard) for shard in shards]
+    elif mode == "strict":
+        results = [_phone_cache.format_many(uniques, "strict")]
+    else:
+        results = [_validate_shard(shard) for shard in shards]
+    
+    unique_formatted = np.array([value for formatted, _ in results for value in formatted], dtype=object)
+    unique_status = np.array([value for _, status in results for value in status], dtype=object)
+    
+    formatted = np.full(len(values), "", dtype=object)
+    status = np.full(len(values), "Missing", dtype=object)
+    formatted[is_text] = unique_formatted[codes]
+    status[is_text] = unique_status[codes]
+    
+    return pd.Series(formatted, index=phones.index), pd.Series(status, index=phones.index)
+
+def validate_phone_column(df, phone_column, mode="strict", region=DEFAULT_PHONE_REGION):
+    """
+    Validate every phone number in a DataFrame column
+    
+    Args:
+        df: DataFrame with the phone numbers
+        phone_column: Name of the column to validate
+        mode: Validation mode (see PHONE_VALIDATION_MODES)
+        region: Default region for libphonenumber mode
+    
+    Returns:
+        Tuple of (results DataFrame with 'Original Phone Value', 'Formatted Phone'
+        and 'Validation Status' added, summary dict of counts and valid numbers
+        per country)
+    """
+    phones = df[phone_column]
+    original = phones.where(phones.notna(), "").astype(str)
+    formatted, phone_status = validate_phones_parallel(original, mode, region)
+    
+    validation_status = np.where(original == "", "Empty", np.where(phone_status.str.startswith("Valid"), "Valid", "Invalid"))
+    
+    results = df.copy()
+    results['Original Phone Value'] = original
+    results['Formatted Phone'] = formatted
+    results['Validation Status'] = validation_status
+    results = results.reset_index(drop=True)
+    
+    counts = results['Validation Status'].value_counts()
+    
+    # Valid numbers per detected country (statuses like "Valid UK")
+    countries = phone_status[validation_status == "Valid"].str.replace("Valid ", "", regex=False)
+    
+    summary = {
+        "total_processed": len(results),
+        "valid": int(counts.get("Valid", 0)),
+        "invalid": int(counts.get("Invalid", 0)),
+        "empty": int(counts.get("Empty", 0)),
+        "country_counts": countries.value_counts().to_dict()
+    }
+    return results, summary
+
+def read_phone_upload_chunks(source, file_name, chunksize=PHONE_VALIDATION_CHUNK_ROWS):
+    """
+    Read an uploaded contact file in fixed-size chunks
+    
+    CSV files are streamed, so only one chunk is held in memory at a time.
+    Excel files can't be streamed by pandas and are loaded whole, then split.
+    Values are read as text, so every chunk has the same dtypes and phone
+    numbers keep their leading zeros.
+    
+    Args:
+        source: Path or file-like object with the upload
+        file_name: Name of the uploaded file (its extension picks the reader)
+        chunksize: Rows per chunk
+    
+    Returns:
+        Iterator of DataFrame chunks
+    
+    Raises:
+        ValueError: If the file isn't a CSV or Excel file
+    """
+    file_type = file_name.split('.')[-1].lower()
+    
+    if file_type == 'csv':
+        return pd.read_csv(source, dtype=str, chunksize=chunksize)
+    
+    if file_type in ['xls', 'xlsx']:
+        df = pd.read_excel(source, dtype=str)
+        return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    
+    raise ValueError("Unsupported file format. Please upload a CSV or Excel file.")
+
+def stream_phone_validation(chunks, phone_column, output, valid_output=None, on_progress=None, mode="strict", region=DEFAULT_PHONE_REGION):
+    """
+    Validate phone numbers chunk by chunk, writing the results progressively
+    
+    Each chunk is validated with validate_phone_column and appended to the
+    output CSV files, so memory use is bounded by the chunk size rather than
+    the size of the upload.
+    
+    Args:
+        chunks: Iterable of DataFrame chunks (see read_phone_upload_chunks)
+        phone_column: Name of the column with the phone numbers
+        output: Path of the CSV file receiving all results
+        valid_output: Optional path of a CSV file receiving valid numbers only
+        on_progress: Optional callback(rows_processed, rows_per_second) run after each chunk
+        mode: Validation mode (see PHONE_VALIDATION_MODES)
+        region: Default region for libphonenumber mode
+    
+    Returns:
+        Tuple of (preview DataFrame with the first validated rows, summary dict
+        with the validation counts, valid numbers per country and throughput)
+    """
+    summary = {"total_processed": 0, "valid": 0, "invalid": 0, "empty": 0}
+    country_counts = pd.Series(dtype='int64')
+    previews = []
+    preview_rows = 0
+    started = time.perf_counter()
+    
+    with open(output, 'w', newline='', encoding='utf-8') as all_file, \
+            open(valid_output or os.devnull, 'w', newline='', encoding='utf-8') as valid_file:
+        for chunk in chunks:
+            if phone_column not in chunk.columns:
+                raise ValueError(f"Column '{phone_column}' not found in the uploaded file.")
             
-            # Remove leading digits that are already part of the country code or leading zeros
-            if digits_to_remove > 0:
-                formatted_number = digits[digits_to_remove:]
-            else:
-                formatted_number = digits
+            results, chunk_summary = validate_phone_column(chunk, phone_column, mode, region)
+            first = summary["total_processed"] == 0
             
-            # Format for WhatsApp - always use the + prefix followed by country code and number
-            formatted = f"+{country_code} {formatted_number}"
+            results.to_csv(all_file, header=first, index=False)
+            valid = results['Validation Status'] == 'Valid'
+            results[valid].to_csv(valid_file, header=first, index=False)
             
-            # Apply country-specific formatting where appropriate
-            if country_code == "1":  # US/Canada: +1 (XXX) XXX-XXXX
-                if len(formatted_number) == 10:
-                    area_code = formatted_number[:3]
-                    prefix = formatted_number[3:6]
-                    line = formatted_number[6:]
-                    formatted = f"+1 ({area_code}) {prefix}-{line}"
-            elif country_code == "44":  # UK: +44 XXXX XXXXXX
-                if len(formatted_number) >= 10:
-                    formatted = f"+44 {formatted_number}"
+            for key in ("total_processed", "valid", "invalid", "empty"):
+                summary[key] += chunk_summary[key]
             
-            return (formatted, f"Valid {country_name}")
-        
-        # If no specific format matches but length is valid (fallback)
-        # Try to detect country code from first digits
-        if len(digits) >= 11 and digits[:1] == "1":
-            # Likely North America
-            return (f"+1 {digits[1:]}", "Valid US/CA")
-        elif len(digits) >= 11 and digits[:2] == "44":
-            # Likely UK
-            return (f"+44 {digits[2:]}", "Valid UK")
-        elif len(digits) >= 12 and digits[:3] == "353":
-            # Likely Ireland
-            return (f"+353 {digits[3:]}", "Valid IE")
-        elif len(digits) >= 12 and digits[:3] == "971":
-            # Likely UAE
-            return (f"+971 {digits[3:]}", "Valid UAE")
-        elif len(digits) >= 11 and digits[:2] == "63":
-            # Likely Philippines
-            return (f"+63 {digits[2:]}", "Valid PH")
-        elif len(digits) >= 10 and digits[:2] == "45":
-            # Likely Denmark
-            return (f"+45 {digits[2:]}", "Valid DK")
-        elif len(digits) >= 12 and digits[:2] == "91":
-            # Likely India
-            return (f"+91 {digits[2:]}", "Valid IN")
-        else:
-            # Can't determine country - format with best guess
-            # Most international numbers have 2-3 digit country codes
-            if len(digits) >= 11:
-                # Assume first 2 digits are country code
-                return (f"+{digits[:2]} {digits[2:]}", "Unknown Format")
-            else:
-                return (f"+{digits}", "Unknown Format")
+            country_counts = country_counts.add(pd.Series(chunk_summary["country_counts"], dtype='int64'), fill_value=0)
             
-    except Exception as e:
-        return ("", f"Error: {str(e)}")
+            if preview_rows < PHONE_VALIDATION_PREVIEW_ROWS:
+                previews.append(results.head(PHONE_VALIDATION_PREVIEW_ROWS - preview_rows))
+                preview_rows += len(previews[-1])
+            
+            if on_progress:
+                elapsed = time.perf_counter() - started
+                on_progress(summary["total_processed"], summary["total_processed"] / elapsed if elapsed else 0.0)
+    
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = elapsed
+    summary["rows_per_second"] = summary["total_processed"] / elapsed if elapsed else 0.0
+    summary["country_counts"] = country_counts.astype('int64').sort_values(ascending=False).to_dict()
     
-    return ("", "Invalid Format")
+    preview = pd.concat(previews, ignore_index=True) if previews else pd.DataFrame()
+    return preview, summary
+
 
 def create_phone_analysis(df):
     """Create phone analysis visualizations"""
     if df.empty:
         return None, None
     
+    # Frames that haven't been formatted yet get their statuses from the shared cache
+    if "Phone Status" not in df.columns and "Phone" in df.columns:
+        df = df.assign(**{"Phone Status": format_phones(df["Phone"])[1]})
+    
     # Get phone status counts
     status_counts = df["Phone Status"].value_counts().reset_index()
     status_counts.columns = ["Status", "Count"]
@@ -206,7 +745,7 @@ def format_phone_dataframe(df):
     
     # Create a copy and add formatted phones
     df = df.copy()
-    df["Formatted Phone"], df["Phone Status"] = zip(*df["Phone"].map(format_phone_strict))
+    df["Formatted Phone"], df["Phone Status"] = format_phones(df["Phone"])
     
     # Get unique phone numbers with their associated emails and customers
     phone_status = (df[["Customer", "Email", "Phone", "Formatted Phone", "Phone Status"]]
@@ -215,6 +754,33 @@ def format_phone_dataframe(df):
     
     return phone_status
 
+def _form_answer_notes(df, keys):
+    """
+    Notes of 'Form:' answers from the first appointment of each key
+    
+    Args:
+        df: DataFrame of appointments
+        keys: Columns identifying a contact (rows with a missing key have no notes)
+    
+    Returns:
+        Series of notes ("question: answer" lines) indexed by the key values
+    """
+    firsts = df.groupby(keys, sort=False, dropna=True).head(1)
+    notes = pd.Series("", index=firsts.index, dtype=object)
+    
+    for field in [col for col in df.columns if col.startswith('Form:')]:
+        answers = firsts[field]
+        answered = answers.notna() & answers.map(bool, na_action='ignore').fillna(False).astype(bool)
+        if not answered.any():
+            continue
+        
+        lines = field.replace('Form: ', '') + ": " + answers[answered].map(str)
+        first_line = notes[answered] == ""
+        notes[answered] = np.where(first_line, lines, notes[answered] + "\n" + lines)
+    
+    notes.index = pd.MultiIndex.from_frame(firsts[keys]) if len(keys) > 1 else pd.Index(firsts[keys[0]])
+    return notes
+
 def prepare_outlook_contacts(df):
     """Prepare contacts for Outlook import with proper field mapping"""
     if df.empty:
@@ -243,15 +809,10 @@ def prepare_outlook_contacts(df):
     if "ID" not in contacts.columns:
         contacts["ID"] = contacts.index.astype(str)
     
-    formatted_phones = pd.DataFrame([
-        format_phone_strict(phone) for phone in contacts["Phone"]
-    ], columns=["Formatted Phone", "Phone Status"])
+    formatted, status = format_phones(contacts["Phone"])
     
     # Only keep valid phone numbers and remove duplicates
-    contacts["Business Phone"] = [
-        phone if status.startswith("Valid") else ""
-        for phone, status in zip(formatted_phones["Formatted Phone"], formatted_phones["Phone Status"])
-    ]
+    contacts["Business Phone"] = formatted.where(status.str.startswith("Valid"), "").to_numpy()
     
     # Remove duplicate phone numbers, keeping the first occurrence
     contacts = contacts[contacts["Business Phone"] != ""].drop_duplicates(subset=["Business Phone"])
@@ -261,38 +822,12 @@ def prepare_outlook_contacts(df):
     contacts["First Name"] = name_parts[0] if 0 in name_parts else ""
     contacts["Last Name"] = name_parts[1] if 1 in name_parts else ""
     
-    # Create notes field with form answers for each contact
-    contact_notes = {}
-    for idx, row in contacts.iterrows():
-        contact_id = row['ID']
-        
-        # Find the original appointment with this ID (using index if ID is not from original data)
-        matched_rows = None
-        if "ID" in df.columns:
-            matched_rows = df[df['ID'] == contact_id]
-        else:
-            # If ID is not from original data, try to match using other fields
-            matched_rows = df[(df['Customer'] == row['Customer']) & 
-                            (df['Email'] == row['Email']) & 
-                            (df['Phone'] == row['Phone'])]
-        
-        if not matched_rows.empty:
-            appt = matched_rows.iloc[0]
-            notes = []
-            
-            # Collect all form answers
-            form_fields = [col for col in appt.index if col.startswith('Form:')]
-            if form_fields:
-                for field in form_fields:
-                    if pd.notna(appt[field]) and appt[field]:
-                        question = field.replace('Form: ', '')
-                        answer = appt[field]
-                        notes.append(f"{question}: {answer}")
-            
-            contact_notes[contact_id] = "\n".join(notes)
-    
-    # Add notes to contacts dataframe
-    contacts['Notes'] = contacts['ID'].map(lambda x: contact_notes.get(x, ""))
+    # Notes come from the form answers of each contact's first appointment
+    # (matched on ID, or on customer, email and phone when there is no ID column)
+    note_keys = ["ID"] if "ID" in df.columns else ["Customer", "Email", "Phone"]
+    contacts["Notes"] = _form_answer_notes(df, note_keys).reindex(
+        pd.MultiIndex.from_frame(contacts[note_keys]) if len(note_keys) > 1 else contacts[note_keys[0]]
+    ).fillna("").to_numpy()
     
     # Default values for optional fields
     company = ""
@@ -316,10 +851,7 @@ def prepare_outlook_contacts(df):
     # Calculate web page field
     web_page = ""
     if "Is Online" in contacts.columns and "Join URL" in contacts.columns:
-        web_page = contacts.apply(
-            lambda x: x["Join URL"] if x["Is Online"] else "", 
-            axis=1
-        )
+        web_page = contacts["Join URL"].where(contacts["Is Online"].astype(bool), "")
     
     # Map to Outlook contact fields - keeping only the standard Outlook fields
     outlook_contacts = pd.DataFrame({
@@ -427,25 +959,15 @@ def create_appointments_flow(df):
 
 def process_uploaded_phone_list(uploaded_file):
     """Process an uploaded file with phone numbers and convert to dataframe"""
-    import pandas as pd
-    import io
-    
     if uploaded_file is None:
         return None
     
     try:
-        # Determine file type
-        file_type = uploaded_file.name.split('.')[-1].lower()
-        
-        if file_type == 'csv':
-            df = pd.read_csv(uploaded_file)
-        elif file_type in ['xls', 'xlsx']:
-            df = pd.read_excel(uploaded_file)
-        else:
-            return None, "Unsupported file format. Please upload a CSV or Excel file."
-        
-        # Validate the dataframe has required columns
-        required_phone_column = False
+        # Read the upload in chunks so only the narrow result columns are kept
+        try:
+            chunks = read_phone_upload_chunks(uploaded_file, uploaded_file.name)
+        except ValueError as e:
+            return None, str(e)
         
         # Check for common phone column names
         phone_column_names = ['Phone', 'Mobile', 'Phone Number', 'Mobile Number', 
@@ -453,51 +975,57 @@ def process_uploaded_phone_list(uploaded_file):
                              'Business Phone', 'Home Phone', 'Work Phone']
         
         found_phone_column = None
-        for col in phone_column_names:
-            if col in df.columns:
-                found_phone_column = col
-                required_phone_column = True
-                break
+        formatted_chunks = []
         
-        if not required_phone_column:
-            return None, "No phone number column found. The file should contain a column named 'Phone', 'Mobile', 'Phone Number', etc."
-        
-        # Prepare the dataframe for processing
-        formatted_df = pd.DataFrame()
-        formatted_df['Original Phone'] = df[found_phone_column]
-        
-        # Add any name columns if available
-        if 'First Name' in df.columns:
-            formatted_df['First Name'] = df['First Name']
-        if 'Last Name' in df.columns:
-            formatted_df['Last Name'] = df['Last Name']
-        if 'Name' in df.columns and 'First Name' not in df.columns:
-            # Try to split the name
-            formatted_df['First Name'] = df['Name'].apply(lambda x: str(x).split(' ')[0] if pd.notna(x) else '')
-            formatted_df['Last Name'] = df['Name'].apply(lambda x: ' '.join(str(x).split(' ')[1:]) if pd.notna(x) and len(str(x).split(' ')) > 1 else '')
-        
-        # Add email if available
-        if 'Email' in df.columns:
-            formatted_df['Email'] = df['Email']
-        elif 'E-mail' in df.columns:
-            formatted_df['Email'] = df['E-mail']
-        elif 'E-mail Address' in df.columns:
-            formatted_df['Email'] = df['E-mail Address']
-        
-        # Format phone numbers
-        formatted_df['Formatted Phone'] = formatted_df['Original Phone'].apply(
-            lambda x: format_phone_strict(str(x)) if pd.notna(x) else ''
-        )
+        for df in chunks:
+            if found_phone_column is None:
+                found_phone_column = next((col for col in phone_column_names if col in df.columns), None)
+                if found_phone_column is None:
+                    return None, "No phone number column found. The file should contain a column named 'Phone', 'Mobile', 'Phone Number', etc."
+            
+            formatted_chunks.append(_format_uploaded_chunk(df, found_phone_column))
         
-        # Add phone status column
-        formatted_df['Phone Status'] = formatted_df['Formatted Phone'].apply(
-            lambda x: get_phone_status(x)
-        )
+        if not formatted_chunks:
+            return None, "No phone number column found. The file should contain a column named 'Phone', 'Mobile', 'Phone Number', etc."
         
-        return formatted_df, None
+        return pd.concat(formatted_chunks, ignore_index=True), None
     except Exception as e:
         return None, f"Error processing file: {str(e)}"
 
+def _format_uploaded_chunk(df, phone_column):
+    """Narrow frame of names, email and formatted phone for one chunk of an upload"""
+    # Prepare the dataframe for processing
+    formatted_df = pd.DataFrame()
+    formatted_df['Original Phone'] = df[phone_column]
+    
+    # Add any name columns if available
+    if 'First Name' in df.columns:
+        formatted_df['First Name'] = df['First Name']
+    if 'Last Name' in df.columns:
+        formatted_df['Last Name'] = df['Last Name']
+    if 'Name' in df.columns and 'First Name' not in df.columns:
+        # Try to split the name
+        parts = df['Name'].where(df['Name'].notna(), '').astype(str).str.split(' ', n=1)
+        formatted_df['First Name'] = parts.str[0].where(df['Name'].notna(), '')
+        formatted_df['Last Name'] = parts.str[1].fillna('').where(df['Name'].notna(), '')
+    
+    # Add email if available
+    if 'Email' in df.columns:
+        formatted_df['Email'] = df['Email']
+    elif 'E-mail' in df.columns:
+        formatted_df['Email'] = df['E-mail']
+    elif 'E-mail Address' in df.columns:
+        formatted_df['Email'] = df['E-mail Address']
+    
+    # Format phone numbers (missing values stay empty)
+    present = formatted_df['Original Phone'].notna().to_numpy()
+    formatted, status = format_phone_series(formatted_df['Original Phone'].where(present, '').astype(str))
+    
+    formatted_df['Formatted Phone'] = [(number, number_status) if is_present else '' for number, number_status, is_present in zip(formatted, status, present)]
+    formatted_df['Phone Status'] = status.where(present, "Missing").to_numpy()
+    
+    return formatted_df
+
 def get_phone_status(phone_number):
     """Get status of a phone number after formatting"""
     if not phone_number:
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import analyze_clients, analyze_service_mix
+
+def _appointments(seed, size=500):
+    rng = np.random.default_rng(seed)
+    
+    def with_nulls(values, share=0.1):
+        return pd.Series(values, dtype=object).where(rng.random(size) > share)
+    
+    return pd.DataFrame({
+        'Business': with_nulls(rng.choice(['Acme', 'Globex', 'Initech', 'Umbrella'], size)),
+        # Few services with near-equal weights, so service counts tie
+        'Service': with_nulls(rng.choice(['Dental', 'Vision', 'Hearing', 'Flu Shot', 'Massage'], size, p=[0.3, 0.3, 0.3, 0.05, 0.05])),
+        'Status': with_nulls(rng.choice(['Booked', 'Cancelled', 'Completed'], size)),
+        'Email': with_nulls([f"user{n}@example.com" for n in rng.integers(0, 120, size)]),
+        'Start Date': pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 300, size), unit='D')).where(rng.random(size) > 0.05),
+        'Duration (min)': rng.choice([15, 30, 45, 60], size).astype(float)
+    })
+
+def _reference_service_mix(df):
+    """Service mix computed as before: value_counts, then a plain groupby"""
+    service_counts = df["Service"].value_counts().reset_index()
+    service_counts.columns = ["Service", "Count"]
+    thresh = service_counts["Count"].sum() * 0.05
+    small_services = service_counts[service_counts["Count"] < thresh]
+    if not small_services.empty:
+        other = pd.DataFrame([{"Service": "Other", "Count": small_services["Count"].sum()}])
+        service_counts = pd.concat([service_counts[service_counts["Count"] >= thresh], other], ignore_index=True)
+    
+    duration_analysis = df.groupby("Service").agg({"Duration (min)": ["mean", "min", "max", "count"]}).reset_index()
+    duration_analysis.columns = ["Service", "Avg_Duration", "Min_Duration", "Max_Duration", "Appointment_Count"]
+    return service_counts, duration_analysis.sort_values("Appointment_Count", ascending=False)
+
+def _reference_clients(df):
+    """Client metrics computed as before: one groupby with nunique and a cancellation lambda"""
+    client_analysis = df.groupby("Business").agg({
+        "Start Date": "count",
+        "Duration (min)": "mean",
+        "Status": lambda x: (x == "Cancelled").mean() * 100,
+        "Service": "nunique",
+        "Email": "nunique"
+    }).reset_index()
+    client_analysis.columns = ["Business", "Total_Appointments", "Avg_Duration",
+                               "Cancellation_Rate", "Unique_Services", "Recurring_Patients"]
+    return client_analysis.round(2).sort_values("Total_Appointments", ascending=False)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_service_mix_matches_value_counts(seed):
+    df = _appointments(seed)
+    service_counts, duration_analysis = analyze_service_mix(df)
+    expected_counts, expected_durations = _reference_service_mix(df)
+    
+    pd.testing.assert_frame_equal(service_counts, expected_counts, check_dtype=False)
+    pd.testing.assert_frame_equal(duration_analysis, expected_durations, check_dtype=False)
+
+def test_tied_service_counts_keep_first_appearance():
+    df = pd.DataFrame({
+        'Business': ['Acme'] * 6,
+        'Service': ['Vision', 'Dental', None, 'Dental', 'Vision', 'Hearing'],
+        'Status': ['Booked'] * 6,
+        'Email': [f"user{n}@example.com" for n in range(6)],
+        'Start Date': pd.Timestamp('2024-01-01'),
+        'Duration (min)': 30.0
+    })
+    
+    service_counts, _ = analyze_service_mix(df)
+    
+    assert service_counts['Service'].tolist() == _reference_service_mix(df)[0]['Service'].tolist() == ['Vision', 'Dental', 'Hearing']
+
+@pytest.mark.parametrize('seed', range(5))
+def test_clients_match_nunique_groupby(seed):
+    df = _appointments(seed)
+    
+    pd.testing.assert_frame_equal(analyze_clients(df), _reference_clients(df), check_dtype=False)
+
+def test_clients_count_each_service_and_patient_once_per_business():
+    df = pd.DataFrame({
+        'Business': ['Acme', 'Globex', 'Acme', 'Acme', None, 'Globex'],
+        'Service': ['Dental', 'Dental', 'Dental', None, 'Vision', 'Vision'],
+        'Status': ['Cancelled', None, 'Booked', 'Cancelled', 'Booked', 'Booked'],
+        'Email': ['a@example.com', 'a@example.com', None, 'a@example.com', 'b@example.com', 'b@example.com'],
+        'Start Date': pd.Timestamp('2024-01-01'),
+        'Duration (min)': [30.0, 45.0, 60.0, 15.0, 30.0, 30.0]
+    })
+    
+    clients = analyze_clients(df).set_index('Business')
+    
+    assert clients.loc['Acme', ['Unique_Services', 'Recurring_Patients']].tolist() == [1, 1]
+    assert clients.loc['Globex', ['Unique_Services', 'Recurring_Patients']].tolist() == [2, 2]
+    assert clients.loc['Acme', 'Cancellation_Rate'] == pytest.approx(66.67)
+    pd.testing.assert_frame_equal(analyze_clients(df), _reference_clients(df), check_dtype=False)
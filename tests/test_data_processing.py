@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.utils.data_processing import calculate_metrics
+
+METRICS = [
+    {'name': 'Total', 'column': 'Booked', 'function': 'sum'},
+    {'name': 'Average', 'column': 'Rate', 'function': 'mean'},
+    {'name': 'Median', 'column': 'Rate', 'function': 'median'},
+    {'name': 'Lowest', 'column': 'Booked', 'function': 'min'},
+    {'name': 'Highest', 'column': 'Rate', 'function': 'max'},
+    {'name': 'Rows', 'column': 'Rate', 'function': 'count'},
+    {'name': 'Services', 'column': 'Service', 'function': 'nunique'},
+    {'name': 'Skipped', 'column': 'Missing', 'function': 'sum'},
+    {'name': 'Unknown', 'column': 'Rate', 'function': 'mode'}
+]
+
+def _frame(seed, size=400):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Client': pd.Categorical(rng.choice(['u', 'v'], size), categories=['u', 'v', 'w']),
+        'Site': pd.Series(rng.choice(['North', 'South', 'East'], size), dtype=object).where(rng.random(size) > 0.05),
+        'Service': pd.Series(rng.choice(['Dental', 'Vision', 'Hearing'], size), dtype=object).where(rng.random(size) > 0.1),
+        'Booked': rng.integers(0, 50, size),
+        'Completed': rng.integers(0, 50, size).astype(float),
+        'Rate': pd.Series(rng.random(size)).where(rng.random(size) > 0.1)
+    })
+
+def _reference_metrics(df, metrics_config, groupby):
+    """Metrics grouped one at a time, as before (unobserved categories included)"""
+    result = pd.DataFrame()
+    for metric in metrics_config:
+        col, func = metric['column'], metric['function']
+        if col not in df.columns or func not in ('sum', 'mean', 'median', 'min', 'max', 'count', 'nunique'):
+            continue
+        result[metric['name']] = getattr(df.groupby(groupby, observed=False)[col], func)()
+    return result.reset_index()
+
+@pytest.mark.parametrize('groupby', ['Client', 'Site', ['Client', 'Site'], ['Site', 'Service']])
+@pytest.mark.parametrize('seed', range(3))
+def test_grouped_metrics_match_per_metric_groupbys(seed, groupby):
+    df = _frame(seed)
+    
+    pd.testing.assert_frame_equal(calculate_metrics(df, METRICS, groupby=groupby), _reference_metrics(df, METRICS, groupby))
+
+def test_unobserved_categories_are_kept_as_empty_groups():
+    df = _frame(0)
+    
+    result = calculate_metrics(df, METRICS, groupby='Client').set_index('Client')
+    
+    assert list(result.index) == ['u', 'v', 'w']
+    assert result.loc['w', ['Total', 'Rows', 'Services']].tolist() == [0, 0, 0]
+    assert result.loc['w', ['Average', 'Lowest']].isna().all()
+
+def test_ungrouped_metrics_match_column_aggregates():
+    df = _frame(1)
+    
+    result = calculate_metrics(df, METRICS + [{'name': 'Share', 'column': 'Rate', 'function': 'mean', 'format': '{:.1%}'}])
+    
+    assert set(result) == {'Total', 'Average', 'Median', 'Lowest', 'Highest', 'Rows', 'Services', 'Share'}
+    assert result['Total']['raw_value'] == df['Booked'].sum()
+    assert result['Average']['raw_value'] == pytest.approx(df['Rate'].mean())
+    assert result['Median']['raw_value'] == pytest.approx(df['Rate'].median())
+    assert result['Rows']['raw_value'] == df['Rate'].count()
+    assert result['Services']['raw_value'] == df['Service'].nunique()
+    assert result['Share']['formatted_value'] == f"{df['Rate'].mean():.1%}"
+
+def test_weighted_mean_and_ratio():
+    df = pd.DataFrame({
+        'Site': ['North', 'North', 'North', 'South', 'South', 'East'],
+        'Rate': [0.5, 1.0, np.nan, 0.2, 0.4, 0.9],
+        'Headcount': [10, 30, 100, 0, 0, np.nan],
+        'Completed': [5, 10, 0, 3, 2, 1],
+        'Booked': [10, 10, 0, 0, 0, 4]
+    })
+    metrics = [
+        {'name': 'Weighted Rate', 'column': 'Rate', 'function': 'weighted_mean', 'weight': 'Headcount'},
+        {'name': 'Completion', 'function': 'ratio', 'numerator': 'Completed', 'denominator': 'Booked'},
+        {'name': 'No Weight', 'column': 'Rate', 'function': 'weighted_mean', 'weight': 'Missing'},
+        {'name': 'No Denominator', 'function': 'ratio', 'numerator': 'Completed', 'denominator': 'Missing'}
+    ]
+    
+    result = calculate_metrics(df, metrics, groupby='Site').set_index('Site')
+    
+    # Rows missing the value or the weight are left out; zero weights or denominators give NaN
+    assert list(result.columns) == ['Weighted Rate', 'Completion']
+    assert result.loc['North', 'Weighted Rate'] == pytest.approx((0.5 * 10 + 1.0 * 30) / 40)
+    assert np.isnan(result.loc['South', 'Weighted Rate']) and np.isnan(result.loc['East', 'Weighted Rate'])
+    assert result.loc['North', 'Completion'] == pytest.approx(15 / 20)
+    assert result.loc['East', 'Completion'] == pytest.approx(1 / 4)
+    assert np.isnan(result.loc['South', 'Completion'])
+    
+    totals = calculate_metrics(df, metrics)
+    assert totals['Weighted Rate']['raw_value'] == pytest.approx((0.5 * 10 + 1.0 * 30) / 40)
+    assert totals['Completion']['raw_value'] == pytest.approx(21 / 24)
@@ -0,0 +1,73 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from modules.utils.data_processing import apply_filters
+from modules.utils.filter_engine import MAX_CACHED_MASKS, get_filter_index
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    n = 400
+    clients = ['Acme', 'Globex', 'Initech', 'Umbrella']
+    sites = ['North', 'South', 'East']
+    return pd.DataFrame({
+        'Client': pd.Categorical(rng.choice(clients + [None], n)),
+        'Site_Location': [list(rng.choice(sites, size=rng.integers(0, 3), replace=False)) for _ in range(n)],
+        'Service_Month': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 366, n), unit='D'),
+        'Revenue': rng.normal(1000, 400, n).round(2),
+        'Notes': rng.choice(['Follow-up', 'first visit', 'VIP follow up', None], n),
+        'Active': rng.random(n) < 0.5
+    })
+
+def test_list_filter_matches_scalar_and_list_cells(frame):
+    filtered = apply_filters(frame, {'Client': ['Acme', 'Initech'], 'Site_Location': ['South']})
+    
+    expected = frame[frame['Client'].isin(['Acme', 'Initech']) & frame['Site_Location'].map(lambda items: 'South' in items)]
+    pd.testing.assert_frame_equal(filtered, expected)
+
+def test_date_range_is_inclusive(frame):
+    start, end = datetime.date(2024, 3, 1), datetime.date(2024, 3, 31)
+    filtered = apply_filters(frame, {'Service_Month': (start, end)})
+    
+    months = frame['Service_Month']
+    expected = frame[(months >= pd.Timestamp(start)) & (months <= pd.Timestamp(end))]
+    pd.testing.assert_frame_equal(filtered, expected)
+
+def test_range_text_and_boolean_filters_are_combined(frame):
+    filters = {'Revenue': ('range', 800, 1200), 'Notes': 'FOLLOW', 'Active': True}
+    filtered = apply_filters(frame, filters)
+    
+    expected = frame[
+        frame['Revenue'].between(800, 1200)
+        & frame['Notes'].astype(str).str.lower().str.contains('follow', regex=False)
+        & frame['Active']
+    ]
+    pd.testing.assert_frame_equal(filtered, expected)
+
+def test_all_and_unknown_columns_are_ignored(frame):
+    filtered = apply_filters(frame, {'Client': ['All'], 'Missing': ['x'], 'Notes': 'all'})
+    
+    pd.testing.assert_frame_equal(filtered, frame)
+    assert filtered is not frame
+
+def test_masks_are_memoized_per_filter_value(frame):
+    index = get_filter_index(frame)
+    
+    assert index.isin_mask('Client', ['Acme']) is index.isin_mask('Client', ['Acme'])
+    assert index.isin_mask('Client', ['Acme']) is not index.isin_mask('Client', ['Globex'])
+
+def test_masks_do_not_evict_derived_objects(frame):
+    index = get_filter_index(frame)
+    builds = []
+    
+    def build():
+        builds.append(1)
+        return object()
+    
+    derived = index.derived('rollup', build)
+    for low in range(MAX_CACHED_MASKS + 10):
+        index.range_mask('Revenue', low, low + 100)
+    
+    assert index.derived('rollup', build) is derived
+    assert len(builds) == 1
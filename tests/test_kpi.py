@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.airtable.kpi import calculate_performance_score
+
+WEIGHT_SETS = [
+    None,
+    {'EargymPromotion': 1, 'Crossbooking': 1, 'BOTDandEODFilled': 1, 'PhotosVideosTestimonials': 1, 'XraysAndDentalNotesUploaded': 1},
+    {'EargymPromotion': 5, 'Crossbooking': 0, 'BOTDandEODFilled': 2.5, 'PhotosVideosTestimonials': 0.5, 'XraysAndDentalNotesUploaded': 1},
+    {'EargymPromotion': 0, 'Crossbooking': 0, 'BOTDandEODFilled': 0, 'PhotosVideosTestimonials': 3, 'XraysAndDentalNotesUploaded': 0}
+]
+
+def _kpi_events(seed, size=200):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': [f"rec{n}" for n in range(size)],
+        'Leader': rng.choice(['Ann Lee', 'Bo Chan', 'Cy Diaz', 'Dee Evans'], size),
+        'EargymPromotion': rng.poisson(1.5, size),
+        'Crossbooking': rng.poisson(2, size),
+        'BOTDandEODFilled': (rng.random(size) > 0.2).astype(int),
+        'PhotosVideosTestimonials': rng.poisson(3, size),
+        'XraysAndDentalNotesUploaded': (rng.random(size) > 0.15).astype(int)
+    })
+
+def _reference_scores(df, weights):
+    """Leader scores computed as before: per-row apply for the credits and a groupby().apply for MinimumsMet"""
+    weights = weights or {category: 1 for category in WEIGHT_SETS[1]}
+    score_df = df.copy()
+    score_df['EargymMinMet'] = score_df['EargymPromotion'].apply(lambda x: min(x / 1, 1.0))
+    score_df['CrossbookingMinMet'] = score_df['Crossbooking'].apply(lambda x: min(x / 2, 1.0))
+    score_df['PhotosMinMet'] = score_df['PhotosVideosTestimonials'].apply(lambda x: min(x / 3, 1.0))
+    
+    scores = score_df.groupby('Leader').agg({
+        'EargymPromotion': 'mean', 'Crossbooking': 'mean', 'BOTDandEODFilled': 'mean',
+        'PhotosVideosTestimonials': 'mean', 'XraysAndDentalNotesUploaded': 'mean',
+        'EargymMinMet': 'mean', 'CrossbookingMinMet': 'mean', 'PhotosMinMet': 'mean', 'id': 'count'
+    }).rename(columns={'id': 'EventCount'})
+    
+    maxima = {column: df[column].max() if df[column].max() > 0 else 1
+              for column in ['EargymPromotion', 'Crossbooking', 'PhotosVideosTestimonials']}
+    scores['NormalizedEargymPromotion'] = scores['EargymMinMet'] * 0.7 + (scores['EargymPromotion'] / maxima['EargymPromotion']) * 0.3
+    scores['NormalizedCrossbooking'] = scores['CrossbookingMinMet'] * 0.7 + (scores['Crossbooking'] / maxima['Crossbooking']) * 0.3
+    scores['NormalizedPhotosVideosTestimonials'] = scores['PhotosMinMet'] * 0.7 + (scores['PhotosVideosTestimonials'] / maxima['PhotosVideosTestimonials']) * 0.3
+    
+    total_weight = sum(weights.values())
+    scores['WeightedScore'] = (
+        scores['NormalizedEargymPromotion'] * weights['EargymPromotion'] +
+        scores['NormalizedCrossbooking'] * weights['Crossbooking'] +
+        scores['BOTDandEODFilled'] * weights['BOTDandEODFilled'] +
+        scores['NormalizedPhotosVideosTestimonials'] * weights['PhotosVideosTestimonials'] +
+        scores['XraysAndDentalNotesUploaded'] * weights['XraysAndDentalNotesUploaded']
+    ) / total_weight
+    scores['PerformanceScore'] = scores['WeightedScore'] * 100
+    scores['Rank'] = scores['PerformanceScore'].rank(ascending=False, method='min')
+    scores['MinimumsMet'] = score_df.groupby('Leader').apply(lambda x: (
+        (x['EargymPromotion'] >= 1) & (x['Crossbooking'] >= 2) & (x['PhotosVideosTestimonials'] >= 3) &
+        (x['BOTDandEODFilled'] == 1) & (x['XraysAndDentalNotesUploaded'] == 1)
+    ).mean() * 100)
+    return scores
+
+@pytest.mark.parametrize('weights', WEIGHT_SETS)
+@pytest.mark.parametrize('seed', range(3))
+def test_scores_match_per_row_scoring(seed, weights):
+    df = _kpi_events(seed)
+    
+    pd.testing.assert_frame_equal(calculate_performance_score(df, weights), _reference_scores(df, weights), check_dtype=False)
+
+def test_scores_without_recorded_counts_normalize_by_one():
+    df = _kpi_events(0).assign(EargymPromotion=0, Crossbooking=0)
+    
+    pd.testing.assert_frame_equal(calculate_performance_score(df), _reference_scores(df, None), check_dtype=False)
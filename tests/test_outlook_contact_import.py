@@ -0,0 +1,217 @@
+import gc
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from thefuzz import fuzz
+from outlook_contact_import import ContactIndex, _cluster_duplicates, _duplicate_codes, detect_duplicates
+
+COLUMNS = {'phone': 'Phone', 'email': 'Email', 'first_name': 'First Name', 'last_name': 'Last Name'}
+
+def _reference_clusters(size, key_codes):
+    """Cluster IDs from a plain union-find over rows sharing a group code, numbered by first row"""
+    parent = list(range(size))
+    
+    def find(row):
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+    
+    members = np.zeros(size, dtype=bool)
+    for codes in key_codes:
+        first_of_group = {}
+        for row, code in enumerate(codes.tolist()):
+            if code < 0:
+                continue
+            members[row] = True
+            if code in first_of_group:
+                parent[find(row)] = find(first_of_group[code])
+            else:
+                first_of_group[code] = row
+    
+    numbering = {}
+    clusters = np.zeros(size, dtype=int)
+    for row in range(size):
+        if members[row]:
+            clusters[row] = numbering.setdefault(find(row), len(numbering) + 1)
+    return clusters
+
+@pytest.mark.parametrize('seed', range(5))
+def test_clusters_match_plain_union_find(seed):
+    rng = np.random.default_rng(seed)
+    size = 2000
+    key_codes = [_duplicate_codes(pd.Series(rng.integers(0, 1500, size).astype(str)).where(rng.random(size) > 0.3))
+                 for _ in range(3)]
+    
+    np.testing.assert_array_equal(_cluster_duplicates(size, key_codes), _reference_clusters(size, key_codes))
+
+def test_contacts_sharing_keys_transitively_form_one_cluster():
+    contacts = pd.DataFrame({
+        'Phone': ['+1 555 0100', '+1 555 0100', '+1 555 0199', '+1 555 0142', None],
+        'Email': ['ann@example.com', 'a.lee@example.com', 'a.lee@example.com', 'bo@example.com', 'bo@example.com'],
+        'First Name': ['Ann', 'Ann', 'A', 'Bo', 'Bo'],
+        'Last Name': ['Lee', 'Lee', 'Lee', 'Chan', 'Chan']
+    })
+    
+    df, duplicates, counts, groups = detect_duplicates(contacts, COLUMNS)
+    
+    assert groups == {'Cluster-1': [0, 1, 2], 'Cluster-2': [3, 4]}
+    assert df['Duplicate Type'].tolist() == ['Phone', 'Phone', 'Email', 'Email', 'Email']
+    assert counts['phone'] == 2 and counts['email'] == 4 and counts['exact_name'] == 4
+    assert len(duplicates) == 5
+
+FIRST_NAMES = ['katherine', 'jonathan', 'mohammed', 'siobhan', 'christopher', 'maria', 'aoife', 'bartholomew']
+LAST_NAMES = ['johnson', 'fitzgerald', 'rasmussen', 'dela cruz', 'oconnell', 'nguyen', 'abernathy', 'kowalski']
+
+def _typo(rng, name):
+    """Name with up to three random edits anywhere in it"""
+    chars = list(name)
+    for _ in range(rng.integers(0, 4)):
+        position = int(rng.integers(0, len(chars)))
+        edit = rng.integers(0, 3)
+        if edit == 0 and len(chars) > 1:
+            del chars[position]
+        elif edit == 1:
+            chars.insert(position, chr(rng.integers(97, 123)))
+        else:
+            chars[position] = chr(rng.integers(97, 123))
+    return ''.join(chars)
+
+def _typo_contacts(seed, size=400):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(size):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append((
+            f"+1 555 {rng.integers(0, 2000):07d}" if rng.random() > 0.3 else None,
+            f"user{rng.integers(0, 2000)}@example.com" if rng.random() > 0.3 else None,
+            _typo(rng, first).title(), _typo(rng, last).title() if rng.random() > 0.05 else None
+        ))
+    df = pd.DataFrame(rows, columns=['Phone', 'Email', 'First Name', 'Last Name'])
+    return df.set_index(pd.Index(rng.permutation(size) * 3))
+
+def _pairwise_fuzzy_scan(df, duplicate_groups, fuzzy_threshold):
+    """Fuzzy name duplicates applied the way the original scan did: every pair of remaining names, in row order"""
+    df = df.copy()
+    names = (df['First Name'].fillna('') + ' ' + df['Last Name'].fillna('')).str.strip().str.lower()
+    group_id = len(duplicate_groups) + 1
+    remaining = [(idx, names[idx]) for idx in df.index[~df['Is Duplicate']]]
+    
+    for idx1, name1 in remaining:
+        for idx2, name2 in remaining:
+            if idx1 >= idx2 or not name1 or not name2:
+                continue
+            
+            similarity = fuzz.ratio(name1, name2)
+            if similarity >= fuzzy_threshold:
+                df.loc[[idx1, idx2], 'Is Duplicate'] = True
+                df.loc[[idx1, idx2], 'Duplicate Type'] = df.loc[[idx1, idx2], 'Duplicate Type'].replace('', 'Fuzzy Name')
+                df.loc[[idx1, idx2], 'Duplicate Group'] = f"Fuzzy-{group_id}"
+                if 'Fuzzy Match Score' not in df.columns:
+                    df['Fuzzy Match Score'] = None
+                    df['Matched With'] = ""
+                df.loc[[idx1, idx2], 'Fuzzy Match Score'] = similarity
+                df.loc[idx1, 'Matched With'] = name2
+                df.loc[idx2, 'Matched With'] = name1
+                duplicate_groups[f"Fuzzy-{group_id}"] = [idx1, idx2]
+                group_id += 1
+    
+    return df, duplicate_groups
+
+@pytest.mark.parametrize('fuzzy_threshold', [70, 85])
+@pytest.mark.parametrize('seed', range(3))
+def test_fuzzy_duplicates_match_the_pairwise_scan(seed, fuzzy_threshold):
+    contacts = _typo_contacts(seed)
+    exact, _, _, exact_groups = detect_duplicates(contacts, COLUMNS)
+    expected, expected_groups = _pairwise_fuzzy_scan(exact, exact_groups, fuzzy_threshold)
+    
+    df, _, counts, groups = detect_duplicates(contacts, COLUMNS, fuzzy_name_match=True, fuzzy_threshold=fuzzy_threshold)
+    
+    assert groups == expected_groups
+    assert counts['fuzzy_name'] == 2 * sum(group.startswith('Fuzzy-') for group in groups)
+    compared = ['Is Duplicate', 'Duplicate Type', 'Duplicate Group', 'Fuzzy Match Score', 'Matched With']
+    pd.testing.assert_frame_equal(df[compared], expected[compared], check_dtype=False)
+
+@pytest.fixture
+def index(tmp_path):
+    return ContactIndex(str(tmp_path / 'contacts.sqlite'))
+
+def _contacts(rows):
+    return pd.DataFrame(rows, columns=['Phone', 'Email', 'First Name', 'Last Name'])
+
+def test_matches_follow_key_priority(index):
+    index.add_contacts(_contacts([
+        ('+1 (555) 010-0100', 'ann@example.com', 'Ann', 'Lee'),
+        ('+44 7911 123456', 'bo@example.com', 'Bo', 'Chan')
+    ]), COLUMNS)
+    
+    result = index.match(_contacts([
+        ('15550100100', 'BO@example.com', 'Cy', 'Diaz'),   # Phone of Ann, email of Bo
+        (None, ' Bo@Example.com ', 'Dee', 'Evans'),
+        ('123', '', 'ann', 'LEE'),
+        ('+1 555 999 0000', 'new@example.com', 'New', 'Person')
+    ]), COLUMNS)
+    
+    assert result['In Outlook'].tolist() == [True, True, True, False]
+    assert result['Existing Match'].tolist() == ['Phone', 'Email', 'Exact Name', '']
+    assert result['Existing Contact'].tolist() == ['Ann Lee', 'Bo Chan', 'Ann Lee', '']
+
+def test_random_uploads_match_dictionary_lookups(index):
+    rng = np.random.default_rng(5)
+    
+    def random_contacts(count):
+        return _contacts([
+            (f"+1 555 {rng.integers(0, 400):07d}" if rng.random() > 0.2 else None,
+             f"user{rng.integers(0, 400)}@example.com" if rng.random() > 0.2 else None,
+             f"First{rng.integers(0, 30)}", f"Last{rng.integers(0, 30)}")
+            for _ in range(count)
+        ])
+    
+    indexed = random_contacts(300)
+    upload = random_contacts(300)
+    index.add_contacts(indexed, COLUMNS)
+    
+    def digits(value):
+        return ''.join(ch for ch in value if ch.isdigit()) if isinstance(value, str) else ''
+    
+    lookups = [
+        ('Phone', {digits(phone) for phone in indexed['Phone']} - {''}, lambda row: digits(row['Phone'])),
+        ('Email', set(indexed['Email'].dropna()), lambda row: row['Email'] or ''),
+        ('Exact Name', set((indexed['First Name'] + ' ' + indexed['Last Name']).str.lower()), lambda row: f"{row['First Name']} {row['Last Name']}".lower())
+    ]
+    expected = [next((label for label, keys, key in lookups if key(row) in keys), '') for _, row in upload.iterrows()]
+    
+    assert index.match(upload, COLUMNS)['Existing Match'].tolist() == expected
+
+def test_fuzzy_names_match_only_unmatched_contacts(index):
+    index.add_contacts(_contacts([('', 'kat@example.com', 'Katherine', 'Johnson')]), COLUMNS)
+    
+    result = index.match(_contacts([
+        ('', '', 'Katharine', 'Johnson'),
+        ('', 'kat@example.com', 'Kathy', 'Johnston'),
+        ('', '', 'Zed', 'Johnson')
+    ]), COLUMNS, fuzzy_name_match=True, fuzzy_threshold=85)
+    
+    assert result['Existing Match'].tolist() == ['Fuzzy Name', 'Email', '']
+    assert result['Existing Contact'].tolist() == ['Katherine Johnson', 'Katherine Johnson', '']
+
+def test_contacts_are_indexed_once_and_cleared(index):
+    contacts = _contacts([('+1 555 010 0100', 'ann@example.com', 'Ann', 'Lee')])
+    
+    assert index.add_contacts(contacts, COLUMNS) == 1
+    assert index.add_contacts(contacts, COLUMNS) == 0
+    assert index.stats()['contacts'] == 1
+    
+    index.clear()
+    assert index.stats()['contacts'] == 0
+    assert not index.match(contacts, COLUMNS)['In Outlook'].any()
+
+def test_connections_are_closed(index):
+    contacts = _contacts([('+1 555 010 0100', 'ann@example.com', 'Ann', 'Lee')])
+    index.add_contacts(contacts, COLUMNS)
+    index.match(contacts, COLUMNS, fuzzy_name_match=True)
+    index.stats()
+    
+    gc.collect()
+    assert not [obj for obj in gc.get_objects() if isinstance(obj, sqlite3.Connection)]
@@ -0,0 +1,114 @@
+from unittest import mock
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import analyze_patients
+from modules.utils import patient_dimension
+from modules.utils.patient_dimension import PatientDimension, get_patient_dimension
+
+@pytest.fixture
+def appointments():
+    return pd.DataFrame({
+        'Email': ['ann@example.com', 'bo@example.com', 'ann@example.com', 'cy@example.com'],
+        'Customer': ['Ann Lee', 'Bo Chan', 'Ann Lee', 'Cy Diaz'],
+        'Phone': ['555-0100', '555-0142', '555-0100', '555-0199'],
+        'Service': ['Dental', 'Vision', 'Vision', 'Dental'],
+        'Business': ['North', 'South', 'North', 'North'],
+        'Status': ['Booked', 'Cancelled', 'Booked', 'Booked'],
+        'Start Date': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-02-01', '2024-01-05'])
+    })
+
+def _filtered(df, business):
+    # Mirrors the appointment table: a fresh copy is filtered on every rerun
+    filtered = df.copy()
+    return filtered[filtered['Business'] == business]
+
+def test_filtered_copies_reuse_the_dimension_cached_on_the_source(appointments):
+    filters = {'business': 'North'}
+    
+    with mock.patch.object(patient_dimension, 'PatientDimension', wraps=patient_dimension.PatientDimension) as build:
+        first = get_patient_dimension(_filtered(appointments, 'North'), source=appointments, filters=filters)
+        rerun = get_patient_dimension(_filtered(appointments, 'North'), source=appointments, filters=filters)
+        other = get_patient_dimension(_filtered(appointments, 'South'), source=appointments, filters={'business': 'South'})
+    
+    assert build.call_count == 2
+    assert rerun is first
+    assert sorted(first.latest.index) == ['ann@example.com', 'cy@example.com']
+    assert list(other.latest.index) == ['bo@example.com']
+
+def _random_appointments(seed, size=600):
+    rng = np.random.default_rng(seed)
+    people = rng.integers(0, 80, size)
+    
+    def with_nulls(values, share=0.05):
+        return pd.Series(values, dtype=object).where(rng.random(size) > share)
+    
+    # Few businesses and many appointments per patient, so preferred businesses tie
+    return pd.DataFrame({
+        'Email': with_nulls([f"user{n}@example.com" for n in people]),
+        'Customer': with_nulls([f"Customer {n % 70}" if rng.random() > 0.1 else f"Alias {n}" for n in people]),
+        'Phone': with_nulls([f"555-{n:04d}" if rng.random() > 0.1 else f"555-9{n:03d}" for n in people]),
+        'Service': rng.choice(['Dental', 'Vision', 'Hearing', 'Flu Shot'], size),
+        'Business': rng.choice(['North', 'South', 'East'], size),
+        'Status': with_nulls(rng.choice(['Booked', 'Cancelled', 'Completed'], size)),
+        'Duration (min)': rng.choice([15, 30, 45, 60], size).astype(float),
+        'Start Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.permutation(size), unit='h')
+    })
+
+def _reference_patients(df):
+    """Patient tables computed as before: groupbys with Python lambdas"""
+    unique_patients = (df[["Email", "Customer", "Phone", "Start Date"]]
+                       .sort_values("Start Date", ascending=False)
+                       .groupby(["Email", "Customer", "Phone"])
+                       .first()
+                       .reset_index())
+    
+    booking_freq = df.groupby("Email").agg({
+        "Customer": "first",
+        "Service": "count",
+        "Business": "nunique",
+        "Duration (min)": "sum",
+        "Start Date": ["min", "max"],
+        "Status": lambda x: (x == "Cancelled").mean() * 100
+    }).reset_index()
+    booking_freq.columns = ["Email", "Customer", "Total_Appointments", "Unique_Businesses",
+                            "Total_Duration", "First_Visit", "Last_Visit", "Cancellation_Rate"]
+    booking_freq["Days_Between_Visits"] = (booking_freq["Last_Visit"] - booking_freq["First_Visit"]).dt.days
+    booking_freq = booking_freq.sort_values("Total_Appointments", ascending=False)
+    
+    service_usage = df.groupby(["Email", "Customer"]).agg({
+        "Service": ["count", lambda x: ", ".join(sorted(x.unique()))],
+        "Business": lambda x: x.mode().iloc[0] if not x.empty else "",
+        "Duration (min)": "mean"
+    }).reset_index()
+    service_usage.columns = ["Email", "Customer", "Service_Count", "Services", "Preferred_Business", "Avg_Duration"]
+    
+    service_dist = df.groupby("Email").agg({"Service": "nunique"}).reset_index()["Service"].value_counts().reset_index()
+    service_dist.columns = ["Number_of_Services", "Patient_Count"]
+    return unique_patients, booking_freq, service_usage, service_dist.sort_values("Number_of_Services")
+
+@pytest.mark.parametrize('seed', range(5))
+def test_patient_tables_match_lambda_groupbys(seed):
+    df = _random_appointments(seed)
+    
+    for table, expected in zip(analyze_patients(df), _reference_patients(df)):
+        pd.testing.assert_frame_equal(table, expected, check_dtype=False)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_latest_details_match_sorted_first(seed):
+    df = _random_appointments(seed)
+    expected = (df[["Email", "Customer", "Phone", "Start Date"]]
+                .sort_values("Start Date", ascending=False)
+                .groupby("Email")
+                .first())
+    
+    pd.testing.assert_frame_equal(PatientDimension(df).latest, expected, check_dtype=False)
+
+def test_preferred_business_ties_go_to_the_smallest_value(appointments):
+    df = pd.concat([appointments, appointments.iloc[[1]].assign(Business='East')], ignore_index=True)
+    
+    usage = PatientDimension(df).usage
+    
+    assert usage.loc[('bo@example.com', 'Bo Chan'), 'Preferred_Business'] == 'East'
+    assert usage.loc[('bo@example.com', 'Bo Chan'), 'Services'] == 'Vision'
+    assert usage.loc[('ann@example.com', 'Ann Lee'), 'Services'] == 'Dental, Vision'
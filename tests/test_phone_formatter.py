@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import pytest
+from phone_formatter import format_phone_series, format_phone_strict, format_phones, prepare_outlook_contacts
+
+# Outputs of the original per-value formatter (one rule per country pattern)
+GOLDEN_CASES = [
+    ('(555) 123-4567', ('+1 (555) 123-4567', 'Valid US/CA')),
+    ('+1 555 123 4567', ('+1 (555) 123-4567', 'Valid US/CA')),
+    ('15551234567', ('+1 (555) 123-4567', 'Valid US/CA')),
+    ('+44 7911 123456', ('+44 7911123456', 'Valid UK')),
+    ('07911123456', ('+44 7911123456', 'Valid UK')),
+    ('7911123456', ('+1 (791) 112-3456', 'Valid US/CA')),
+    ('+353 85 123 4567', ('+353 851234567', 'Valid IE')),
+    ('0851234567', ('+1 (085) 123-4567', 'Valid US/CA')),
+    ('+971 50 123 4567', ('+971 501234567', 'Valid UAE')),
+    ('501234567', ('+971 501234567', 'Valid UAE')),
+    ('+63 917 123 4567', ('+63 9171234567', 'Valid PH')),
+    ('9171234567', ('+1 (917) 123-4567', 'Valid US/CA')),
+    ('+45 12 34 56 78', ('+1 (451) 234-5678', 'Valid US/CA')),
+    ('12345678', ('+45 12345678', 'Valid DK')),
+    ('+91 98765 43210', ('+91 9876543210', 'Valid IN')),
+    ('+61 412 345 678', ('+61 412345678', 'Valid AU')),
+    ('412345678', ('+61 412345678', 'Valid AU')),
+    ('+52 55 1234 5678', ('+52 5512345678', 'Valid MX')),
+    ('+55 11 91234 5678', ('+55 11912345678', 'Valid BR')),
+    ('+49 151 23456789', ('+49 15123456789', 'Valid DE')),
+    ('+33 6 12 34 56 78', ('+33 612345678', 'Valid FR')),
+    ('+34 612 34 56 78', ('+34 612345678', 'Valid ES')),
+    ('612345678', ('+34 612345678', 'Valid ES')),
+    ('123', ('', 'Too Short')),
+    ('1234567890123456', ('', 'Too Long')),
+    ('', ('', 'Missing')),
+    (None, ('', 'Missing')),
+    ('abc', ('', 'Too Short')),
+    ('tel: 555.123.4567 ext', ('+1 (555) 123-4567', 'Valid US/CA')),
+    ('++1-555-123-4567', ('++1 5551234567', 'Unknown Format')),
+    ('00 44 7911 123456', ('+00 447911123456', 'Unknown Format')),
+    ('+86 138 0013 8000', ('+86 13800138000', 'Unknown Format')),
+    ('+7 912 345 67 89', ('+79 123456789', 'Unknown Format')),
+]
+
+@pytest.mark.parametrize('raw, expected', GOLDEN_CASES)
+def test_strict_format_matches_original_rules(raw, expected):
+    assert format_phone_strict(raw) == expected
+
+def test_series_format_matches_golden_cases():
+    phones = pd.Series([raw for raw, _ in GOLDEN_CASES], dtype=object, index=range(10, 10 + len(GOLDEN_CASES)))
+    formatted, status = format_phone_series(phones)
+    
+    assert list(zip(formatted, status)) == [expected for _, expected in GOLDEN_CASES]
+    assert formatted.index.equals(phones.index)
+
+def _random_phones(count, seed):
+    """Mixed phone strings: digits with separators, prefixes, noise and a few non-ASCII or long values"""
+    rng = np.random.default_rng(seed)
+    separators = [' ', '-', '.', '', '(', ')', '/']
+    prefixes = ['', '+', '00', '+1', '+44', '0', '+353', '+971 ', '+91-', 'tel:', '++']
+    phones = []
+    for _ in range(count):
+        digits = ''.join(rng.choice(list('0123456789'), size=rng.integers(3, 17)))
+        parts = [digits[i:i + rng.integers(1, 5)] for i in range(0, len(digits), 4)]
+        text = rng.choice(prefixes) + ''.join(part + rng.choice(separators) for part in parts)
+        roll = rng.random()
+        if roll < 0.02:
+            text = text + ' ext. ' + 'x' * 40
+        elif roll < 0.04:
+            text = '☎ ' + text
+        elif roll < 0.06:
+            text = None
+        phones.append(text)
+    return pd.Series(phones, dtype=object)
+
+def test_series_format_matches_scalar_format():
+    phones = _random_phones(5000, seed=1)
+    formatted, status = format_phone_series(phones)
+    
+    expected = [format_phone_strict(raw) for raw in phones]
+    assert list(zip(formatted, status)) == expected
+
+def test_cached_batch_format_matches_scalar_format():
+    phones = pd.concat([_random_phones(500, seed=2)] * 2, ignore_index=True)
+    formatted, status = format_phones(phones)
+    
+    expected = [format_phone_strict(raw) for raw in phones]
+    assert list(zip(formatted, status)) == expected
+
+def _appointments(seed, with_id, size=300):
+    rng = np.random.default_rng(seed)
+    people = [(f"Person {n}", f"person{n}@example.com", f"+1 212 555 {n:04d}") for n in range(60)]
+    rows = [people[n] for n in rng.integers(0, len(people), size)]
+    df = pd.DataFrame(rows, columns=['Customer', 'Email', 'Phone'])
+    
+    # Some appointments are missing a key, which never matches
+    df['Customer'] = df['Customer'].where(rng.random(size) > 0.05)
+    if with_id:
+        df.insert(0, 'ID', pd.Series([f"appt-{n % 80}" for n in range(size)], dtype=object).where(rng.random(size) > 0.05))
+    
+    falsy_answers = np.array(['', 0, None, np.nan, False, 'Yes', 'No', 3, 'Peanuts'], dtype=object)
+    df['Form: Allergies'] = rng.choice(falsy_answers, size)
+    df['Form: Referral'] = rng.choice(falsy_answers, size)
+    df['Form: Empty'] = None
+    df['Is Online'] = rng.random(size) > 0.5
+    df['Join URL'] = [f"https://meet.example.com/{n}" for n in range(size)]
+    return df
+
+def _reference_notes(df, labels):
+    """Notes looked up per contact, as before: the form answers of the first matching appointment"""
+    notes = {}
+    for idx, row in df.loc[labels].iterrows():
+        if "ID" in df.columns:
+            matched_rows = df[df['ID'] == row['ID']]
+        else:
+            matched_rows = df[(df['Customer'] == row['Customer']) & (df['Email'] == row['Email']) & (df['Phone'] == row['Phone'])]
+        
+        lines = []
+        if not matched_rows.empty:
+            appt = matched_rows.iloc[0]
+            for field in [col for col in appt.index if col.startswith('Form:')]:
+                if pd.notna(appt[field]) and appt[field]:
+                    lines.append(f"{field.replace('Form: ', '')}: {appt[field]}")
+        notes[idx] = "\n".join(lines)
+    return pd.Series(notes)
+
+@pytest.mark.parametrize('with_id', [True, False])
+@pytest.mark.parametrize('seed', range(3))
+def test_outlook_notes_match_per_contact_lookup(seed, with_id):
+    df = _appointments(seed, with_id)
+    outlook = prepare_outlook_contacts(df)
+    
+    assert not outlook.empty and (outlook['Notes'] != "").any()
+    assert outlook['Notes'].tolist() == _reference_notes(df, outlook.index).tolist()
+    assert outlook['Web Page'].tolist() == [
+        df.loc[idx, 'Join URL'] if df.loc[idx, 'Is Online'] else "" for idx in outlook.index
+    ]
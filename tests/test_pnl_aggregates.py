@@ -0,0 +1,63 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from modules.utils.data_processing import apply_filters, primary_list_value
+from modules.utils.pnl_aggregates import PnLAggregates, get_pnl_aggregates
+
+@pytest.fixture
+def pnl():
+    rng = np.random.default_rng(11)
+    n = 500
+    clients = ['Acme', 'Globex', 'Initech', 'Umbrella']
+    locations = ['Austin', 'Boston', 'Chicago']
+    revenue = rng.uniform(500, 5000, n).round(2)
+    expenses = (revenue * rng.uniform(0.3, 1.1, n)).round(2)
+    return pd.DataFrame({
+        'Client': [list(rng.choice(clients, size=rng.integers(0, 3), replace=False)) for _ in range(n)],
+        'Site_Location': [list(rng.choice(locations, size=rng.integers(0, 3), replace=False)) for _ in range(n)],
+        'Service_Month': (pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 400, n), unit='D')).to_period('M').to_timestamp(),
+        'Revenue_Total': revenue,
+        'Expense_COGS_Total': expenses,
+        'Net_Profit': revenue - expenses,
+        'Service_Days': rng.integers(1, 4, n).astype(float)
+    })
+
+FILTER_STATES = [
+    {'Client': ['Globex']},
+    {'Client': ['Acme', 'Umbrella'], 'Site_Location': ['Boston']},
+    {'Site_Location': 'chi', 'Service_Month': (datetime.date(2024, 3, 1), datetime.date(2024, 9, 30))},
+    {'Client': 'init', 'Site': ['Austin']}
+]
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+def test_sliced_totals_match_filtered_rows(pnl, filters):
+    sliced = get_pnl_aggregates(pnl, filters)
+    filtered = apply_filters(pnl, filters)
+    
+    expected = filtered[sliced.measures].sum()
+    pd.testing.assert_series_equal(sliced.totals(), expected, check_names=False)
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+def test_sliced_client_view_matches_filtered_rows(pnl, filters):
+    sliced = get_pnl_aggregates(pnl, filters)
+    filtered = apply_filters(pnl, filters)
+    
+    # Client views label each record by its primary (first linked) client
+    expected = (filtered.assign(Client=primary_list_value(filtered['Client']))
+                .groupby('Client', observed=True)[['Revenue_Total', 'Net_Profit']].sum())
+    got = sliced.by_client().set_index('Client')[['Revenue_Total', 'Net_Profit']]
+    pd.testing.assert_frame_equal(got.astype(float), expected, check_index_type=False, check_categorical=False)
+
+def test_location_view_counts_records_toward_each_location(pnl):
+    aggregates = PnLAggregates.from_frame(pnl)
+    
+    expected = pnl.explode('Site_Location').dropna(subset=['Site_Location']).groupby('Site_Location')['Revenue_Total'].sum()
+    got = aggregates.by_location().set_index('Site_Location_List')['Revenue_Total']
+    np.testing.assert_allclose(got.sort_index().to_numpy(), expected.sort_index().to_numpy())
+
+def test_slices_are_memoized_per_filter_state(pnl):
+    aggregates = get_pnl_aggregates(pnl)
+    
+    assert get_pnl_aggregates(pnl, {'Client': ['Acme']}) is aggregates.slice({'Client': ['Acme']}, pnl.columns)
+    assert get_pnl_aggregates(pnl, {}) is aggregates
@@ -0,0 +1,38 @@
+import asyncio
+import time
+from modules.airtable.ratelimit import AirtableRateLimiter
+
+def _fire_times(limiter, requests, penalize_after=None):
+    """Times (from the start) at which each of a batch of concurrent requests is released"""
+    async def run():
+        start = time.monotonic()
+        fired = []
+        
+        async def request():
+            await limiter.acquire()
+            fired.append(time.monotonic() - start)
+        
+        async def rate_limited():
+            await asyncio.sleep(penalize_after)
+            limiter.penalize()
+        
+        tasks = [request() for _ in range(requests)]
+        if penalize_after is not None:
+            tasks.append(rate_limited())
+        await asyncio.gather(*tasks)
+        return sorted(fired)
+    
+    return asyncio.run(run())
+
+def test_requests_are_paced_after_the_burst():
+    fired = _fire_times(AirtableRateLimiter(rate=20, burst=2), 6)
+    
+    assert fired[1] < 0.03
+    for earlier, later in zip(fired[1:], fired[2:]):
+        assert later - earlier >= 0.04
+
+def test_no_request_fires_inside_a_penalty_reserved_before_it():
+    fired = _fire_times(AirtableRateLimiter(rate=10, burst=2, penalty=0.3), 8, penalize_after=0.15)
+    
+    assert not [t for t in fired if 0.15 <= t < 0.45]
+    assert len(fired) == 8
@@ -0,0 +1,66 @@
+from unittest import mock
+import numpy as np
+import pandas as pd
+import pytest
+from modules.utils import rollups
+from modules.utils.data_processing import apply_filters
+from modules.utils.rollups import UtilizationRollup, get_utilization_rollup, period_labels
+
+@pytest.fixture
+def utilization():
+    rng = np.random.default_rng(3)
+    n = 600
+    headcount = rng.integers(20, 200, n).astype('float32')
+    booked = (headcount * rng.uniform(0.2, 0.9, n)).round().astype('float32')
+    completed = (booked * rng.uniform(0.5, 1.0, n)).round().astype('float32')
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 500, n), unit='D')
+    return pd.DataFrame({
+        'Client': pd.Categorical(rng.choice(['Acme', 'Globex', 'Initech'], n)),
+        'Site': pd.Categorical(rng.choice(['North', 'South', 'East', 'West'], n)),
+        'Date of Service': pd.Series(dates).where(rng.random(n) > 0.05),
+        'Headcount': headcount,
+        'Total Booking Appts': booked,
+        'Total Completed Appts': completed,
+        'Dental': rng.integers(0, 5, n).astype('float32'),
+        'Vision': rng.integers(0, 5, n).astype('float32'),
+        'Utilization Rate': completed / headcount
+    })
+
+FILTER_STATES = [
+    {'Client': ['Globex']},
+    {'Client': ['Acme', 'Initech'], 'Site': ['South']},
+    {'Site': 'th', 'Year': 2024, 'date_range': ('2024-01-01', '2024-12-31')}
+]
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+@pytest.mark.parametrize('freq', ['D', 'W', 'M', 'Y'])
+def test_sliced_rollup_matches_rollup_of_filtered_rows(utilization, filters, freq):
+    sliced = get_utilization_rollup(utilization, filters)
+    expected = UtilizationRollup.from_frame(apply_filters(utilization, filters))
+    
+    pd.testing.assert_frame_equal(sliced.series(freq), expected.series(freq))
+    pd.testing.assert_frame_equal(sliced.series(freq, by='Site'), expected.series(freq, by='Site'))
+    pd.testing.assert_frame_equal(sliced.totals('Client'), expected.totals('Client'))
+    pd.testing.assert_series_equal(sliced.service_utilization(), expected.service_utilization())
+
+def test_rollup_is_built_once_across_reruns(utilization):
+    with mock.patch.object(rollups.UtilizationRollup, 'from_frame', wraps=rollups.UtilizationRollup.from_frame) as from_frame:
+        for filters in [None, FILTER_STATES[0], FILTER_STATES[1], FILTER_STATES[0], None]:
+            get_utilization_rollup(utilization, filters)
+    
+    assert from_frame.call_count == 1
+
+def test_filters_off_the_dimensions_fall_back_to_the_filtered_rows(utilization):
+    filters = {'Headcount': ('range', 50, 100)}
+    rollup = get_utilization_rollup(utilization, filters)
+    expected = UtilizationRollup.from_frame(apply_filters(utilization, filters))
+    
+    pd.testing.assert_frame_equal(rollup.totals(), expected.totals())
+
+def test_period_labels_follow_the_resolution():
+    dates = pd.Series(pd.to_datetime(['2024-01-07', '2024-03-31']))
+    
+    assert period_labels(dates, 'W').tolist() == ['07 Jan 2024', '31 Mar 2024']
+    assert period_labels(dates, 'M').tolist() == ['Jan 2024', 'Mar 2024']
+    assert period_labels(dates, 'Q').tolist() == ['Q1 2024', 'Q1 2024']
+    assert period_labels(dates, 'Y').tolist() == ['2024', '2024']